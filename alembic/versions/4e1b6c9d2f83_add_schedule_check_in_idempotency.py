@@ -0,0 +1,31 @@
+"""add schedule check-in idempotency
+
+Revision ID: 4e1b6c9d2f83
+Revises: 9c3d7a52e1b4
+Create Date: 2026-10-19 16:42:10.318275
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '4e1b6c9d2f83'
+down_revision: Union[str, Sequence[str], None] = '9c3d7a52e1b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('schedules', sa.Column('check_in_nonce', sa.String(length=8), nullable=True, comment='签到所用二维码随机数（幂等键）'))
+    op.add_column('schedules', sa.Column('check_in_by', sa.Integer(), nullable=True, comment='签到操作人ID'))
+    op.create_foreign_key('fk_schedules_check_in_by_users', 'schedules', 'users', ['check_in_by'], ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('fk_schedules_check_in_by_users', 'schedules', type_='foreignkey')
+    op.drop_column('schedules', 'check_in_by')
+    op.drop_column('schedules', 'check_in_nonce')
@@ -0,0 +1,49 @@
+"""add candidate import staging
+
+Revision ID: 5b2e8f41c7a9
+Revises: 82edd0816690
+Create Date: 2026-10-19 10:12:41.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e8f41c7a9'
+down_revision: Union[str, Sequence[str], None] = '82edd0816690'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('candidate_import_staging',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('batch_id', sa.String(length=32), nullable=False, comment='导入批次ID'),
+    sa.Column('row_number', sa.Integer(), nullable=False, comment='Excel行号'),
+    sa.Column('name', sa.String(length=50), nullable=False, comment='考生姓名'),
+    sa.Column('id_number', sa.String(length=18), nullable=False, comment='身份证号'),
+    sa.Column('phone', sa.String(length=20), nullable=False, comment='联系电话'),
+    sa.Column('email', sa.String(length=100), nullable=True, comment='邮箱'),
+    sa.Column('gender', sa.String(length=10), nullable=True, comment='性别'),
+    sa.Column('birth_date', sa.DateTime(), nullable=True, comment='出生日期'),
+    sa.Column('exam_product_id', sa.Integer(), nullable=False, comment='考试产品ID'),
+    sa.Column('notes', sa.Text(), nullable=True, comment='备注'),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True, comment='创建时间'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_candidate_import_staging_id'), 'candidate_import_staging', ['id'], unique=False)
+    op.create_index(op.f('ix_candidate_import_staging_id_number'), 'candidate_import_staging', ['id_number'], unique=False)
+    op.create_index('ix_candidate_import_staging_batch_row', 'candidate_import_staging', ['batch_id', 'row_number'], unique=False)
+    op.create_index(op.f('ix_candidates_id_number'), 'candidates', ['id_number'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_candidates_id_number'), table_name='candidates')
+    op.drop_index('ix_candidate_import_staging_batch_row', table_name='candidate_import_staging')
+    op.drop_index(op.f('ix_candidate_import_staging_id_number'), table_name='candidate_import_staging')
+    op.drop_index(op.f('ix_candidate_import_staging_id'), table_name='candidate_import_staging')
+    op.drop_table('candidate_import_staging')
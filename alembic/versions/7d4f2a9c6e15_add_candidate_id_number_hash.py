@@ -0,0 +1,60 @@
+"""add candidate id number hash
+
+Revision ID: 7d4f2a9c6e15
+Revises: 4e1b6c9d2f83
+Create Date: 2026-10-19 18:20:36.502914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.core.security import hash_id_number
+
+# revision identifiers, used by Alembic.
+revision: str = '7d4f2a9c6e15'
+down_revision: Union[str, Sequence[str], None] = '4e1b6c9d2f83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('candidates', sa.Column('id_number_hash', sa.String(length=64), nullable=True, comment='身份证号哈希（登录查询）'))
+    op.create_index(op.f('ix_candidates_id_number_hash'), 'candidates', ['id_number_hash'], unique=False)
+    op.add_column('candidate_import_staging', sa.Column('id_number_hash', sa.String(length=64), nullable=True, comment='身份证号哈希'))
+
+    # 按当前ID_NUMBER_HASH_KEY回填已有数据
+    candidates = sa.table('candidates', sa.column('id', sa.Integer), sa.column('id_number', sa.String),
+                          sa.column('id_number_hash', sa.String))
+    staging = sa.table('candidate_import_staging', sa.column('id', sa.Integer), sa.column('id_number', sa.String),
+                       sa.column('id_number_hash', sa.String))
+    bind = op.get_bind()
+    for table in (candidates, staging):
+        last_id = 0
+        while True:
+            rows = bind.execute(
+                sa.select(table.c.id, table.c.id_number)
+                .where(table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(BACKFILL_BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            params = [{'b_id': row.id, 'b_hash': hash_id_number(row.id_number)} for row in rows if row.id_number]
+            if params:
+                bind.execute(
+                    table.update().where(table.c.id == sa.bindparam('b_id')).values(id_number_hash=sa.bindparam('b_hash')),
+                    params
+                )
+            last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('candidate_import_staging', 'id_number_hash')
+    op.drop_index(op.f('ix_candidates_id_number_hash'), table_name='candidates')
+    op.drop_column('candidates', 'id_number_hash')
@@ -0,0 +1,50 @@
+"""add candidate import jobs
+
+Revision ID: 9c3d7a52e1b4
+Revises: 5b2e8f41c7a9
+Create Date: 2026-10-19 14:05:27.604913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9c3d7a52e1b4'
+down_revision: Union[str, Sequence[str], None] = '5b2e8f41c7a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('candidate_import_jobs',
+    sa.Column('id', sa.String(length=32), nullable=False, comment='任务ID'),
+    sa.Column('institution_id', sa.Integer(), nullable=False, comment='所属机构ID'),
+    sa.Column('created_by', sa.Integer(), nullable=False, comment='创建人ID'),
+    sa.Column('file_name', sa.String(length=255), nullable=False, comment='上传文件名'),
+    sa.Column('file_path', sa.String(length=500), nullable=True, comment='上传文件保存路径'),
+    sa.Column('status', sa.String(length=20), nullable=False, comment='任务状态'),
+    sa.Column('total_rows', sa.Integer(), nullable=False, comment='总行数'),
+    sa.Column('valid_count', sa.Integer(), nullable=False, comment='有效行数'),
+    sa.Column('imported_count', sa.Integer(), nullable=False, comment='已导入行数'),
+    sa.Column('error_count', sa.Integer(), nullable=False, comment='错误数'),
+    sa.Column('errors', sa.JSON(), nullable=True, comment='错误信息'),
+    sa.Column('warnings', sa.JSON(), nullable=True, comment='警告信息'),
+    sa.Column('message', sa.Text(), nullable=True, comment='结果说明'),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True, comment='创建时间'),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True, comment='开始处理时间'),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True, comment='结束时间'),
+    sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True, comment='最近一次进度更新时间'),
+    sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['institution_id'], ['institutions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_candidate_import_jobs_institution_id'), 'candidate_import_jobs', ['institution_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_candidate_import_jobs_institution_id'), table_name='candidate_import_jobs')
+    op.drop_table('candidate_import_jobs')
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+JSON响应序列化及压缩基准测试
+对排期时间线和公共看板的响应数据，比较以下序列化方式的耗时：
+- stdlib：FastAPI原默认方式，jsonable_encoder + 标准库json（JSONResponse）
+- orjson+encoder：默认响应类ORJSONResponse，接口返回字典时仍经过jsonable_encoder
+- orjson：接口直接返回ORJSONResponse，跳过jsonable_encoder
+并比较原始、gzip、brotli（已安装时）压缩后的字节数
+
+用法：python benchmark_json_responses.py [时间线排期数] [重复次数]
+"""
+
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.core.responses import ORJSONResponse, brotli, compress
+
+
+def make_timeline(count):
+    """构造与/schedules/enhanced/timeline结构相同的数据"""
+    start = datetime.combine(date.today(), datetime.min.time()) + timedelta(hours=8)
+    timeline = {}
+    for index in range(count):
+        start_time = start + timedelta(minutes=15 * (index % 40))
+        day = (date.today() + timedelta(days=index // 400)).isoformat()
+        timeline.setdefault(day, []).append({
+            "id": index + 1,
+            "start_time": start_time.isoformat(),
+            "end_time": (start_time + timedelta(minutes=15)).isoformat(),
+            "schedule_type": "practical" if index % 2 else "theory",
+            "status": "pending",
+            "check_in_status": "not_checked_in",
+            "candidate": {"id": index + 1, "name": f"考生{index + 1}", "id_number": "110101199001011237"},
+            "venue": {"id": index % 20 + 1, "name": f"实操考场{index % 20 + 1}", "type": "实操"},
+            "exam_product": {"id": 1, "name": "多旋翼视距内驾驶员"}
+        })
+    return {
+        "message": "排期时间线",
+        "start_date": date.today().isoformat(),
+        "end_date": max(timeline),
+        "total_schedules": count,
+        "timeline": timeline,
+        "institution_stats": {
+            institution_id: {"total_schedules": count // 10, "theory_count": count // 20, "practical_count": count // 20}
+            for institution_id in range(1, 11)
+        }
+    }
+
+
+def make_dashboard(venue_count=30):
+    """构造与/qrcode/public/dashboard结构相同的数据"""
+    now = datetime.utcnow()
+    return {
+        "message": "公共考场看板",
+        "update_time": now.isoformat(),
+        "date": date.today().isoformat(),
+        "overall_stats": {
+            "total_schedules_today": venue_count * 30,
+            "completed_today": venue_count * 10,
+            "ongoing_exams": venue_count,
+            "active_venues": venue_count
+        },
+        "venues": [
+            {
+                "venue_id": venue_id,
+                "venue_name": f"实操考场{venue_id}",
+                "venue_type": "实操",
+                "current_candidate": "张*",
+                "current_schedule_type": "实操考试",
+                "current_start_time": now.strftime("%H:%M"),
+                "current_end_time": (now + timedelta(minutes=15)).strftime("%H:%M"),
+                "waiting_count": venue_id % 7,
+                "status": "busy"
+            }
+            for venue_id in range(1, venue_count + 1)
+        ]
+    }
+
+
+SERIALIZERS = {
+    "stdlib": lambda payload: JSONResponse(jsonable_encoder(payload)).body,
+    "orjson+encoder": lambda payload: ORJSONResponse(jsonable_encoder(payload)).body,
+    "orjson": lambda payload: ORJSONResponse(payload).body
+}
+
+
+def measure(serializer, payload, repeat):
+    """平均每次序列化的毫秒数"""
+    serializer(payload)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        serializer(payload)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    payloads = {"timeline": make_timeline(count), "dashboard": make_dashboard()}
+
+    print("🚀 JSON响应序列化基准测试")
+    print(f"时间线排期数: {count}，重复次数: {repeat}")
+    print("=" * 60)
+    print(f"{'数据':<12}{'方式':<16}{'耗时(ms)':>10}{'加速':>8}")
+    for name, payload in payloads.items():
+        baseline = None
+        for method, serializer in SERIALIZERS.items():
+            elapsed = measure(serializer, payload, repeat)
+            baseline = baseline or elapsed
+            print(f"{name:<12}{method:<16}{elapsed:>10.2f}{baseline / elapsed:>7.1f}x")
+
+    print("=" * 60)
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    print(f"{'数据':<12}{'原始(KB)':>10}" + "".join(f"{encoding + '(KB)':>12}{'耗时(ms)':>10}" for encoding in encodings))
+    for name, payload in payloads.items():
+        body = ORJSONResponse(payload).body
+        row = f"{name:<12}{len(body) / 1024:>10.1f}"
+        for encoding in encodings:
+            start = time.perf_counter()
+            compressed = compress(body, encoding)
+            row += f"{len(compressed) / 1024:>12.1f}{(time.perf_counter() - start) * 1000:>10.2f}"
+        print(row)
+    if brotli is None:
+        print("未安装brotli，仅比较gzip")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+批量二维码渲染吞吐量基准测试
+分别测试ZIP（二维码PNG）和PDF（准考证页）在不同进程数下的每秒生成数量及单核吞吐量
+
+用法：python benchmark_qrcode_batch.py [数量] [最大进程数]
+"""
+
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from src.core.executors import ExecutorPool
+from src.core.qr_token import encode_qr_token
+from src.services.qrcode_batch import QRCodeBatchService
+
+
+def make_slips(count):
+    """构造测试用准考证数据"""
+    expires_at = datetime.now() + timedelta(days=1)
+    return [
+        {
+            "schedule_id": index + 1,
+            "token": encode_qr_token("benchmark", "schedule_checkin", index + 1, expires_at, index + 1),
+            "candidate_name": f"考生{index + 1}",
+            "id_number": "110101********1237",
+            "schedule_type": "实操考试",
+            "start_time": "2025-08-03 09:00",
+            "venue_name": "实操考场A"
+        }
+        for index in range(count)
+    ]
+
+
+async def run(service, slips, output_format):
+    """生成全部输出，返回(耗时秒数, 输出字节数)"""
+    iterator = service.iter_zip(slips) if output_format == "zip" else service.iter_pdf(slips)
+    size = 0
+    start = time.perf_counter()
+    async for chunk in iterator:
+        size += len(chunk)
+    return time.perf_counter() - start, size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    max_processes = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    slips = make_slips(count)
+
+    print("🚀 批量二维码渲染基准测试")
+    print(f"数量: {count}，CPU核数: {os.cpu_count()}")
+    print("=" * 60)
+    print(f"{'格式':<6}{'进程数':>6}{'耗时(s)':>10}{'个/秒':>10}{'个/秒/核':>12}{'大小(KB)':>12}")
+
+    for output_format in ("zip", "pdf"):
+        processes = 1
+        while processes <= max_processes:
+            pool = ExecutorPool("benchmark", "process", processes)
+            service = QRCodeBatchService(pool)
+            # 预热进程池，不计入耗时
+            asyncio.run(run(service, slips[:processes * 2], output_format))
+
+            elapsed, size = asyncio.run(run(service, slips, output_format))
+            pool.shutdown()
+
+            rate = count / elapsed
+            print(f"{output_format:<6}{processes:>6}{elapsed:>10.2f}{rate:>10.0f}{rate / processes:>12.0f}{size / 1024:>12.0f}")
+            processes *= 2
+
+
+if __name__ == "__main__":
+    main()
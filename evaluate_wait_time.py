@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+等待时间估算离线评估
+按天留出：对每个评估日，用之前的历史数据训练估算器，预测当天每位考生的服务时长
+及排在第k位时的等待时间，与实际值比较；同时给出固定每人15分钟的基线
+
+用法：python evaluate_wait_time.py [--days 评估天数] [--history 历史天数] [--csv 样本文件]
+CSV格式：check_in_time,end_time,venue_id,exam_product_id,schedule_type（时间为ISO格式）
+"""
+
+import argparse
+import csv
+import statistics
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from src.core.config import settings
+from src.services.wait_time import WaitTimeEstimator, to_samples
+
+METHODS = ("constant", "median", "ewma")
+POSITIONS = (1, 3, 5, 10)
+
+
+def load_rows_from_db():
+    """从数据库读取全部已签到排期"""
+    from src.db.session import SessionLocal
+    from src.models.schedule import Schedule
+
+    with SessionLocal() as db:
+        return db.execute(
+            select(
+                Schedule.check_in_time, Schedule.end_time, Schedule.venue_id,
+                Schedule.exam_product_id, Schedule.schedule_type
+            ).where(Schedule.check_in_time.isnot(None))
+        ).all()
+
+
+def load_rows_from_csv(path):
+    """从CSV读取样本"""
+    def optional_int(value):
+        return int(value) if value else None
+
+    with open(path, newline="", encoding="utf-8") as f:
+        return [
+            (
+                datetime.fromisoformat(row["check_in_time"]),
+                datetime.fromisoformat(row["end_time"]),
+                optional_int(row["venue_id"]),
+                optional_int(row["exam_product_id"]),
+                row["schedule_type"]
+            )
+            for row in csv.DictReader(f)
+        ]
+
+
+def make_estimator(method, train):
+    """用训练样本构造估算器；constant为不使用历史数据的基线"""
+    estimator = WaitTimeEstimator(session_maker=None)
+    if method != "constant":
+        estimator.method = method
+        estimator.load(train)
+    return estimator
+
+
+def evaluate_day(estimator, test):
+    """返回(服务时长误差列表, {位置: 等待时间误差列表})"""
+    service_errors = []
+    wait_errors = {position: [] for position in POSITIONS}
+
+    queues = {}
+    for sample in sorted(test, key=lambda sample: sample.check_in_time):
+        predicted = estimator.service_minutes(sample.venue_id, sample.exam_product_id, sample.schedule_type)
+        service_errors.append(predicted - sample.minutes)
+        queues.setdefault((sample.venue_id, sample.schedule_type), []).append(sample)
+
+    # 排在第k位的考生，实际等待时间为前面k位考生的服务时长之和
+    for samples in queues.values():
+        for index, sample in enumerate(samples):
+            for position in POSITIONS:
+                if index < position:
+                    continue
+                actual = sum(ahead.minutes for ahead in samples[index - position:index])
+                predicted = estimator.estimate_wait(
+                    position, sample.venue_id, sample.exam_product_id, sample.schedule_type
+                )
+                wait_errors[position].append(predicted - actual)
+    return service_errors, wait_errors
+
+
+def summarize(errors):
+    """(平均绝对误差, 绝对误差中位数, 平均偏差)"""
+    if not errors:
+        return None
+    absolute = [abs(error) for error in errors]
+    return statistics.mean(absolute), statistics.median(absolute), statistics.mean(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="等待时间估算离线评估")
+    parser.add_argument("--days", type=int, default=7, help="留出评估的天数（取最近有数据的N天）")
+    parser.add_argument("--history", type=int, default=settings.WAIT_TIME_HISTORY_DAYS, help="训练使用的历史天数")
+    parser.add_argument("--csv", help="从CSV读取样本而不是数据库")
+    args = parser.parse_args()
+
+    samples = to_samples(load_rows_from_csv(args.csv) if args.csv else load_rows_from_db())
+    days = sorted({sample.check_in_time.date() for sample in samples})
+    eval_days = days[-args.days:]
+    if len(days) < 2 or not eval_days:
+        print("历史数据不足，无法评估")
+        return
+
+    print("⏱️  等待时间估算离线评估")
+    print(f"样本数: {len(samples)}，评估日: {eval_days[0]} ~ {eval_days[-1]}（{len(eval_days)}天），训练历史: {args.history}天")
+    print("=" * 72)
+
+    service_errors = {method: [] for method in METHODS}
+    wait_errors = {method: {position: [] for position in POSITIONS} for method in METHODS}
+
+    for day in eval_days:
+        train = [sample for sample in samples if day - timedelta(days=args.history) <= sample.check_in_time.date() < day]
+        test = [sample for sample in samples if sample.check_in_time.date() == day]
+        for method in METHODS:
+            day_service, day_wait = evaluate_day(make_estimator(method, train), test)
+            service_errors[method].extend(day_service)
+            for position in POSITIONS:
+                wait_errors[method][position].extend(day_wait[position])
+
+    print(f"{'方法':<10}{'服务时长MAE':>12}{'中位误差':>10}{'偏差':>8}" + "".join(f"{f'第{p}位MAE':>10}" for p in POSITIONS))
+    for method in METHODS:
+        service = summarize(service_errors[method])
+        line = f"{method:<10}{service[0]:>12.1f}{service[1]:>10.1f}{service[2]:>8.1f}" if service else f"{method:<10}{'-':>30}"
+        for position in POSITIONS:
+            wait = summarize(wait_errors[method][position])
+            line += f"{wait[0]:>10.1f}" if wait else f"{'-':>10}"
+        print(line)
+    print("\n单位：分钟；偏差为预测值减实际值的平均数")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.db.session import get_async_session
 from src.models.user import User
 from src.auth.fastapi_users_config import fastapi_users, auth_backend
-from src.core.security import get_password_hash
+from src.core.security import get_password_hash_async
 from datetime import timedelta
 
 router = APIRouter(
@@ -52,7 +52,7 @@ class SocialAuthProvider:
             return user
         else:
             # 创建新用户
-            hashed_password = get_password_hash(f"{self.name}_{social_id}_password")
+            hashed_password = await get_password_hash_async(f"{self.name}_{social_id}_password")
             user = User(
                 email=email,
                 username=username,
@@ -116,12 +116,10 @@ class WeChatAuthProvider(SocialAuthProvider):
                     return user
                 else:
                     # 创建新的微信用户
-                    from src.core.security import get_password_hash
-                    
                     # 为微信用户生成随机密码
                     import secrets
                     random_password = secrets.token_urlsafe(16)
-                    hashed_password = get_password_hash(random_password)
+                    hashed_password = await get_password_hash_async(random_password)
                     
                     new_user = UserModel(
                         email=email,
@@ -192,11 +190,10 @@ class WeChatAuthProvider(SocialAuthProvider):
             
             if not user:
                 # 创建新用户
-                from src.core.security import get_password_hash
                 import secrets
                 
                 random_password = secrets.token_urlsafe(16)
-                hashed_password = get_password_hash(random_password)
+                hashed_password = await get_password_hash_async(random_password)
                 
                 user = UserModel(
                     email=email,
@@ -21,4 +21,20 @@ def verify_token(token: str) -> Optional[Dict[str, Any]]:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         return payload
     except JWTError:
-        return None 
\ No newline at end of file
+        return None 
+def create_candidate_token(candidate_id: int, expires_delta: Optional[timedelta] = None) -> str:
+    """创建考生访问令牌（小程序、考生实时通道使用）"""
+    return create_access_token(
+        {"sub": str(candidate_id), "type": "candidate"},
+        expires_delta or timedelta(minutes=settings.CANDIDATE_TOKEN_EXPIRE_MINUTES)
+    )
+
+def verify_candidate_token(token: str) -> Optional[int]:
+    """验证考生令牌，返回考生ID"""
+    payload = verify_token(token)
+    if not payload or payload.get("type") != "candidate":
+        return None
+    try:
+        return int(payload["sub"])
+    except (KeyError, TypeError, ValueError):
+        return None
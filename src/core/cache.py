@@ -5,7 +5,9 @@ Redis缓存机制
 
 import json
 import pickle
-from typing import Any, Optional, Union, Callable
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Union, Callable, Hashable
 from functools import wraps
 import redis
 from redis import ConnectionPool
@@ -111,6 +113,50 @@ class CacheManager:
 # 全局缓存管理器实例
 cache_manager = CacheManager()
 
+class MemoryTTLCache:
+    """
+    进程内TTL缓存
+    
+    用于渲染结果等可在各进程独立重建的数据；超过容量时淘汰最久未使用的条目
+    """
+    
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """获取缓存，过期返回None"""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        
+        value, expires_at = item
+        if time.monotonic() >= expires_at:
+            del self._data[key]
+            return None
+        
+        self._data.move_to_end(key)
+        return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """设置缓存，ttl为空时使用默认有效期"""
+        self._data[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def delete(self, key: Hashable):
+        """删除缓存"""
+        self._data.pop(key, None)
+    
+    def clear(self):
+        """清空缓存"""
+        self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
 def cache_result(expire: int = 300, key_prefix: str = "default"):
     """
     缓存装饰器
@@ -19,6 +19,24 @@ class Settings:
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    CANDIDATE_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("CANDIDATE_TOKEN_EXPIRE_MINUTES", "120"))
+    # 身份证号哈希密钥（修改后需重新计算考生表的id_number_hash）
+    ID_NUMBER_HASH_KEY: str = os.getenv("ID_NUMBER_HASH_KEY", SECRET_KEY)
+    
+    # 考生身份证号登录限流（令牌桶，每个进程各自计数）
+    CANDIDATE_LOGIN_IP_PER_MINUTE: int = int(os.getenv("CANDIDATE_LOGIN_IP_PER_MINUTE", "20"))
+    CANDIDATE_LOGIN_ID_PER_MINUTE: int = int(os.getenv("CANDIDATE_LOGIN_ID_PER_MINUTE", "5"))
+    # 可信反向代理的IP或网段（逗号分隔），来自这些地址的请求按X-Forwarded-For识别客户端IP
+    TRUSTED_PROXIES: str = os.getenv("TRUSTED_PROXIES", "127.0.0.1,::1")
+    
+    # 签到二维码配置
+    QRCODE_SECRET_KEY: str = os.getenv("QRCODE_SECRET_KEY", SECRET_KEY)
+    QRCODE_EXPIRE_MINUTES: int = int(os.getenv("QRCODE_EXPIRE_MINUTES", "60"))
+    SLIP_FONT_PATH: str = os.getenv("SLIP_FONT_PATH", "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc")
+    
+    # 共享执行池配置（每个服务进程各自一套，多worker部署时按worker数折算）
+    EXECUTOR_THREAD_WORKERS: int = int(os.getenv("EXECUTOR_THREAD_WORKERS", str(min(32, (os.cpu_count() or 1) + 4))))
+    EXECUTOR_PROCESS_WORKERS: int = int(os.getenv("EXECUTOR_PROCESS_WORKERS", str(os.cpu_count() or 1)))
     
     # Redis配置
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
@@ -26,6 +44,52 @@ class Settings:
     REDIS_DB: int = int(os.getenv("REDIS_DB", "0"))
     REDIS_PASSWORD: str = os.getenv("REDIS_PASSWORD", "")
     
+    # 跨进程事件总线配置（redis 或 local；local仅在本进程内分发）
+    EVENT_BUS_BACKEND: str = os.getenv("EVENT_BUS_BACKEND", "redis")
+    EVENT_BUS_CHANNEL: str = os.getenv("EVENT_BUS_CHANNEL", "exam_site:events")
+    EVENT_BUS_RETRY_SECONDS: int = int(os.getenv("EVENT_BUS_RETRY_SECONDS", "5"))
+    
+    # 响应压缩配置（超过阈值的非流式响应，brotli需安装brotli包）
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+    
+    # 小程序考场状态缓存秒数（全部考场一次查询，各进程独立缓存）
+    WX_VENUE_STATUS_CACHE_SECONDS: float = float(os.getenv("WX_VENUE_STATUS_CACHE_SECONDS", "5"))
+    
+    # 条件请求配置（ETag；EVENT_BUS_BACKEND为redis时数据表版本号保存在Redis中，各进程共享）
+    HTTP_CACHE_ENABLED: bool = os.getenv("HTTP_CACHE_ENABLED", "True").lower() == "true"
+    HTTP_CACHE_VERSION_KEY: str = os.getenv("HTTP_CACHE_VERSION_KEY", "exam_site:table_versions")
+    
+    # 考生批量导入配置
+    IMPORT_CHUNK_SIZE: int = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+    IMPORT_WORKERS: int = int(os.getenv("IMPORT_WORKERS", "2"))
+    IMPORT_UPLOAD_DIR: str = os.getenv("IMPORT_UPLOAD_DIR", "uploads/imports")
+    IMPORT_JOB_STALE_SECONDS: int = int(os.getenv("IMPORT_JOB_STALE_SECONDS", "300"))
+    
+    # 排队索引配置（内存索引定期从数据库重建，覆盖其他worker及其他途径产生的变更）
+    QUEUE_INDEX_REFRESH_SECONDS: int = int(os.getenv("QUEUE_INDEX_REFRESH_SECONDS", "60"))
+    QUEUE_SNAPSHOT_FLUSH: bool = os.getenv("QUEUE_SNAPSHOT_FLUSH", "False").lower() == "true"
+    
+    # 等待时间估算配置（按历史服务时长，每人分钟数）
+    WAIT_TIME_METHOD: str = os.getenv("WAIT_TIME_METHOD", "median")  # median 或 ewma
+    WAIT_TIME_HISTORY_DAYS: int = int(os.getenv("WAIT_TIME_HISTORY_DAYS", "30"))
+    WAIT_TIME_REFRESH_SECONDS: int = int(os.getenv("WAIT_TIME_REFRESH_SECONDS", "600"))
+    WAIT_TIME_DEFAULT_MINUTES: float = float(os.getenv("WAIT_TIME_DEFAULT_MINUTES", "15"))
+    
+    # 考场状态投影配置
+    VENUE_PROJECTION_REFRESH_SECONDS: int = int(os.getenv("VENUE_PROJECTION_REFRESH_SECONDS", "300"))  # 定期重建，兜底事件丢失及日期切换
+    
+    # 公共看板推送配置（SSE）
+    PUBLIC_BOARD_REFRESH_SECONDS: int = int(os.getenv("PUBLIC_BOARD_REFRESH_SECONDS", "5"))
+    PUBLIC_BOARD_HEARTBEAT_SECONDS: int = int(os.getenv("PUBLIC_BOARD_HEARTBEAT_SECONDS", "15"))
+    PUBLIC_BOARD_HISTORY: int = int(os.getenv("PUBLIC_BOARD_HISTORY", "500"))  # 保留的增量事件数，用于断线补发
+    PUBLIC_BOARD_MAX_PENDING: int = int(os.getenv("PUBLIC_BOARD_MAX_PENDING", "100"))  # 单个连接积压上限
+    
+    # 考生实时通道配置（WebSocket）
+    CANDIDATE_CHANNEL_MAX_PENDING: int = int(os.getenv("CANDIDATE_CHANNEL_MAX_PENDING", "50"))  # 单个连接未发送消息上限
+    CANDIDATE_CHANNEL_NEXT_POSITION: int = int(os.getenv("CANDIDATE_CHANNEL_NEXT_POSITION", "1"))  # 排到第几位时提醒
+    
     # 微信认证配置（为未来准备）
     WECHAT_APP_ID: str = os.getenv("WECHAT_APP_ID", "")
     WECHAT_APP_SECRET: str = os.getenv("WECHAT_APP_SECRET", "")
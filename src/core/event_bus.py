@@ -0,0 +1,202 @@
+"""
+跨进程事件总线
+多worker部署时各进程的排队索引、公共看板等内存状态相互独立；签到、排期及考场变更后发布事件，
+每个进程收到后更新自己的状态。发布的事件先在本进程内同步分发，再经Redis发布/订阅广播给其他进程。
+Redis不可用或配置为local时只在本进程内分发（单进程部署），其他进程依靠定期重建兜底；
+测试中可用LocalBroker在同一进程内连接多个总线模拟多worker
+"""
+import asyncio
+import inspect
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+import redis.asyncio as aioredis
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[Dict[str, Any]], Union[None, Awaitable[None]]]
+
+
+class EventType:
+    """事件类型及负载"""
+    CHECKIN = "checkin"  # schedule_ids: 完成签到的排期
+    SCHEDULE_CHANGED = "schedule_changed"  # schedules: 新建或修改后的排期；deleted: 删除的排期ID
+    VENUE_CHANGED = "venue_changed"  # venue_ids: 有变化的考场
+    RESYNC = "resync"  # 仅本进程：与其他进程的连接中断后恢复，期间的事件可能丢失
+
+
+class EventBus:
+    """进程内事件总线"""
+
+    backend = "local"
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex[:8]
+        self._handlers: Dict[str, List[EventHandler]] = {}
+        self.broker: Optional["LocalBroker"] = None
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, event_type: str, handler: EventHandler):
+        """注册事件处理函数（同步函数或协程函数），参数为事件负载"""
+        self._handlers.setdefault(event_type, []).append(handler)
+
+    async def publish(self, event_type: str, **payload: Any):
+        """发布事件：先在本进程处理，再广播给其他进程；广播失败不影响调用方"""
+        event = {
+            "type": event_type,
+            "origin": self.worker_id,
+            "published_at": datetime.utcnow().isoformat(),
+            "payload": payload
+        }
+        self.published += 1
+        await self.dispatch(event)
+        try:
+            await self._broadcast(event)
+        except Exception as e:
+            logger.warning(f"广播事件失败 {event_type}: {e}")
+
+    async def dispatch(self, event: Dict[str, Any]):
+        """调用本进程的处理函数，单个处理函数出错不影响其他处理函数"""
+        for handler in self._handlers.get(event["type"], ()):
+            try:
+                result = handler(event["payload"])
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"处理事件失败 {event['type']}: {e}")
+
+    async def receive(self, event: Dict[str, Any]):
+        """处理其他进程广播的事件"""
+        if event.get("origin") == self.worker_id:
+            return
+        self.received += 1
+        await self.dispatch(event)
+
+    async def _broadcast(self, event: Dict[str, Any]):
+        if self.broker is not None:
+            await self.broker.broadcast(event)
+
+    @property
+    def connected(self) -> bool:
+        """是否能收到其他进程的事件（本进程模式下只有一个进程，视为已连接）"""
+        return True
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "worker_id": self.worker_id,
+            "published": self.published,
+            "received": self.received
+        }
+
+
+class LocalBroker:
+    """在同一进程内连接多个事件总线，模拟多worker（测试用），事件经JSON编码后传递"""
+
+    def __init__(self):
+        self.buses: List[EventBus] = []
+
+    def attach(self, bus: EventBus) -> EventBus:
+        bus.broker = self
+        self.buses.append(bus)
+        return bus
+
+    async def broadcast(self, event: Dict[str, Any]):
+        message = json.dumps(event, ensure_ascii=False, default=str)
+        for bus in self.buses:
+            await bus.receive(json.loads(message))
+
+
+class RedisEventBus(EventBus):
+    """基于Redis发布/订阅的事件总线"""
+
+    backend = "redis"
+
+    def __init__(self, channel: str = None, client_factory: Optional[Callable[[], Any]] = None):
+        super().__init__()
+        self.channel = channel or settings.EVENT_BUS_CHANNEL
+        self.retry_seconds = settings.EVENT_BUS_RETRY_SECONDS
+        self._client_factory = client_factory or (lambda: aioredis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            password=settings.REDIS_PASSWORD or None,
+            decode_responses=True
+        ))
+        self._client = None
+        self._connected = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """连接Redis并启动订阅；连接失败时先按本进程模式运行，后台继续重试"""
+        if self._task:
+            return
+        self._client = self._client_factory()
+        self._task = asyncio.create_task(self._listen_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._connected = False
+
+    async def _broadcast(self, event: Dict[str, Any]):
+        if self._connected:
+            await self._client.publish(self.channel, json.dumps(event, ensure_ascii=False, default=str))
+
+    async def _listen_loop(self):
+        first = True
+        while True:
+            try:
+                async with self._client.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    self._connected = True
+                    logger.info(f"事件总线已连接 {self.channel}")
+                    if not first:
+                        # 断开期间其他进程的事件已丢失，由本进程各状态自行重建
+                        await self.dispatch({"type": EventType.RESYNC, "origin": self.worker_id, "payload": {}})
+                    first = False
+                    async for message in pubsub.listen():
+                        if message.get("type") != "message":
+                            continue
+                        await self.receive(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self._connected or first:
+                    logger.warning(f"事件总线连接失败，仅在本进程内分发: {e}")
+                self._connected = False
+                first = False
+                await asyncio.sleep(self.retry_seconds)
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**super().metrics(), "channel": self.channel, "connected": self._connected}
+
+
+def create_event_bus(backend: Optional[str] = None) -> EventBus:
+    backend = backend or settings.EVENT_BUS_BACKEND
+    return RedisEventBus() if backend == "redis" else EventBus()
+
+
+# 单例事件总线
+event_bus = create_event_bus()
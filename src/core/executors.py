@@ -0,0 +1,128 @@
+"""
+共享执行器
+CPU密集或阻塞的操作（二维码渲染、bcrypt、Excel解析等）统一提交到有界线程池/进程池，
+避免阻塞事件循环；每个池记录排队深度和等待时间
+"""
+import asyncio
+import functools
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.core.config import settings
+
+
+def _timed_call(func: Callable, args: tuple, kwargs: dict) -> Tuple[float, Any]:
+    """在工作线程/进程中执行，返回(开始执行时间, 结果)，用于统计排队等待时间"""
+    return time.time(), func(*args, **kwargs)
+
+
+class ExecutorPool:
+    """
+    有界执行池
+
+    kind 为 "thread" 或 "process"；进程池中执行的函数及参数必须可序列化
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self._executor: Optional[Executor] = None
+        self._reset_metrics()
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """在池中执行函数并等待结果"""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(_timed_call, func, args, kwargs)
+
+        submitted_at = time.time()
+        self.submitted += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            started_at, result = await loop.run_in_executor(self.executor, call)
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        wait = max(0.0, started_at - submitted_at)
+        self.completed += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        return result
+
+    @property
+    def queue_depth(self) -> int:
+        """已提交但尚未开始执行的任务数"""
+        return max(0, self.in_flight - self.max_workers)
+
+    def metrics(self) -> Dict[str, Any]:
+        """池的运行指标"""
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "peak_in_flight": self.peak_in_flight,
+            "peak_queue_depth": max(0, self.peak_in_flight - self.max_workers),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.total_wait * 1000 / self.completed, 2) if self.completed else 0,
+            "max_wait_ms": round(self.max_wait * 1000, 2)
+        }
+
+    def shutdown(self, wait: bool = True):
+        """关闭池，下次使用时重新创建"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    def _reset_metrics(self):
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+# 阻塞IO及释放GIL的计算（bcrypt、Excel读写）
+thread_pool = ExecutorPool("thread", "thread", settings.EXECUTOR_THREAD_WORKERS)
+# 纯Python的CPU密集计算（二维码渲染）
+process_pool = ExecutorPool("process", "process", settings.EXECUTOR_PROCESS_WORKERS)
+
+
+async def run_in_thread(func: Callable, *args, **kwargs) -> Any:
+    """在共享线程池中执行"""
+    return await thread_pool.run(func, *args, **kwargs)
+
+
+async def run_in_process(func: Callable, *args, **kwargs) -> Any:
+    """在共享进程池中执行"""
+    return await process_pool.run(func, *args, **kwargs)
+
+
+def executor_metrics() -> Dict[str, Dict[str, Any]]:
+    """所有共享池的运行指标"""
+    return {pool.name: pool.metrics() for pool in (thread_pool, process_pool)}
+
+
+def shutdown_executors():
+    """关闭所有共享池"""
+    for pool in (thread_pool, process_pool):
+        pool.shutdown()
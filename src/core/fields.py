@@ -0,0 +1,33 @@
+"""
+稀疏字段
+列表接口通过fields查询参数（逗号分隔）只返回部分字段：查询时只加载对应的列，序列化时只输出这些字段
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from fastapi import HTTPException, Query, status
+
+FIELDS_QUERY = Query(None, description="只返回指定字段，逗号分隔，如 id,name,status")
+
+
+def parse_fields(fields: Optional[str], available: Sequence[str]) -> Optional[List[str]]:
+    """解析fields参数，未指定时返回None（返回全部字段）；包含不支持的字段时返回400"""
+    if not fields:
+        return None
+    requested = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in requested if field not in available]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"不支持的字段: {', '.join(unknown)}；可选字段: {', '.join(available)}"
+        )
+    return requested or None
+
+
+def model_columns(model: Any, fields: Iterable[str]) -> List[Any]:
+    """字段对应的模型列，用于 select(*columns) / db.query(*columns)"""
+    return [getattr(model, field) for field in fields]
+
+
+def row_dicts(rows: Iterable[Any], fields: Sequence[str]) -> List[Dict[str, Any]]:
+    """按列查询的结果行转为字典"""
+    return [dict(zip(fields, row)) for row in rows]
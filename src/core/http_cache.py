@@ -0,0 +1,300 @@
+"""
+HTTP缓存工具
+基于ETag的条件请求处理。
+接口可自行计算版本号（make_etag / is_not_modified）；轮询接口可由ConditionalGetMiddleware按所依赖数据表的版本号生成ETag，
+If-None-Match匹配时直接返回304，不执行接口及数据库查询。数据表版本号在会话提交写入后递增一次，
+多worker部署时保存在Redis中，各进程共享
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import time
+import uuid
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Set, Tuple
+from urllib.parse import quote
+
+import redis
+import redis.asyncio as aioredis
+from fastapi import Request
+from redis.asyncio.retry import Retry as AsyncRetry
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_etag(version: str) -> str:
+    """由版本号生成强ETag"""
+    return f'"{version}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """判断请求的If-None-Match是否与当前ETag匹配"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+
+def content_disposition(filename: str) -> str:
+    """生成下载响应头，支持中文文件名"""
+    return f"attachment; filename*=UTF-8''{quote(filename)}"
+
+
+# ===== 数据表版本号 =====
+
+class TableVersions:
+    """
+    本进程内的数据表版本号（单进程部署，EVENT_BUS_BACKEND=local）
+    纪元在进程启动时生成，重启后此前的ETag全部失效
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._versions: Dict[str, int] = {}
+
+    def get(self, table: str) -> int:
+        return self._versions.get(table, 0)
+
+    async def version(self, tables: Sequence[str]) -> Optional[str]:
+        """所依赖数据表的版本号；无法确定时返回None（不生成ETag）"""
+        return ".".join([self.epoch, *(str(self.get(table)) for table in tables)])
+
+    async def bump(self, tables: Iterable[str]):
+        self.bump_sync(tables)
+
+    def bump_sync(self, tables: Iterable[str]):
+        """在没有事件循环的环境（脚本、同步接口的线程）中递增"""
+        for table in tables:
+            self._versions[table] = self._versions.get(table, 0) + 1
+
+
+class RedisTableVersions(TableVersions):
+    """
+    各进程共享的数据表版本号：每张表一个Redis计数器，提交写入的进程INCR一次；纪元同样保存在Redis中
+    （Redis数据丢失后重新生成），各worker对同一数据计算出相同的ETag。
+    Redis不可用时不生成ETag，递增失败的数据表在恢复连接后补记
+    """
+
+    def __init__(
+        self,
+        key: str = None,
+        client_factory: Optional[Callable[[], Any]] = None,
+        sync_client_factory: Optional[Callable[[], Any]] = None
+    ):
+        super().__init__()
+        self.key = key or settings.HTTP_CACHE_VERSION_KEY
+        self.retry_seconds = settings.EVENT_BUS_RETRY_SECONDS
+        options = dict(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            password=settings.REDIS_PASSWORD or None,
+            decode_responses=True,
+            socket_timeout=1,
+            socket_connect_timeout=1
+        )
+        # 不重试：读取失败时本次请求直接不使用ETag
+        self._client_factory = client_factory or (lambda: aioredis.Redis(retry=AsyncRetry(NoBackoff(), 0), **options))
+        self._sync_client_factory = sync_client_factory or (lambda: redis.Redis(retry=Retry(NoBackoff(), 0), **options))
+        self._client = None
+        self._sync_client = None
+        self._pending: Set[str] = set()
+        self._retry_at = 0.0
+
+    def _table_key(self, table: str) -> str:
+        return f"{self.key}:{table}"
+
+    def _failed(self, error: Exception):
+        if time.monotonic() >= self._retry_at:
+            logger.warning(f"数据表版本号读写失败，暂不生成ETag: {error}")
+        self._retry_at = time.monotonic() + self.retry_seconds
+
+    async def version(self, tables: Sequence[str]) -> Optional[str]:
+        if time.monotonic() < self._retry_at:
+            return None
+        if self._client is None:
+            self._client = self._client_factory()
+        try:
+            if self._pending:
+                await self._incr(self._pending)
+            epoch_key = f"{self.key}:epoch"
+            epoch, *versions = await self._client.mget([epoch_key, *(self._table_key(table) for table in tables)])
+            if epoch is None:
+                await self._client.set(epoch_key, uuid.uuid4().hex[:8], nx=True)
+                epoch = await self._client.get(epoch_key)
+        except Exception as e:
+            self._failed(e)
+            return None
+        return ".".join([epoch, *(version or "0" for version in versions)])
+
+    async def bump(self, tables: Iterable[str]):
+        tables = self._pending | set(tables)
+        if time.monotonic() < self._retry_at:
+            self._pending = tables
+            return
+        if self._client is None:
+            self._client = self._client_factory()
+        try:
+            await self._incr(tables)
+        except Exception as e:
+            self._pending = tables
+            self._failed(e)
+
+    async def _incr(self, tables: Set[str]):
+        async with self._client.pipeline(transaction=False) as pipe:
+            for table in sorted(tables):
+                pipe.incr(self._table_key(table))
+            await pipe.execute()
+        self._pending -= tables
+
+    def bump_sync(self, tables: Iterable[str]):
+        tables = self._pending | set(tables)
+        if time.monotonic() < self._retry_at:
+            self._pending = tables
+            return
+        if self._sync_client is None:
+            self._sync_client = self._sync_client_factory()
+        try:
+            with self._sync_client.pipeline(transaction=False) as pipe:
+                for table in sorted(tables):
+                    pipe.incr(self._table_key(table))
+                pipe.execute()
+            self._pending -= tables
+        except Exception as e:
+            self._pending = tables
+            self._failed(e)
+
+
+def create_table_versions(backend: Optional[str] = None) -> TableVersions:
+    backend = backend or settings.EVENT_BUS_BACKEND
+    return RedisTableVersions() if backend == "redis" else TableVersions()
+
+
+table_versions = create_table_versions()
+
+CHANGED_TABLES = "changed_tables"
+_bump_tasks: Set[asyncio.Task] = set()
+
+
+def _changed_tables(session: Session) -> Set[str]:
+    return session.info.setdefault(CHANGED_TABLES, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flush(session: Session, flush_context):
+    """记录本次刷新写入的数据表（此时new/dirty/deleted仍为刷新前的状态）"""
+    changed = _changed_tables(session)
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(instance, "__tablename__", None)
+        if table:
+            changed.add(table)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_statement(orm_execute_state):
+    """记录批量insert/update/delete语句写入的数据表"""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if getattr(table, "name", None):
+            _changed_tables(orm_execute_state.session).add(table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed(session: Session):
+    """每次提交递增一次所写入数据表的版本号"""
+    tables = session.info.pop(CHANGED_TABLES, None)
+    if not tables:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        table_versions.bump_sync(tables)
+        return
+    task = loop.create_task(table_versions.bump(tables))
+    _bump_tasks.add(task)
+    task.add_done_callback(_bump_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session):
+    session.info.pop(CHANGED_TABLES, None)
+
+
+# ===== 条件请求中间件 =====
+
+class ConditionalGetMiddleware:
+    """
+    按路径规则为GET请求生成ETag：由所依赖数据表的版本号、当天日期、请求路径及参数、认证信息计算，
+    不同用户、不同参数的响应ETag不同。无法读取版本号（Redis不可用）时不生成ETag、不返回304
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        rules: Sequence[Tuple[str, Sequence[str]]],
+        versions: Optional[TableVersions] = None
+    ):
+        self.app = app
+        self.rules = [(re.compile(pattern), tuple(tables)) for pattern, tables in rules]
+        self.versions = versions
+
+    def match(self, path: str) -> Optional[Tuple[str, ...]]:
+        for pattern, tables in self.rules:
+            if pattern.match(path):
+                return tables
+        return None
+
+    def etag(self, scope: Scope, version: str) -> str:
+        headers = dict(scope["headers"])
+        digest = hashlib.blake2b(digest_size=16)
+        for part in (
+            version.encode(),
+            date.today().isoformat().encode(),
+            scope["path"].encode(),
+            scope.get("query_string", b""),
+            headers.get(b"authorization", b""),
+            headers.get(b"cookie", b"")
+        ):
+            digest.update(part)
+            digest.update(b"\n")
+        return make_etag(digest.hexdigest())
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or not settings.HTTP_CACHE_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        tables = self.match(scope["path"])
+        if tables is None:
+            await self.app(scope, receive, send)
+            return
+
+        # 在执行接口前计算：执行期间发生的写入会使下次请求的ETag不匹配
+        version = await (self.versions or table_versions).version(tables)
+        if version is None:
+            await self.app(scope, receive, send)
+            return
+        etag = self.etag(scope, version)
+        if is_not_modified(Request(scope), etag):
+            await send({"type": "http.response.start", "status": 304, "headers": [(b"etag", etag.encode())]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_etag(message: Message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = MutableHeaders(scope=message)
+                if "etag" not in headers:
+                    headers["ETag"] = etag
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
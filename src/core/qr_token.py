@@ -0,0 +1,125 @@
+"""
+签到二维码令牌
+紧凑二进制令牌（考生/排期ID、过期时间、随机数、HMAC签名），使用Base45编码，
+编码结果只含二维码字母数字模式字符，且不包含任何个人信息
+"""
+import hashlib
+import hmac
+import secrets
+import struct
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# RFC 9285 Base45 字母表（均为二维码字母数字模式字符）
+BASE45_CHARSET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+BASE45_VALUES = {char: index for index, char in enumerate(BASE45_CHARSET)}
+
+TOKEN_VERSION = 1
+TOKEN_TYPES = {"schedule_checkin": 1, "candidate_info": 2}
+TOKEN_TYPE_NAMES = {code: name for name, code in TOKEN_TYPES.items()}
+
+# 版本(1) 类型(1) 考生ID(4) 排期ID(4) 过期时间(4) 随机数(4)
+TOKEN_BODY = struct.Struct(">BBIII4s")
+TOKEN_MAC_SIZE = 10  # HMAC-SHA256 截取前80位
+
+
+class QRTokenError(ValueError):
+    """二维码令牌无效"""
+
+
+class QRTokenExpired(QRTokenError):
+    """二维码令牌已过期"""
+
+
+def b45encode(data: bytes) -> str:
+    """Base45编码"""
+    chars = []
+    for index in range(0, len(data) - 1, 2):
+        value = data[index] * 256 + data[index + 1]
+        value, c = divmod(value, 45)
+        e, d = divmod(value, 45)
+        chars.extend((BASE45_CHARSET[c], BASE45_CHARSET[d], BASE45_CHARSET[e]))
+    if len(data) % 2:
+        d, c = divmod(data[-1], 45)
+        chars.extend((BASE45_CHARSET[c], BASE45_CHARSET[d]))
+    return "".join(chars)
+
+
+def b45decode(text: str) -> bytes:
+    """Base45解码"""
+    try:
+        values = [BASE45_VALUES[char] for char in text]
+    except KeyError:
+        raise QRTokenError("包含非法字符")
+
+    if len(values) % 3 == 1:
+        raise QRTokenError("长度错误")
+
+    output = bytearray()
+    for index in range(0, len(values), 3):
+        group = values[index:index + 3]
+        if len(group) == 3:
+            value = group[0] + group[1] * 45 + group[2] * 2025
+            if value > 0xFFFF:
+                raise QRTokenError("编码错误")
+            output.extend(divmod(value, 256))
+        else:
+            value = group[0] + group[1] * 45
+            if value > 0xFF:
+                raise QRTokenError("编码错误")
+            output.append(value)
+    return bytes(output)
+
+
+def encode_qr_token(
+    secret: str,
+    token_type: str,
+    candidate_id: int,
+    expires_at: datetime,
+    schedule_id: Optional[int] = None
+) -> str:
+    """生成签名令牌"""
+    body = TOKEN_BODY.pack(
+        TOKEN_VERSION,
+        TOKEN_TYPES[token_type],
+        candidate_id,
+        schedule_id or 0,
+        int(expires_at.timestamp()),
+        secrets.token_bytes(4)
+    )
+    return b45encode(body + _sign(secret, body))
+
+
+def decode_qr_token(secret: str, token: str, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    校验并解析令牌
+
+    只做签名和过期校验，不访问数据库；签名错误抛出QRTokenError，过期抛出QRTokenExpired
+    """
+    raw = b45decode(token.strip())
+    if len(raw) != TOKEN_BODY.size + TOKEN_MAC_SIZE:
+        raise QRTokenError("长度错误")
+
+    body, mac = raw[:TOKEN_BODY.size], raw[TOKEN_BODY.size:]
+    if not hmac.compare_digest(mac, _sign(secret, body)):
+        raise QRTokenError("签名错误")
+
+    version, type_code, candidate_id, schedule_id, expires, nonce = TOKEN_BODY.unpack(body)
+    if version != TOKEN_VERSION or type_code not in TOKEN_TYPE_NAMES:
+        raise QRTokenError("版本或类型错误")
+
+    expires_at = datetime.fromtimestamp(expires)
+    if (now or datetime.now()) > expires_at:
+        raise QRTokenExpired("已过期")
+
+    return {
+        "type": TOKEN_TYPE_NAMES[type_code],
+        "candidate_id": candidate_id,
+        "schedule_id": schedule_id or None,
+        "expires_at": expires_at,
+        "nonce": nonce.hex()
+    }
+
+
+def _sign(secret: str, body: bytes) -> bytes:
+    return hmac.new(secret.encode(), body, hashlib.sha256).digest()[:TOKEN_MAC_SIZE]
@@ -0,0 +1,89 @@
+"""
+进程内限流
+令牌桶按键（如客户端IP）独立计数：桶容量即允许的突发次数，令牌按固定速率恢复。
+计数只在本进程内有效，多worker部署时实际上限为 worker数 × 配置值。
+按IP限流时使用 client_ip 取客户端地址：请求来自可信代理（TRUSTED_PROXIES）时取X-Forwarded-For中的客户端地址
+"""
+import ipaddress
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple, Union
+
+from starlette.requests import HTTPConnection
+
+from src.core.config import settings
+
+Networks = List[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]]
+
+
+class TokenBucketLimiter:
+    """令牌桶限流器；超过容量的键淘汰最久未使用的（被淘汰的键视为满桶）"""
+
+    def __init__(self, capacity: int, per_seconds: float = 60, maxsize: int = 100000):
+        self.capacity = capacity
+        self.rate = capacity / per_seconds  # 每秒恢复的令牌数
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[Hashable, Tuple[float, float]] = OrderedDict()
+
+    def acquire(self, key: Hashable, now: Optional[float] = None) -> float:
+        """取一个令牌；成功返回0，否则返回需等待的秒数"""
+        now = time.monotonic() if now is None else now
+        tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / self.rate
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+def parse_networks(value: str) -> Networks:
+    """解析逗号分隔的IP或网段"""
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in value.split(",") if item.strip()]
+
+
+TRUSTED_PROXY_NETWORKS = parse_networks(settings.TRUSTED_PROXIES)
+
+
+def is_trusted_proxy(address: Optional[str], networks: Networks) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except (TypeError, ValueError):
+        return False
+    return any(ip in network for network in networks)
+
+
+def client_ip(connection: HTTPConnection, networks: Optional[Networks] = None) -> Optional[str]:
+    """
+    客户端IP
+    
+    直连地址不是可信代理时直接使用（忽略客户端可伪造的X-Forwarded-For）；否则从X-Forwarded-For
+    右侧向左跳过可信代理，取第一个不可信的地址
+    """
+    networks = TRUSTED_PROXY_NETWORKS if networks is None else networks
+    peer = connection.client.host if connection.client else None
+    if not is_trusted_proxy(peer, networks):
+        return peer
+
+    forwarded = [
+        address.strip()
+        for header in connection.headers.getlist("x-forwarded-for")
+        for address in header.split(",")
+        if address.strip()
+    ]
+    for address in reversed(forwarded):
+        if not is_trusted_proxy(address, networks):
+            return address
+    return forwarded[0] if forwarded else peer
@@ -0,0 +1,123 @@
+"""
+响应序列化及压缩
+- ORJSONResponse：应用的默认响应类，使用orjson序列化（datetime、date、UUID、枚举等原生支持）。
+  接口直接返回ORJSONResponse(已成形的字典)时不再经过FastAPI的jsonable_encoder，适合时间线、看板等大结果
+- CompressionMiddleware：超过阈值的响应按Accept-Encoding使用brotli（已安装brotli时）或gzip压缩；
+  流式响应（SSE推送、文件导出）逐块发送，不压缩
+"""
+import gzip
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse as BaseORJSONResponse
+from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # 未安装时只支持gzip
+    brotli = None
+
+# 与标准库json一致，整数等非字符串键转为字符串
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def orjson_default(value: Any) -> Any:
+    """orjson不支持的类型，与jsonable_encoder的结果保持一致"""
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=orjson_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(BaseORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """按Accept-Encoding选择压缩方式，优先brotli"""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            if params and float(quality) <= 0:
+                continue
+        except ValueError:
+            pass
+        accepted.add(coding.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return ""
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """压缩一次性发送的响应体"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message = {}
+
+        async def send_compressed(message: Message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message  # 等待响应体，确定是否压缩
+                return
+            if not start_message:
+                await send(message)
+                return
+
+            start, start_message = start_message, {}
+            headers = MutableHeaders(scope=start)
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
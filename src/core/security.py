@@ -1,5 +1,11 @@
+import hashlib
+import hmac
+
 from passlib.context import CryptContext
 
+from src.core.config import settings
+from src.core.executors import run_in_thread
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
@@ -10,4 +16,20 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     """获取密码哈希"""
-    return pwd_context.hash(password) 
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """验证密码（在共享线程池中执行，不阻塞事件循环）"""
+    return await run_in_thread(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """获取密码哈希（在共享线程池中执行，不阻塞事件循环）"""
+    return await run_in_thread(get_password_hash, password)
+
+
+def hash_id_number(id_number: str) -> str:
+    """身份证号的带密钥哈希（HMAC-SHA256），用于按身份证号登录时的索引查询；末位x按大写处理"""
+    normalized = id_number.strip().upper().encode()
+    return hmac.new(settings.ID_NUMBER_HASH_KEY.encode(), normalized, hashlib.sha256).hexdigest()
@@ -7,6 +7,7 @@ from src.models.candidate import Candidate
 from src.models.schedule import Schedule
 from src.models.role import Role
 from src.models.permission import Permission, RolePermission
+from src.models.candidate_import import CandidateImportStaging, CandidateImportJob
 
 __all__ = [
     "User", 
@@ -17,5 +18,7 @@ __all__ = [
     "Schedule",
     "Role",
     "Permission", 
-    "RolePermission"
+    "RolePermission",
+    "CandidateImportStaging",
+    "CandidateImportJob"
 ] 
\ No newline at end of file
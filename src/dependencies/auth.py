@@ -1,5 +1,7 @@
+from typing import Optional
 from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer, OAuth2PasswordBearer
+from src.core.auth import verify_candidate_token
 from src.models.user import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -10,3 +12,19 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
     return user
+
+
+candidate_bearer = HTTPBearer(auto_error=False)
+
+def get_current_candidate_id(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(candidate_bearer)
+) -> int:
+    """从考生访问令牌（Authorization: Bearer）取得考生ID"""
+    candidate_id = verify_candidate_token(credentials.credentials) if credentials else None
+    if candidate_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="考生令牌无效或已过期，请重新登录",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return candidate_id
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from src.dependencies.get_db import get_db
+from src.core.fields import FIELDS_QUERY, model_columns, parse_fields, row_dicts
 from src.dependencies.permissions import (
     require_institution_read, require_institution_create, 
     require_institution_update, require_institution_delete
@@ -18,6 +19,12 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# 列表接口可返回的字段
+INSTITUTION_LIST_FIELDS = (
+    "id", "name", "code", "contact_person", "phone", "email", "address", "description", "status",
+    "license_number", "business_scope", "created_at", "updated_at"
+)
+
 
 @router.post("/", response_model=InstitutionRead, status_code=status.HTTP_201_CREATED)
 async def create_institution(
@@ -55,11 +62,14 @@ async def get_institutions(
     size: int = Query(10, ge=1, le=100, description="每页数量"),
     search: Optional[str] = Query(None, description="搜索关键词"),
     status_filter: Optional[str] = Query(None, description="状态过滤"),
+    fields: Optional[str] = FIELDS_QUERY,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_institution_read)
 ):
-    """获取机构列表（支持搜索和过滤）"""
-    query = db.query(Institution)
+    """获取机构列表（支持搜索和过滤，可通过fields只返回部分字段）"""
+    selected_fields = parse_fields(fields, INSTITUTION_LIST_FIELDS) or INSTITUTION_LIST_FIELDS
+    # 只查询需要返回的列
+    query = db.query(*model_columns(Institution, selected_fields))
     
     # 搜索过滤
     if search:
@@ -74,27 +84,7 @@ async def get_institutions(
     
     # 分页
     skip = (page - 1) * size
-    institutions = query.offset(skip).limit(size).all()
-    
-    # 转换为响应格式
-    institution_list = []
-    for institution in institutions:
-        institution_dict = {
-            "id": institution.id,
-            "name": institution.name,
-            "code": institution.code,
-            "contact_person": institution.contact_person,
-            "phone": institution.phone,
-            "email": institution.email,
-            "address": institution.address,
-            "description": institution.description,
-            "status": institution.status,
-            "license_number": institution.license_number,
-            "business_scope": institution.business_scope,
-            "created_at": institution.created_at.isoformat() if institution.created_at else None,
-            "updated_at": institution.updated_at.isoformat() if institution.updated_at else None
-        }
-        institution_list.append(institution_dict)
+    institution_list = row_dicts(query.offset(skip).limit(size).all(), selected_fields)
     
     # 计算分页信息
     total_pages = (total + size - 1) // size
@@ -1,7 +1,10 @@
+import logging
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from src.routers import users, roles, permissions, exam_products, venues, candidates, schedules, public
-from src.routers import batch_operations, wx_miniprogram, qrcode_checkin, realtime, rbac
+from src.routers import batch_operations, wx_miniprogram, qrcode_checkin, realtime, rbac, import_jobs
+from src.routers import schedule_enhanced
 from src.institutions.router import router as institutions_router
 # from src.routers.mobile_checkin import router as mobile_checkin_router  # 暂时注释掉，因为移动端签到功能已经在schedules.py中实现
 from src.auth.social import router as social_router
@@ -14,12 +17,24 @@ from datetime import datetime
 from src.db.session import get_async_session
 from src.db.models import User
 from src.auth.fastapi_users_config import SQLAlchemyUserDatabase
+from src.services.candidate_import_job import candidate_import_job_service
+from src.core.event_bus import event_bus
+from src.core.http_cache import ConditionalGetMiddleware
+from src.core.responses import CompressionMiddleware, ORJSONResponse
+from src.core.executors import executor_metrics, shutdown_executors
+from src.services.public_board import public_board
+from src.services.queue_index import queue_index
+from src.services.venue_projection import venue_projection
+from src.services.wait_time import wait_time_estimator
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="考试系统后端API",
     version="1.0.0",
     debug=settings.DEBUG,
+    default_response_class=ORJSONResponse,
     openapi_tags=[
         {"name": "authentication", "description": "认证相关API"},
         {"name": "exam_products", "description": "考试产品管理"},
@@ -65,6 +80,18 @@ def custom_openapi():
 
 app.openapi = custom_openapi
 
+# 轮询接口的条件请求（路径规则及所依赖的数据表）
+# 响应随时间或排队进度变化的接口（如考生日程中的排队位置、预计等待时间）不能加入
+CONDITIONAL_GET_RULES = [
+    (r"^/venues(/|$)", ["venues"]),
+    (r"^/exam-products(/|$)", ["exam_products"]),
+    (r"^/candidates/(\d+)?$", ["candidates", "exam_products", "institutions"]),
+    (r"^/institutions(/|$)", ["institutions", "candidates", "schedules"]),
+    (r"^/schedules/enhanced/(timeline|statistics/daily)$", ["schedules", "candidates", "venues"]),
+]
+# 先于CORS添加，304响应同样带有CORS响应头
+app.add_middleware(ConditionalGetMiddleware, rules=CONDITIONAL_GET_RULES)
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -74,6 +101,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩（超过阈值的非流式响应）
+app.add_middleware(CompressionMiddleware)
+
 # 简化的用户模型
 class SimpleUser(BaseModel):
     username: str
@@ -110,6 +140,35 @@ app.include_router(wx_miniprogram.router)
 app.include_router(qrcode_checkin.router)
 app.include_router(realtime.router)
 app.include_router(rbac.router)
+app.include_router(import_jobs.router)
+app.include_router(schedule_enhanced.router)
+
+# 后台服务（按顺序启动、逆序停止）；各服务独立启动和停止，单个服务失败只记录日志，不影响其他服务
+BACKGROUND_SERVICES = [
+    ("事件总线", event_bus),
+    ("考生导入任务", candidate_import_job_service),
+    ("排队索引", queue_index),
+    ("等待时间估算", wait_time_estimator),
+    ("考场状态投影", venue_projection),
+    ("公共看板", public_board),
+]
+
+@app.on_event("startup")
+async def start_background_services():
+    for name, service in BACKGROUND_SERVICES:
+        try:
+            await service.start()
+        except Exception:
+            logger.exception(f"启动{name}失败")
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    for name, service in reversed(BACKGROUND_SERVICES):
+        try:
+            await service.stop()
+        except Exception:
+            logger.exception(f"停止{name}失败")
+    shutdown_executors()
 
 # 包含 FastAPI-Users 路由
 app.include_router(
@@ -173,16 +232,23 @@ async def health_check():
         "service": "Exam Site Backend API"
     }
 
+@app.get("/health/executors")
+async def executor_health():
+    """共享执行池指标（排队深度、等待时间等，按服务进程统计）"""
+    return executor_metrics()
+
+@app.get("/health/event-bus")
+async def event_bus_health():
+    """事件总线状态（后端、连接状态、本进程发布与接收的事件数）"""
+    return event_bus.metrics()
+
 @app.post("/simple-register")
 async def simple_register(user: SimpleUser):
     """简化的用户注册端点"""
     try:
         from src.db.session import async_session_maker
         from src.models.user import User
-        from passlib.context import CryptContext
-        
-        # 创建密码上下文
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        from src.core.security import get_password_hash_async
         
         async with async_session_maker() as session:
             # 检查用户是否已存在
@@ -195,7 +261,7 @@ async def simple_register(user: SimpleUser):
                 raise HTTPException(status_code=400, detail="邮箱已存在")
             
             # 创建新用户
-            hashed_password = pwd_context.hash(user.password)
+            hashed_password = await get_password_hash_async(user.password)
             
             new_user = User(
                 email=user.email,
@@ -238,10 +304,7 @@ async def simple_login(login_data: LoginRequest):
     """简化的登录端点，用于Swagger UI测试"""
     from src.db.session import async_session_maker
     from src.models.user import User
-    from passlib.context import CryptContext
-    
-    # 创建密码上下文
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    from src.core.security import verify_password_async
     
     try:
         async with async_session_maker() as session:
@@ -261,7 +324,7 @@ async def simple_login(login_data: LoginRequest):
                 raise HTTPException(status_code=401, detail="用户名或密码错误")
             
             # 验证密码
-            if not pwd_context.verify(login_data.password, user.hashed_password):
+            if not await verify_password_async(login_data.password, user.hashed_password):
                 raise HTTPException(status_code=401, detail="用户名或密码错误")
             
             # 生成JWT令牌，使用统一的配置
@@ -308,17 +371,14 @@ async def test_auth(current_user = Depends(security)):
 @app.post("/simple-login")
 async def simple_login_endpoint(login_data: LoginRequest):
     """简化的登录端点，用于测试"""
-    from passlib.context import CryptContext
-    
-    # 创建密码上下文
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    from src.core.security import get_password_hash_async, verify_password_async
     
     # 硬编码测试用户
     test_users = {
         "admin@exam.com": {
             "username": "admin",
             "email": "admin@exam.com",
-            "hashed_password": pwd_context.hash("admin123"),
+            "hashed_password": await get_password_hash_async("admin123"),
             "id": 1,
             "role_id": 1,
             "institution_id": None
@@ -332,7 +392,7 @@ async def simple_login_endpoint(login_data: LoginRequest):
             raise HTTPException(status_code=401, detail="用户名或密码错误")
         
         # 验证密码
-        if not pwd_context.verify(login_data.password, user_data["hashed_password"]):
+        if not await verify_password_async(login_data.password, user_data["hashed_password"]):
             raise HTTPException(status_code=401, detail="用户名或密码错误")
         
         # 生成JWT令牌，使用统一的配置
@@ -5,4 +5,5 @@ from .exam_product import ExamProduct
 from .venue import Venue
 from .candidate import Candidate
 from .schedule import Schedule
+from .candidate_import import CandidateImportStaging, CandidateImportJob
 from src.institutions.models import Institution
@@ -1,7 +1,8 @@
 from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from src.db.base import Base
+from src.core.security import hash_id_number
 import enum
 
 class CandidateStatus(enum.Enum):
@@ -18,7 +19,8 @@ class Candidate(Base):
     
     # 基本信息
     name = Column(String(50), nullable=False, comment="考生姓名")
-    id_number = Column(String(18), nullable=False, comment="身份证号")
+    id_number = Column(String(18), nullable=False, index=True, comment="身份证号")
+    id_number_hash = Column(String(64), nullable=True, index=True, comment="身份证号哈希（登录查询）")
     phone = Column(String(20), nullable=False, comment="联系电话")
     email = Column(String(100), nullable=True, comment="邮箱")
     gender = Column(String(10), nullable=True, comment="性别")
@@ -42,4 +44,10 @@ class Candidate(Base):
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False, comment="创建人ID")
     
     # 兼容字段（为了向后兼容）
-    id_card = Column(String(18), nullable=False, comment="身份证号") 
\ No newline at end of file
+    id_card = Column(String(18), nullable=False, comment="身份证号")
+
+    @validates("id_number")
+    def _set_id_number_hash(self, key, id_number):
+        """设置身份证号时同步更新哈希"""
+        self.id_number_hash = hash_id_number(id_number) if id_number else None
+        return id_number
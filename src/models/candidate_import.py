@@ -0,0 +1,74 @@
+"""
+考生批量导入相关模型
+暂存表用于分批写入考生数据，写入失败时已暂存的数据可回滚或续传
+导入任务表记录后台导入任务的进度和历史
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, ForeignKey, JSON
+from sqlalchemy.sql import func
+from src.db.base import Base
+
+
+class ImportJobStatus:
+    """导入任务状态"""
+    PENDING = "排队中"
+    VALIDATING = "验证中"
+    IMPORTING = "导入中"
+    COMPLETED = "已完成"
+    FAILED = "失败"
+
+    # 未结束的状态，服务重启后需要恢复
+    UNFINISHED = (PENDING, VALIDATING, IMPORTING)
+
+
+class CandidateImportStaging(Base):
+    __tablename__ = "candidate_import_staging"
+
+    id = Column(Integer, primary_key=True, index=True)
+    batch_id = Column(String(32), nullable=False, comment="导入批次ID")
+    row_number = Column(Integer, nullable=False, comment="Excel行号")
+    name = Column(String(50), nullable=False, comment="考生姓名")
+    id_number = Column(String(18), nullable=False, index=True, comment="身份证号")
+    id_number_hash = Column(String(64), nullable=True, comment="身份证号哈希")
+    phone = Column(String(20), nullable=False, comment="联系电话")
+    email = Column(String(100), nullable=True, comment="邮箱")
+    gender = Column(String(10), nullable=True, comment="性别")
+    birth_date = Column(DateTime, nullable=True, comment="出生日期")
+    exam_product_id = Column(Integer, nullable=False, comment="考试产品ID")
+    notes = Column(Text, nullable=True, comment="备注")
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
+
+    __table_args__ = (
+        Index("ix_candidate_import_staging_batch_row", "batch_id", "row_number"),
+    )
+
+    def __repr__(self):
+        return f"<CandidateImportStaging(batch={self.batch_id}, row={self.row_number}, id_number='{self.id_number}')>"
+
+
+class CandidateImportJob(Base):
+    __tablename__ = "candidate_import_jobs"
+
+    # 任务ID同时作为暂存表的批次ID
+    id = Column(String(32), primary_key=True, comment="任务ID")
+    institution_id = Column(Integer, ForeignKey("institutions.id"), nullable=False, index=True, comment="所属机构ID")
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False, comment="创建人ID")
+    file_name = Column(String(255), nullable=False, comment="上传文件名")
+    file_path = Column(String(500), nullable=True, comment="上传文件保存路径")
+
+    status = Column(String(20), nullable=False, default=ImportJobStatus.PENDING, comment="任务状态")
+    total_rows = Column(Integer, nullable=False, default=0, comment="总行数")
+    valid_count = Column(Integer, nullable=False, default=0, comment="有效行数")
+    imported_count = Column(Integer, nullable=False, default=0, comment="已导入行数")
+    error_count = Column(Integer, nullable=False, default=0, comment="错误数")
+    errors = Column(JSON, nullable=True, comment="错误信息")
+    warnings = Column(JSON, nullable=True, comment="警告信息")
+    message = Column(Text, nullable=True, comment="结果说明")
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="创建时间")
+    started_at = Column(DateTime(timezone=True), nullable=True, comment="开始处理时间")
+    finished_at = Column(DateTime(timezone=True), nullable=True, comment="结束时间")
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True, comment="最近一次进度更新时间")
+
+    def __repr__(self):
+        return f"<CandidateImportJob(id={self.id}, status='{self.status}', imported={self.imported_count}/{self.valid_count})>"
@@ -40,6 +40,8 @@ class Schedule(Base):
     status = Column(String(20), nullable=True, comment="状态")
     check_in_status = Column(String(20), nullable=True, comment="签到状态")
     check_in_time = Column(DateTime, nullable=True, comment="扫码签到时间")
+    check_in_nonce = Column(String(8), nullable=True, comment="签到所用二维码随机数（幂等键）")
+    check_in_by = Column(Integer, ForeignKey("users.id"), nullable=True, comment="签到操作人ID")
     
     # 排队信息
     queue_position = Column(Integer, nullable=True, comment="排队位置")
@@ -2,13 +2,18 @@
 批量操作API路由
 支持Excel导入考生、批量排期等批量操作功能
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Depends
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Depends, Request, Response
 from typing import Optional, List, Dict, Any
 from datetime import datetime, date, time, timedelta
 from pydantic import BaseModel
-import io
-import json
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.session import get_async_session
+from src.core.rbac import require_permission, Permission
+from src.core.http_cache import make_etag, is_not_modified
+from src.services.candidate_import import candidate_import_service
+from src.services.candidate_import_job import candidate_import_job_service
+from src.db.models import User
 
 router = APIRouter(
     prefix="/batch",
@@ -46,54 +51,22 @@ class BatchScheduleRequest(BaseModel):
 # ===== Excel模板和导入功能 =====
 
 @router.get("/candidates/template")
-async def download_candidate_template():
+async def download_candidate_template(
+    request: Request,
+    db: AsyncSession = Depends(get_async_session)
+):
     """下载考生导入Excel模板"""
     
-    # 模拟Excel模板内容 (实际应用中应生成真实的Excel文件)
-    template_data = {
-        "template_info": {
-            "version": "v1.0",
-            "created_date": datetime.now().isoformat(),
-            "description": "考生批量导入模板"
-        },
-        "required_columns": [
-            "考生姓名",
-            "身份证号", 
-            "联系电话",
-            "考试产品名称"
-        ],
-        "sample_data": [
-            {
-                "考生姓名": "张三",
-                "身份证号": "110101199001011234",
-                "联系电话": "13800138001",
-                "考试产品名称": "无人机驾驶员考试"
-            },
-            {
-                "考生姓名": "李四", 
-                "身份证号": "110101199002021234",
-                "联系电话": "13800138002",
-                "考试产品名称": "航拍摄影师认证"
-            }
-        ],
-        "instructions": [
-            "1. 请严格按照模板格式填写考生信息",
-            "2. 身份证号必须为18位有效号码",
-            "3. 考试产品名称必须与系统中已有产品匹配",
-            "4. 联系电话为可选项",
-            "5. 保存为.xlsx格式后上传"
-        ]
-    }
-    
-    # 生成模拟Excel文件内容
-    excel_content = json.dumps(template_data, ensure_ascii=False, indent=2)
-    excel_bytes = excel_content.encode('utf-8')
+    version, template_data = await candidate_import_service.get_template(db)
+    etag = make_etag(version)
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
     
-    # 返回模板文件
-    return StreamingResponse(
-        io.BytesIO(excel_bytes),
+    return Response(
+        template_data,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={
+            "ETag": etag,
             "Content-Disposition": "attachment; filename=candidates_import_template.xlsx"
         }
     )
@@ -206,61 +179,22 @@ async def import_candidates_from_excel(
 async def get_import_history(
     institution_id: Optional[int] = Query(None, description="机构ID筛选"),
     page: int = Query(1, ge=1),
-    size: int = Query(10, ge=1, le=100)
+    size: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(require_permission(Permission.CANDIDATE_BATCH_IMPORT))
 ):
     """获取导入历史记录"""
     
-    # 模拟导入历史数据
-    mock_history = [
-        {
-            "id": 1,
-            "institution_id": 1,
-            "institution_name": "北京航空培训中心",
-            "file_name": "candidates_batch_20250803.xlsx",
-            "total_rows": 45,
-            "success_count": 42,
-            "failed_count": 3,
-            "import_time": "2025-08-03T09:30:00",
-            "operator": "张经理"
-        },
-        {
-            "id": 2,
-            "institution_id": 2,
-            "institution_name": "上海飞行学院", 
-            "file_name": "new_students_20250802.xlsx",
-            "total_rows": 23,
-            "success_count": 23,
-            "failed_count": 0,
-            "import_time": "2025-08-02T14:15:00",
-            "operator": "李主任"
-        },
-        {
-            "id": 3,
-            "institution_id": 1,
-            "institution_name": "北京航空培训中心",
-            "file_name": "补录学员_20250801.xlsx", 
-            "total_rows": 12,
-            "success_count": 10,
-            "failed_count": 2,
-            "import_time": "2025-08-01T16:45:00",
-            "operator": "张经理"
-        }
-    ]
-    
-    # 应用筛选
-    filtered_history = mock_history
-    if institution_id:
-        filtered_history = [h for h in filtered_history if h["institution_id"] == institution_id]
+    # 机构用户只能查看本机构的导入记录
+    if current_user.institution_id:
+        institution_id = current_user.institution_id
     
-    # 分页
-    total = len(filtered_history)
-    start = (page - 1) * size
-    end = start + size
-    history_page = filtered_history[start:end]
+    history = await candidate_import_job_service.list_jobs(db, institution_id, page, size)
+    total = history["total"]
     
     return {
         "message": "导入历史记录查询成功",
-        "data": history_page,
+        "data": history["items"],
         "pagination": {
             "page": page,
             "size": size,
@@ -269,8 +203,8 @@ async def get_import_history(
         },
         "summary": {
             "total_imports": total,
-            "total_candidates_imported": sum(h["success_count"] for h in filtered_history),
-            "recent_import": max(h["import_time"] for h in filtered_history) if filtered_history else None
+            "total_candidates_imported": history["total_imported"],
+            "recent_import": history["recent_import"]
         }
     }
 
@@ -1,9 +1,7 @@
-﻿from fastapi import APIRouter, Query, Depends, HTTPException, UploadFile, File, status
-from fastapi.responses import StreamingResponse
+﻿from fastapi import APIRouter, Query, Depends, HTTPException, UploadFile, File, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, func
 from typing import Optional, List
-import io
 from datetime import datetime
 
 from src.db.session import get_async_session
@@ -11,7 +9,11 @@ from src.models.candidate import Candidate
 from src.models.exam_product import ExamProduct
 from src.schemas.candidate import CandidateCreate, CandidateRead, CandidateUpdate
 from src.core.rbac import require_permission, Permission, check_institution_access
+from src.core.fields import FIELDS_QUERY, model_columns, parse_fields, row_dicts
+from src.core.http_cache import make_etag, is_not_modified, content_disposition
+from src.core.responses import ORJSONResponse
 from src.services.candidate_import import candidate_import_service
+from src.services.candidate_import_job import candidate_import_job_service
 from src.db.models import User
 from src.auth.fastapi_users_config import current_active_user
 
@@ -20,6 +22,11 @@ router = APIRouter(
     tags=["candidates"],
 )
 
+# 列表接口可返回的字段
+CANDIDATE_LIST_FIELDS = (
+    "id", "name", "id_number", "phone", "gender", "status", "exam_product_id", "institution_id", "created_at"
+)
+
 @router.get("/")
 async def get_candidates(
     page: int = Query(1, description="页码", ge=1),
@@ -28,14 +35,17 @@ async def get_candidates(
     exam_type: Optional[str] = Query(None, description="考试类型筛选"),
     gender: Optional[str] = Query(None, description="性别筛选"),
     institution_id: Optional[int] = Query(None, description="机构ID筛选"),
+    fields: Optional[str] = FIELDS_QUERY,
     db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(require_permission(Permission.CANDIDATE_READ))
 ):
     """获取考生列表"""
     
+    selected_fields = parse_fields(fields, CANDIDATE_LIST_FIELDS) or CANDIDATE_LIST_FIELDS
+    
     try:
-        # 构建查询条件
-        query = select(Candidate)
+        # 构建查询条件，只查询需要返回的列
+        query = select(*model_columns(Candidate, selected_fields))
         
         # 数据权限控制：机构用户只能查看本机构的考生
         if hasattr(current_user, 'institution_id') and current_user.institution_id:
@@ -63,26 +73,11 @@ async def get_candidates(
         offset = (page - 1) * size
         paginated_query = query.offset(offset).limit(size)
         
-        # 执行查询
+        # 执行查询并转换为响应格式
         result = await db.execute(paginated_query)
-        candidates = result.scalars().all()
+        candidates_data = row_dicts(result.all(), selected_fields)
         
-        # 转换为响应格式
-        candidates_data = []
-        for candidate in candidates:
-            candidates_data.append({
-                "id": candidate.id,
-                "name": candidate.name,
-                "id_number": candidate.id_number,
-                "phone": candidate.phone,
-                "gender": candidate.gender,
-                "status": candidate.status,
-                "exam_product_id": candidate.exam_product_id,
-                "institution_id": candidate.institution_id,
-                "created_at": candidate.created_at.isoformat() if candidate.created_at else None
-            })
-        
-        return {
+        return ORJSONResponse({
             "message": "考生列表查询成功",
             "data": candidates_data,
             "pagination": {
@@ -91,7 +86,7 @@ async def get_candidates(
                 "total": total,
                 "pages": (total + size - 1) // size
             }
-        }
+        })
         
     except Exception as e:
         # 如果数据库查询失败，返回模拟数据以确保系统可用性
@@ -133,7 +128,10 @@ async def get_candidates(
         total = len(filtered_candidates)
         start = (page - 1) * size
         end = start + size
-        candidates_page = filtered_candidates[start:end]
+        candidates_page = [
+            {field: candidate[field] for field in selected_fields}
+            for candidate in filtered_candidates[start:end]
+        ]
         
         return {
             "message": "考生列表查询成功（使用模拟数据）",
@@ -200,16 +198,24 @@ async def get_candidate_by_id(
 
 @router.get("/template/download")
 async def download_import_template(
+    request: Request,
+    db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(require_permission(Permission.CANDIDATE_BATCH_IMPORT))
 ):
     """下载考生导入Excel模板"""
     
-    template_data = await candidate_import_service.generate_template()
+    version, template_data = await candidate_import_service.get_template(db)
+    etag = make_etag(version)
+    if is_not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
     
-    return StreamingResponse(
-        io.BytesIO(template_data),
+    return Response(
+        template_data,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=考生导入模板.xlsx"}
+        headers={
+            "ETag": etag,
+            "Content-Disposition": content_disposition("考生导入模板.xlsx")
+        }
     )
 
 @router.post("/batch-import")
@@ -218,7 +224,7 @@ async def batch_import_candidates(
     db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(require_permission(Permission.CANDIDATE_BATCH_IMPORT))
 ):
-    """批量导入考生"""
+    """批量导入考生（提交后台导入任务，通过 /import-jobs/{job_id} 查询进度）"""
     
     # 验证用户是否属于机构
     if not current_user.institution_id:
@@ -230,13 +236,14 @@ async def batch_import_candidates(
     # 验证文件格式
     await candidate_import_service.validate_excel_file(file)
     
-    # 解析Excel文件
-    df = await candidate_import_service.parse_excel_file(file)
+    # 创建导入任务，由后台工作协程验证并写入
+    job = await candidate_import_job_service.submit(file, db, current_user)
     
-    # 执行批量导入
-    result = await candidate_import_service.import_candidates_batch(df, db, current_user)
-    
-    return result
+    return {
+        "message": "导入任务已提交",
+        "job_id": job.id,
+        "status": job.status
+    }
 
 @router.post("/")
 async def create_candidate(
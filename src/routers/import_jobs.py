@@ -0,0 +1,43 @@
+"""
+考生导入任务API路由
+查询后台导入任务的进度、结果，以及续传中断的任务
+"""
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.session import get_async_session
+from src.core.rbac import require_permission, Permission
+from src.services.candidate_import_job import candidate_import_job_service
+from src.db.models import User
+
+router = APIRouter(
+    prefix="/import-jobs",
+    tags=["import_jobs"],
+)
+
+
+@router.get("/{job_id}")
+async def get_import_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(require_permission(Permission.CANDIDATE_BATCH_IMPORT))
+):
+    """查询导入任务进度、行数统计和错误信息"""
+    job = await candidate_import_job_service.get_job(db, job_id, current_user)
+    return candidate_import_job_service.job_to_dict(job)
+
+
+@router.post("/{job_id}/resume")
+async def resume_import_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(require_permission(Permission.CANDIDATE_BATCH_IMPORT))
+):
+    """从最后提交的批次继续执行中断的导入任务"""
+    job = await candidate_import_job_service.get_job(db, job_id, current_user)
+    job = await candidate_import_job_service.resume(db, job)
+    return {
+        "message": "导入任务已重新提交",
+        "job_id": job.id,
+        "status": job.status
+    }
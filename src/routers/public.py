@@ -1,6 +1,8 @@
 ﻿from fastapi import APIRouter
 from datetime import datetime
 
+from src.services.venue_projection import venue_projection
+
 router = APIRouter(prefix="/public", tags=["public"])
 
 @router.get("/institutions")
@@ -20,11 +22,15 @@ async def get_venues_status():
     """获取考场状态 - 公共API"""
     return [
         {
-            "id": 1,
-            "name": "北京考场1",
-            "type": "理论考场",
-            "status": "active"
+            "id": venue["venue_id"],
+            "name": venue["venue_name"],
+            "type": venue["venue_type"],
+            "status": venue["status"],
+            "current_candidate": venue["current_candidate"],
+            "waiting_count": venue["waiting_count"],
+            "next_start_time": venue["next_start_time"]
         }
+        for venue in venue_projection.venue_states().values()
     ]
 
 @router.get("/exam-products")
@@ -2,14 +2,24 @@
 二维码和签到相关API路由
 支持二维码生成、扫码签到、排队状态查询等功能
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Dict, Any, Optional
-from pydantic import BaseModel
+from typing import Dict, Any, List, Optional
+from pydantic import BaseModel, Field
+from datetime import datetime, date
 
 from src.db.session import get_async_session
 from src.core.rbac import require_permission, Permission
+from src.core.http_cache import make_etag, is_not_modified
+from src.core.responses import ORJSONResponse
 from src.services.qrcode_service import qrcode_service
+from src.services.qrcode_batch import qrcode_batch_service
+from src.services.candidate_login import candidate_login_service
+from src.core.rate_limit import client_ip
+from src.services.queue_index import queue_index
+from src.services.checkin_sync import checkin_sync_service
+from src.services.wait_time import wait_time_estimator
 from src.db.models import User
 from src.auth.fastapi_users_config import current_active_user
 
@@ -146,52 +156,38 @@ class ScanRequest(BaseModel):
 class CandidateLoginRequest(BaseModel):
     id_number: str
 
+class OfflineScan(BaseModel):
+    qr_data: str
+    scanned_at: datetime  # 设备扫码时间，不带时区时按UTC处理
+
+class ScanSyncRequest(BaseModel):
+    device_id: Optional[str] = None
+    scans: List[OfflineScan] = Field(..., max_length=500)
+
 # ===== 考生端接口 =====
 
 @router.post("/candidate/login")
 async def candidate_login_by_id_number(
     login_request: CandidateLoginRequest,
+    request: Request,
     db: AsyncSession = Depends(get_async_session)
 ):
     """考生通过身份证号登录（简化登录）"""
-    
-    from src.models.candidate import Candidate
-    from sqlalchemy import select
-    
-    # 查找考生
-    result = await db.execute(
-        select(Candidate).where(Candidate.id_number == login_request.id_number)
+    login = await candidate_login_service.login(
+        db, login_request.id_number, client_ip(request)
     )
-    candidate = result.scalar_one_or_none()
-    
-    if not candidate:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="考生不存在，请联系机构确认报名信息"
-        )
-    
-    # 生成简单的临时token（实际项目中应该使用JWT）
-    import hashlib
-    import time
-    timestamp = str(int(time.time()))
-    token_raw = f"{candidate.id}_{candidate.id_number}_{timestamp}"
-    token = hashlib.md5(token_raw.encode()).hexdigest()
-    
     return {
         "message": "登录成功",
-        "candidate": {
-            "id": candidate.id,
-            "name": candidate.name,
-            "id_number": candidate.id_number,
-            "status": candidate.status
-        },
-        "access_token": token,
-        "token_type": "bearer"
+        "candidate": candidate_login_service.candidate_info(login["candidate"]),
+        "access_token": login["access_token"],
+        "token_type": login["token_type"],
+        "expires_in": login["expires_in"]
     }
 
 @router.get("/candidate/{candidate_id}/qrcode")
 async def get_candidate_qrcode(
     candidate_id: int,
+    include_image: bool = Query(True, description="是否返回Base64图像，轮询时可关闭并改用图像接口"),
     db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(current_active_user)
 ):
@@ -200,13 +196,71 @@ async def get_candidate_qrcode(
     # 简单的权限检查：考生只能获取自己的二维码
     # 实际项目中应该通过proper的认证机制
     
-    qr_result = await qrcode_service.generate_candidate_qrcode(db, candidate_id)
+    qr_result = await qrcode_service.generate_candidate_qrcode(db, candidate_id, include_image)
     
     return {
         "message": "考生二维码生成成功",
+        "qr_image_url": f"/qrcode/candidate/{candidate_id}/qrcode/image",
         **qr_result
     }
 
+@router.get("/candidate/{candidate_id}/qrcode/image")
+async def get_candidate_qrcode_image(
+    candidate_id: int,
+    request: Request,
+    format: str = Query("png", pattern="^(png|svg)$", description="图像格式：png 或 svg"),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(current_active_user)
+):
+    """获取考生二维码图像（原始PNG/SVG字节，支持ETag缓存）"""
+    
+    qr_result = await qrcode_service.generate_candidate_qrcode(db, candidate_id, include_image=False)
+    digest, content = await qrcode_service.render_qr_image(qr_result["qr_token"], format)
+    
+    # 令牌重新签发前图像不变，客户端可直接使用缓存
+    etag = make_etag(digest)
+    expires_at = datetime.fromisoformat(qr_result["qr_data"]["expires_at"])
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={qrcode_service.token_refresh_seconds(expires_at)}"
+    }
+    if is_not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    media_type = "image/svg+xml" if format == "svg" else "image/png"
+    return Response(content, media_type=media_type, headers=headers)
+
+@router.get("/batch/slips")
+async def download_batch_slips(
+    exam_date: date = Query(..., description="考试日期"),
+    venue_id: Optional[int] = Query(None, description="考场ID筛选"),
+    institution_id: Optional[int] = Query(None, description="机构ID筛选"),
+    format: str = Query("pdf", pattern="^(pdf|zip)$", description="pdf：准考证（每页8张）；zip：二维码PNG"),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(require_permission(Permission.SCHEDULE_BATCH_MANAGE))
+):
+    """批量生成考试日准考证/签到二维码（进程池渲染，流式输出）"""
+    
+    if current_user.institution_id:
+        institution_id = current_user.institution_id
+    
+    slips = await qrcode_batch_service.load_slips(db, exam_date, venue_id, institution_id)
+    if not slips:
+        raise HTTPException(status_code=404, detail="该日期没有需要生成二维码的排期")
+    
+    if format == "zip":
+        return StreamingResponse(
+            qrcode_batch_service.iter_zip(slips),
+            media_type="application/zip",
+            headers={"Content-Disposition": f"attachment; filename=qrcodes_{exam_date}.zip"}
+        )
+    
+    return StreamingResponse(
+        qrcode_batch_service.iter_pdf(slips),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename=admission_slips_{exam_date}.pdf"}
+    )
+
 @router.get("/candidate/{candidate_id}/schedule")
 async def get_candidate_schedule(
     candidate_id: int,
@@ -246,6 +300,8 @@ async def get_candidate_schedule(
         )
         exam_product = exam_product_result.scalar_one_or_none()
         
+        queue_position = queue_index.ensure(schedule)
+        
         schedule_list.append({
             "id": schedule.id,
             "scheduled_date": schedule.scheduled_date.isoformat(),
@@ -263,8 +319,10 @@ async def get_candidate_schedule(
                 "id": exam_product.id if exam_product else None,
                 "name": exam_product.name if exam_product else "未知考试"
             },
-            "queue_position": schedule.queue_position,
-            "estimated_wait_time": schedule.estimated_wait_time
+            "queue_position": queue_position,
+            "estimated_wait_time": wait_time_estimator.estimate_wait(
+                queue_position, schedule.venue_id, schedule.exam_product_id, schedule.schedule_type
+            )
         })
     
     return {
@@ -305,6 +363,42 @@ async def scan_qrcode_checkin(
     
     return result
 
+@router.post("/staff/sync")
+async def sync_offline_scans(
+    sync_request: ScanSyncRequest,
+    db: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(require_permission(Permission.CHECKIN_SCAN))
+):
+    """批量同步离线扫码记录（幂等，同一排期以最早扫码时间为准）"""
+    
+    result = await checkin_sync_service.apply_scans(
+        db, [(scan.qr_data, scan.scanned_at) for scan in sync_request.scans], current_user
+    )
+    
+    return {
+        "message": "离线签到同步完成",
+        "device_id": sync_request.device_id,
+        **result
+    }
+
+@router.get("/staff/roster")
+async def get_venue_roster(
+    request: Request,
+    venue_id: int = Query(..., description="考场ID"),
+    exam_date: date = Query(..., description="考试日期"),
+    db: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(require_permission(Permission.CHECKIN_SCAN))
+):
+    """下载考场当日名单，供扫码设备离线核对（支持ETag）"""
+    
+    roster = await checkin_sync_service.build_roster(db, venue_id, exam_date)
+    
+    etag = make_etag(roster["version"])
+    if is_not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    return ORJSONResponse(roster, headers={"ETag": etag})
+
 @router.get("/staff/checkin-history")
 async def get_checkin_history(
     limit: int = 50,
@@ -379,14 +473,21 @@ async def get_current_queue_status(
     from src.models.candidate import Candidate
     from src.models.venue import Venue
     from sqlalchemy import select, and_
-    from datetime import datetime, date
-    
-    # 构建查询条件
-    query = select(Schedule).where(
-        and_(
-            Schedule.scheduled_date == date.today(),
-            Schedule.check_in_status == "not_checked_in",
-            Schedule.start_time > datetime.utcnow()
+    from datetime import datetime, date, timedelta
+    
+    # 一次查询取得排期及其考场、考生信息
+    today = date.today()
+    query = (
+        select(Schedule, Venue, Candidate.name, Candidate.id_number)
+        .outerjoin(Venue, Venue.id == Schedule.venue_id)
+        .outerjoin(Candidate, Candidate.id == Schedule.candidate_id)
+        .where(
+            and_(
+                Schedule.scheduled_date >= today,
+                Schedule.scheduled_date < today + timedelta(days=1),
+                Schedule.check_in_status == "not_checked_in",
+                Schedule.start_time > datetime.utcnow()
+            )
         )
     )
     
@@ -396,23 +497,10 @@ async def get_current_queue_status(
     query = query.order_by(Schedule.start_time)
     
     result = await db.execute(query)
-    schedules = result.scalars().all()
     
     # 按场地分组
     venue_queues = {}
-    for schedule in schedules:
-        # 获取场地信息
-        venue_result = await db.execute(
-            select(Venue).where(Venue.id == schedule.venue_id)
-        )
-        venue = venue_result.scalar_one_or_none()
-        
-        # 获取考生信息
-        candidate_result = await db.execute(
-            select(Candidate).where(Candidate.id == schedule.candidate_id)
-        )
-        candidate = candidate_result.scalar_one_or_none()
-        
+    for schedule, venue, candidate_name, candidate_id_number in result.all():
         venue_key = f"{venue.name}_{venue.id}" if venue else f"未知场地_{schedule.venue_id}"
         
         if venue_key not in venue_queues:
@@ -425,8 +513,8 @@ async def get_current_queue_status(
         
         venue_queues[venue_key]["queue"].append({
             "schedule_id": schedule.id,
-            "candidate_name": candidate.name if candidate else "未知",
-            "candidate_id_number": candidate.id_number if candidate else "未知",
+            "candidate_name": candidate_name or "未知",
+            "candidate_id_number": candidate_id_number or "未知",
             "schedule_type": schedule.schedule_type,
             "start_time": schedule.start_time.isoformat(),
             "queue_position": len(venue_queues[venue_key]["queue"]) + 1
@@ -434,7 +522,7 @@ async def get_current_queue_status(
     
     return {
         "message": "当前排队状态",
-        "date": date.today().isoformat(),
+        "date": today.isoformat(),
         "update_time": datetime.utcnow().isoformat(),
         "venue_queues": list(venue_queues.values())
     }
@@ -445,43 +533,43 @@ async def get_current_queue_status(
 async def get_public_dashboard(
     db: AsyncSession = Depends(get_async_session)
 ):
-    """公共考场看板（无需认证）"""
+    """公共考场看板（无需认证），查询次数与考场和考生数量无关"""
     
     from src.models.schedule import Schedule
     from src.models.candidate import Candidate
     from src.models.venue import Venue
-    from sqlalchemy import select, and_, func
-    from datetime import datetime, date
+    from sqlalchemy import select, and_, func, case
+    from datetime import datetime, date, timedelta
+    
+    now = datetime.utcnow()
+    today = date.today()
+    is_today = and_(
+        Schedule.scheduled_date >= today,
+        Schedule.scheduled_date < today + timedelta(days=1)
+    )
     
-    # 获取正在进行的考试
-    ongoing_query = select(Schedule).where(
-        and_(
-            Schedule.scheduled_date == date.today(),
-            Schedule.start_time <= datetime.utcnow(),
-            Schedule.end_time > datetime.utcnow(),
-            Schedule.check_in_status == "checked_in"
+    # 获取正在进行的考试（连同考场和考生姓名）
+    ongoing_query = (
+        select(Schedule, Venue, Candidate.name)
+        .outerjoin(Venue, Venue.id == Schedule.venue_id)
+        .outerjoin(Candidate, Candidate.id == Schedule.candidate_id)
+        .where(
+            and_(
+                is_today,
+                Schedule.start_time <= now,
+                Schedule.end_time > now,
+                Schedule.check_in_status == "checked_in"
+            )
         )
     )
     
     ongoing_result = await db.execute(ongoing_query)
-    ongoing_schedules = ongoing_result.scalars().all()
+    ongoing_schedules = ongoing_result.all()
     
     # 按场地组织数据
     venue_status = {}
     
-    for schedule in ongoing_schedules:
-        # 获取场地信息
-        venue_result = await db.execute(
-            select(Venue).where(Venue.id == schedule.venue_id)
-        )
-        venue = venue_result.scalar_one_or_none()
-        
-        # 获取考生信息（脱敏）
-        candidate_result = await db.execute(
-            select(Candidate).where(Candidate.id == schedule.candidate_id)
-        )
-        candidate = candidate_result.scalar_one_or_none()
-        
+    for schedule, venue, candidate_name in ongoing_schedules:
         venue_key = f"venue_{schedule.venue_id}"
         
         if venue_key not in venue_status:
@@ -494,7 +582,7 @@ async def get_public_dashboard(
             }
         
         # 设置当前考试信息（脱敏显示）
-        candidate_name = candidate.name if candidate else "未知"
+        candidate_name = candidate_name or "未知"
         masked_name = candidate_name[0] + "*" if len(candidate_name) > 1 else candidate_name
         
         venue_status[venue_key]["current_exam"] = {
@@ -504,49 +592,40 @@ async def get_public_dashboard(
             "estimated_end_time": schedule.end_time.strftime("%H:%M")
         }
     
-    # 计算等待人数
-    for venue_key in venue_status:
-        venue_id = venue_status[venue_key]["venue_id"]
-        
-        # 查询该场地今日待签到的人数
-        waiting_query = select(func.count(Schedule.id)).where(
-            and_(
-                Schedule.venue_id == venue_id,
-                Schedule.scheduled_date == date.today(),
-                Schedule.check_in_status == "not_checked_in",
-                Schedule.start_time > datetime.utcnow()
+    # 各场地今日待签到人数（一次分组查询）
+    if venue_status:
+        waiting_query = (
+            select(Schedule.venue_id, func.count(Schedule.id))
+            .where(
+                and_(
+                    is_today,
+                    Schedule.venue_id.in_([status["venue_id"] for status in venue_status.values()]),
+                    Schedule.check_in_status == "not_checked_in",
+                    Schedule.start_time > now
+                )
             )
+            .group_by(Schedule.venue_id)
         )
-        
         waiting_result = await db.execute(waiting_query)
-        waiting_count = waiting_result.scalar() or 0
-        venue_status[venue_key]["waiting_count"] = waiting_count
+        for venue_id, waiting_count in waiting_result.all():
+            venue_status[f"venue_{venue_id}"]["waiting_count"] = waiting_count
     
     # 获取今日整体统计
-    total_today_query = select(func.count(Schedule.id)).where(
-        Schedule.scheduled_date == date.today()
-    )
-    total_today_result = await db.execute(total_today_query)
-    total_today = total_today_result.scalar() or 0
-    
-    completed_today_query = select(func.count(Schedule.id)).where(
-        and_(
-            Schedule.scheduled_date == date.today(),
-            Schedule.status == "completed"
-        )
-    )
-    completed_today_result = await db.execute(completed_today_query)
-    completed_today = completed_today_result.scalar() or 0
+    stats_query = select(
+        func.count(Schedule.id),
+        func.coalesce(func.sum(case((Schedule.status == "completed", 1), else_=0)), 0)
+    ).where(is_today)
+    total_today, completed_today = (await db.execute(stats_query)).one()
     
-    return {
+    return ORJSONResponse({
         "message": "公共考场看板",
-        "update_time": datetime.utcnow().isoformat(),
-        "date": date.today().isoformat(),
+        "update_time": now.isoformat(),
+        "date": today.isoformat(),
         "overall_stats": {
-            "total_schedules_today": total_today,
-            "completed_today": completed_today,
+            "total_schedules_today": total_today or 0,
+            "completed_today": int(completed_today or 0),
             "ongoing_exams": len(ongoing_schedules),
             "active_venues": len(venue_status)
         },
         "venues": list(venue_status.values())
-    }
\ No newline at end of file
+    })
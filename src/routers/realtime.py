@@ -2,11 +2,26 @@
 实时功能API路由
 提供实时排队状态、公共看板等实时信息服务
 """
-from fastapi import APIRouter, Query, HTTPException
+import asyncio
+
+from fastapi import APIRouter, Depends, Query, HTTPException, Header, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from typing import Optional, List, Dict, Any
-from datetime import datetime, time
+from datetime import datetime
 from pydantic import BaseModel
 
+from src.core.auth import verify_candidate_token
+from src.dependencies.auth import candidate_bearer, get_current_candidate_id
+from src.core.responses import ORJSONResponse
+from src.db.session import async_session_maker
+from src.services.candidate_channel import CandidateConnection, candidate_channel
+from src.services.public_board import format_event, public_board, summarize
+from src.services.qrcode_batch import SCHEDULE_TYPE_NAMES
+from src.services.queue_index import queue_index
+from src.services.venue_projection import venue_projection
+from src.services.wait_time import wait_time_estimator
+
 router = APIRouter(
     prefix="/realtime",
     tags=["realtime"],
@@ -39,119 +54,85 @@ class PublicBoardData(BaseModel):
     summary: Dict[str, Any]
     last_updated: str
 
-# ===== 模拟实时数据 =====
+# ===== 考场状态（来自考场状态投影，不访问数据库） =====
 
-def get_mock_venue_statuses():
-    """获取模拟的考场状态数据"""
-    return [
-        {
-            "venue_id": 1,
-            "venue_name": "理论考场A",
-            "venue_type": "理论考试",
-            "status": "active",
-            "current_candidate": "张*",
-            "waiting_count": 8,
-            "next_start_time": "09:15:00",
-            "current_exam": "无人机驾驶员理论考试",
-            "progress": "进行中 (还剩45分钟)"
-        },
-        {
-            "venue_id": 2,
-            "venue_name": "理论考场B", 
-            "venue_type": "理论考试",
-            "status": "active",
-            "current_candidate": "李*",
-            "waiting_count": 5,
-            "next_start_time": "09:30:00",
-            "current_exam": "航拍摄影师理论考试",
-            "progress": "进行中 (还剩30分钟)"
-        },
-        {
-            "venue_id": 3,
-            "venue_name": "实操场地1",
-            "venue_type": "实操考试", 
-            "status": "active",
-            "current_candidate": "王*",
-            "waiting_count": 12,
-            "next_start_time": "09:05:00",
-            "current_exam": "多旋翼实操考试",
-            "progress": "进行中 (还剩8分钟)"
-        },
-        {
-            "venue_id": 4,
-            "venue_name": "实操场地2",
-            "venue_type": "实操考试",
-            "status": "maintenance",
-            "current_candidate": None,
-            "waiting_count": 0,
-            "next_start_time": None,
-            "current_exam": "设备维护中",
-            "progress": "预计10:00恢复"
-        },
-        {
-            "venue_id": 5,
-            "venue_name": "候考区A",
-            "venue_type": "候考", 
-            "status": "active",
-            "current_candidate": None,
-            "waiting_count": 15,
-            "next_start_time": None,
-            "current_exam": "考生等待中",
-            "progress": "15人等待实操考试"
-        }
-    ]
+STARTED_AT = datetime.now()
+
+GENERAL_ANNOUNCEMENTS = [
+    "考试期间请保持安静",
+    "理论考试请提前15分钟到达考场"
+]
 
-def get_mock_queue_data():
-    """获取模拟的排队数据"""
+def venue_view(venue: Dict[str, Any]) -> Dict[str, Any]:
+    """考场状态及展示文字"""
+    if venue["current_candidate"]:
+        current_exam = venue["current_exam"]
+        progress = f"进行中 (预计{venue['current_end_time']}结束)"
+    elif venue["status"] != "active":
+        current_exam = "暂停使用"
+        progress = "暂停使用"
+    elif venue["waiting_count"]:
+        current_exam = "考生等待中"
+        progress = f"{venue['waiting_count']}人等待"
+    else:
+        current_exam = None
+        progress = "空闲"
     return {
-        1: {  # 张三
-            "candidate_id": 1,
-            "candidate_name": "张三",
-            "queue_info": {
-                "venue_id": 1,
-                "venue_name": "理论考场A", 
-                "position": 2,
-                "total_waiting": 8,
-                "estimated_wait_minutes": 25,
-                "current_activity": "理论考试"
-            }
-        },
-        2: {  # 李四
-            "candidate_id": 2,
-            "candidate_name": "李四",
-            "queue_info": {
-                "venue_id": 3,
-                "venue_name": "实操场地1",
-                "position": 5,
-                "total_waiting": 12, 
-                "estimated_wait_minutes": 65,
-                "current_activity": "实操考试"
-            }
-        },
-        3: {  # 王五
-            "candidate_id": 3,
-            "candidate_name": "王五",
-            "queue_info": {
-                "venue_id": 5,
-                "venue_name": "候考区A",
-                "position": 8,
-                "total_waiting": 15,
-                "estimated_wait_minutes": 120,
-                "current_activity": "候考"
-            }
-        }
+        "venue_id": venue["venue_id"],
+        "venue_name": venue["venue_name"],
+        "venue_type": venue["venue_type"],
+        "status": venue["status"],
+        "current_candidate": venue["current_candidate"],
+        "waiting_count": venue["waiting_count"],
+        "next_start_time": venue["next_start_time"],
+        "current_exam": current_exam,
+        "progress": progress
     }
 
+def get_venue_views() -> List[Dict[str, Any]]:
+    return [venue_view(venue) for venue in venue_projection.venue_states().values()]
+
+def format_minutes(minutes: int) -> str:
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}小时{minutes}分钟" if hours > 0 else f"{minutes}分钟"
+
+def get_waiting_schedules(candidate_id: int) -> List[Dict[str, Any]]:
+    """考生当日仍在排队的排期及位置"""
+    waiting = []
+    for schedule in venue_projection.candidate_schedules(candidate_id):
+        position = queue_index.position(schedule.id)
+        if not position:
+            continue
+        venue = venue_projection.venue_state(schedule.venue_id)
+        waiting.append({
+            "schedule": schedule,
+            "venue_name": venue["venue_name"] if venue else "未分配考场",
+            "position": position,
+            "total_waiting": queue_index.length(schedule.venue_id, schedule.schedule_type, venue_projection.day),
+            "estimated_minutes": wait_time_estimator.estimate_wait(
+                position, schedule.venue_id, schedule.exam_product_id, schedule.schedule_type
+            )
+        })
+    return waiting
+
 # ===== 实时排队状态接口 =====
 
+def check_candidate_access(candidate_id: int, current_candidate_id: int):
+    """考生只能查看本人的排队信息"""
+    if candidate_id != current_candidate_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="只能查看本人的排队信息")
+
 @router.get("/queue-status/{candidate_id}")
-async def get_candidate_queue_status(candidate_id: int):
-    """获取考生的实时排队状态"""
+async def get_candidate_queue_status(
+    candidate_id: int,
+    current_candidate_id: int = Depends(get_current_candidate_id)
+):
+    """获取考生的实时排队状态（需携带本人的考生令牌）"""
+    check_candidate_access(candidate_id, current_candidate_id)
     
-    queue_data = get_mock_queue_data()
-    candidate_queue = queue_data.get(candidate_id)
+    waiting = get_waiting_schedules(candidate_id)
     
-    if not candidate_queue:
+    if not waiting:
         # 考生可能没有在排队或已完成考试
         return {
             "message": "当前无排队信息",
@@ -164,26 +145,20 @@ async def get_candidate_queue_status(candidate_id: int):
             ]
         }
     
-    queue_info = candidate_queue["queue_info"]
+    queue_info = waiting[0]
+    schedule = queue_info["schedule"]
     
     # 计算更详细的等待信息
-    estimated_time = queue_info["estimated_wait_minutes"]
-    hours = estimated_time // 60
-    minutes = estimated_time % 60
-    
-    time_text = ""
-    if hours > 0:
-        time_text = f"{hours}小时{minutes}分钟"
-    else:
-        time_text = f"{minutes}分钟"
+    estimated_time = queue_info["estimated_minutes"]
+    time_text = format_minutes(estimated_time)
     
     return {
         "message": "排队状态获取成功",
         "candidate_id": candidate_id,
-        "candidate_name": candidate_queue["candidate_name"],
+        "candidate_name": schedule.candidate_name,
         "queue_status": {
             "venue": queue_info["venue_name"],
-            "activity": queue_info["current_activity"],
+            "activity": SCHEDULE_TYPE_NAMES.get(schedule.schedule_type, schedule.schedule_type),
             "position": queue_info["position"],
             "total_waiting": queue_info["total_waiting"],
             "estimated_wait": time_text,
@@ -194,26 +169,63 @@ async def get_candidate_queue_status(candidate_id: int):
         "last_updated": datetime.now().isoformat()
     }
 
+@router.websocket("/ws/candidate")
+async def candidate_channel_ws(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None, description="考生访问令牌，也可通过Authorization请求头传递")
+):
+    """
+    考生实时通道（替代轮询排队状态与通知）
+    
+    连接后推送snapshot（当日排期的排队位置及所在考场状态），之后推送：
+    position（排队位置变化）、next（即将轮到）、venue（考场状态变化）；
+    客户端发送"ping"时回复pong，可作心跳
+    """
+    
+    if not token:
+        authorization = websocket.headers.get("authorization", "")
+        token = authorization[7:] if authorization.lower().startswith("bearer ") else None
+    candidate_id = verify_candidate_token(token) if token else None
+    if candidate_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    async with async_session_maker() as db:
+        schedules = await candidate_channel.load_schedules(db, candidate_id)
+    
+    connection = CandidateConnection(candidate_id, websocket.send_json)
+    sender = asyncio.create_task(connection.run_sender())
+    try:
+        await candidate_channel.register(connection, schedules)
+        while True:
+            if await websocket.receive_text() == "ping":
+                connection.push("pong", {"type": "pong", "timestamp": datetime.now().isoformat()})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        candidate_channel.unregister(connection)
+        sender.cancel()
+
 @router.get("/venue-queue/{venue_id}")
 async def get_venue_queue_status(venue_id: int):
     """获取指定考场的排队状态"""
     
-    venues = get_mock_venue_statuses()
-    venue = next((v for v in venues if v["venue_id"] == venue_id), None)
-    
-    if not venue:
+    state = venue_projection.venue_state(venue_id)
+    if not state:
         raise HTTPException(status_code=404, detail="考场不存在")
+    venue = venue_view(state)
     
-    # 模拟考场排队详情
-    queue_details = []
-    if venue["waiting_count"] > 0:
-        for i in range(min(venue["waiting_count"], 10)):  # 只显示前10位
-            queue_details.append({
-                "position": i + 1,
-                "candidate_name": f"考生{i+1}*",
-                "exam_type": venue["current_exam"],
-                "estimated_start": f"{9 + (i * 15) // 60:02d}:{(i * 15) % 60:02d}"
-            })
+    # 考场排队详情，只显示前10位
+    queue_details = [
+        {
+            "position": position,
+            "candidate_name": schedule.candidate_name,
+            "exam_type": SCHEDULE_TYPE_NAMES.get(schedule.schedule_type, schedule.schedule_type),
+            "estimated_start": schedule.start_time.strftime("%H:%M")
+        }
+        for position, schedule in enumerate(venue_projection.waiting_list(venue_id, 10), start=1)
+    ]
     
     return {
         "message": f"{venue['venue_name']}排队状态",
@@ -231,43 +243,65 @@ async def get_venue_queue_status(venue_id: int):
 
 @router.get("/public-board")
 async def get_public_board():
-    """获取公共看板实时数据"""
+    """获取公共看板实时数据（大屏建议改用 /realtime/public-board/stream 推送）"""
     
-    venues = get_mock_venue_statuses()
+    venues = get_venue_views()
     
     # 计算汇总信息
-    active_venues = [v for v in venues if v["status"] == "active"]
-    total_waiting = sum(v["waiting_count"] for v in venues)
-    active_exams = len([v for v in active_venues if v["current_candidate"]])
-    
     summary = {
-        "total_venues": len(venues),
-        "active_venues": len(active_venues), 
-        "maintenance_venues": len([v for v in venues if v["status"] == "maintenance"]),
-        "total_waiting_candidates": total_waiting,
-        "active_exams": active_exams,
+        **summarize(venue_projection.venue_states()),
+        "maintenance_venues": len([v for v in venues if v["status"] != "active"]),
         "current_time": datetime.now().strftime("%H:%M:%S"),
         "last_refresh": datetime.now().isoformat()
     }
     
-    return {
+    return ORJSONResponse({
         "message": "公共看板数据获取成功",
         "venues": venues,
         "summary": summary,
         "last_updated": datetime.now().isoformat(),
         "refresh_interval": 10,  # 建议10秒刷新一次
-        "announcements": [
-            "考试期间请保持安静",
-            "实操场地2设备维护中，预计10:00恢复",
-            "理论考试请提前15分钟到达考场"
+        "stream_url": "/realtime/public-board/stream",
+        "announcements": GENERAL_ANNOUNCEMENTS + [
+            f"{v['venue_name']}暂停使用" for v in venues if v["status"] != "active"
         ]
-    }
+    })
+
+@router.get("/public-board/stream")
+async def stream_public_board(
+    request: Request,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    公共看板SSE推送（替代轮询/public-board）
+    
+    连接后先发送snapshot事件（全部考场及汇总），之后有变化时发送patch事件（仅变化的考场）；
+    断线重连时浏览器自动携带Last-Event-ID，可补发时只发送错过的patch，否则重新发送snapshot
+    """
+    
+    async def event_stream():
+        subscriber, initial = await public_board.subscribe(last_event_id)
+        try:
+            yield f"retry: {public_board.refresh_seconds * 1000}\n\n"
+            for event in initial:
+                yield format_event(event)
+            while not await request.is_disconnected():
+                event = await public_board.next_event(subscriber)
+                yield format_event(event) if event else ": heartbeat\n\n"
+        finally:
+            public_board.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/public-board/venues-summary")
 async def get_venues_summary():
     """获取考场简要状态（适合大屏显示）"""
     
-    venues = get_mock_venue_statuses()
+    venues = get_venue_views()
     
     # 简化的考场状态，适合大屏展示
     summary_venues = []
@@ -301,7 +335,7 @@ async def get_venues_summary():
 @router.get("/venue-status")
 async def get_venue_status():
     """获取所有考场的实时状态"""
-    venues = get_mock_venue_statuses()
+    venues = get_venue_views()
     return {
         "message": "考场状态获取成功",
         "venues": venues,
@@ -311,83 +345,88 @@ async def get_venue_status():
 
 @router.get("/system-status")
 async def get_system_status():
-    """获取系统实时状态"""
+    """获取系统实时状态（本服务进程）"""
+    
+    venues = get_venue_views()
+    counts = venue_projection.exam_counts()
+    active = [v for v in venues if v["status"] == "active"]
+    busy = [v for v in active if v["current_candidate"]]
+    uptime_minutes = int((datetime.now() - STARTED_AT).total_seconds() // 60)
     
     return {
         "message": "系统状态正常",
         "system_info": {
             "server_time": datetime.now().isoformat(),
-            "uptime": "2小时15分钟",
-            "active_connections": 45,
-            "total_requests": 1247,
-            "error_rate": "0.1%"
+            "uptime": format_minutes(uptime_minutes),
+            "active_connections": public_board.subscriber_count + candidate_channel.connection_count,
+            "projection_loaded_at": venue_projection.loaded_at.isoformat() if venue_projection.loaded_at else None
         },
         "exam_status": {
-            "today_total_candidates": 89,
-            "completed_exams": 34,
-            "in_progress": 8,
-            "waiting": 25,
-            "scheduled": 22
+            "today_total_candidates": counts["total"],
+            "completed_exams": counts["completed"],
+            "in_progress": counts["in_progress"],
+            "waiting": counts["waiting"],
+            "scheduled": counts["scheduled"]
         },
         "venue_summary": {
-            "total_venues": 5,
-            "active": 4,
-            "maintenance": 1,
-            "average_utilization": "78%"
+            "total_venues": len(venues),
+            "active": len(active),
+            "maintenance": len(venues) - len(active),
+            "average_utilization": f"{round(len(busy) * 100 / len(active))}%" if active else "0%"
         }
     }
 
 @router.get("/notifications")
 async def get_realtime_notifications(
-    candidate_id: Optional[int] = Query(None, description="考生ID"),
-    venue_id: Optional[int] = Query(None, description="考场ID")
+    candidate_id: Optional[int] = Query(None, description="考生ID（需携带本人的考生令牌）"),
+    venue_id: Optional[int] = Query(None, description="考场ID"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(candidate_bearer)
 ):
-    """获取实时通知"""
+    """获取实时通知（建议考生改用 /realtime/ws/candidate 推送）；考场及系统通知无需登录"""
     
-    # 模拟通知数据
-    notifications = [
-        {
-            "id": 1,
-            "type": "queue_update",
-            "title": "排队状态更新",
-            "message": "您的排队位置前进了2位",
-            "timestamp": datetime.now().isoformat(),
-            "priority": "normal",
-            "target_candidate": 1
-        },
-        {
-            "id": 2,
+    if candidate_id:
+        check_candidate_access(candidate_id, get_current_candidate_id(credentials))
+    
+    now = datetime.now().isoformat()
+    notifications = []
+    
+    if candidate_id:
+        for queue_info in get_waiting_schedules(candidate_id):
+            notifications.append({
+                "id": f"queue_{queue_info['schedule'].id}",
+                "type": "queue_update",
+                "title": "排队状态更新",
+                "message": f"您在{queue_info['venue_name']}排第{queue_info['position']}位",
+                "timestamp": now,
+                "priority": "high" if queue_info["position"] == 1 else "normal",
+                "target_candidate": candidate_id
+            })
+    
+    for venue in get_venue_views():
+        if venue["status"] == "active" or (venue_id and venue["venue_id"] != venue_id):
+            continue
+        notifications.append({
+            "id": f"venue_{venue['venue_id']}",
             "type": "venue_status",
-            "title": "考场状态变更", 
-            "message": "实操场地2设备维护完成，即将恢复使用",
-            "timestamp": datetime.now().isoformat(),
+            "title": "考场状态变更",
+            "message": f"{venue['venue_name']}暂停使用",
+            "timestamp": now,
             "priority": "high",
-            "target_venue": 4
-        },
-        {
-            "id": 3,
-            "type": "general",
-            "title": "系统公告",
-            "message": "考试期间请保持安静，遵守考场纪律",
-            "timestamp": datetime.now().isoformat(),
-            "priority": "low"
-        }
-    ]
+            "target_venue": venue["venue_id"]
+        })
     
-    # 过滤通知
-    filtered_notifications = notifications
-    if candidate_id:
-        filtered_notifications = [n for n in notifications if 
-                                n.get("target_candidate") == candidate_id or 
-                                n["type"] == "general"]
-    if venue_id:
-        filtered_notifications = [n for n in notifications if 
-                                n.get("target_venue") == venue_id or 
-                                n["type"] == "general"]
+    notifications.append({
+        "id": "general",
+        "type": "general",
+        "title": "系统公告",
+        "message": "考试期间请保持安静，遵守考场纪律",
+        "timestamp": now,
+        "priority": "low"
+    })
     
     return {
         "message": "实时通知获取成功",
-        "notifications": filtered_notifications,
-        "unread_count": len(filtered_notifications),
-        "last_updated": datetime.now().isoformat()
-    }
\ No newline at end of file
+        "notifications": notifications,
+        "unread_count": len(notifications),
+        "last_updated": now
+    }
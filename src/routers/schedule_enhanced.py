@@ -3,6 +3,7 @@
 支持考务排期、批量操作、时间线展示等功能
 """
 from fastapi import APIRouter, Query, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 from datetime import date, time, datetime
@@ -10,7 +11,11 @@ from pydantic import BaseModel
 
 from src.db.session import get_async_session
 from src.core.rbac import require_permission, Permission
-from src.services.schedule_management import schedule_management_service
+from src.core.fields import FIELDS_QUERY, parse_fields
+from src.core.responses import ORJSONResponse
+from src.services.schedule_management import TIMELINE_FIELDS, schedule_management_service
+from src.services.schedule_export import schedule_export_service
+from src.services.realtime_events import publish_schedules_changed
 from src.db.models import User
 from src.auth.fastapi_users_config import current_active_user
 
@@ -93,23 +98,27 @@ async def get_schedule_timeline(
     end_date: Optional[date] = Query(None, description="结束日期"),
     venue_id: Optional[int] = Query(None, description="场地ID筛选"),
     institution_id: Optional[int] = Query(None, description="机构ID筛选"),
+    fields: Optional[str] = FIELDS_QUERY,
     db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(require_permission(Permission.SCHEDULE_READ))
 ):
-    """获取排期时间线"""
+    """获取排期时间线，可通过fields只返回每条排期的部分字段（如 id,start_time,venue）"""
+    
+    selected_fields = parse_fields(fields, TIMELINE_FIELDS)
     
     # 机构用户只能查看自己机构的排期
     if current_user.institution_id:
         institution_id = current_user.institution_id
     
     timeline = await schedule_management_service.get_schedule_timeline(
-        db, start_date, end_date, venue_id, institution_id
+        db, start_date, end_date, venue_id, institution_id, selected_fields
     )
     
-    return {
+    # 结果已是可序列化的字典，直接序列化
+    return ORJSONResponse({
         "message": "排期时间线",
         **timeline
-    }
+    })
 
 @router.get("/venues/available")
 async def get_available_venues(
@@ -171,6 +180,7 @@ async def update_schedule(
     schedule.updated_at = datetime.utcnow()
     await db.commit()
     await db.refresh(schedule)
+    await publish_schedules_changed([schedule])
     
     return {
         "message": "排期更新成功",
@@ -224,6 +234,7 @@ async def cancel_schedule(
     # 删除排期记录
     await db.delete(schedule)
     await db.commit()
+    await publish_schedules_changed(deleted=[schedule_id])
     
     return {
         "message": "排期取消成功",
@@ -307,26 +318,42 @@ async def get_daily_statistics(
 async def export_schedules_excel(
     start_date: date = Query(..., description="开始日期"),
     end_date: date = Query(..., description="结束日期"),
+    venue_id: Optional[int] = Query(None, description="考场ID筛选"),
     institution_id: Optional[int] = Query(None, description="机构ID筛选"),
-    db: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(require_permission(Permission.SCHEDULE_READ))
 ):
-    """导出排期数据为Excel"""
+    """导出排期数据为Excel（流式输出）"""
     
     # 机构用户只能导出自己机构的数据
     if current_user.institution_id:
         institution_id = current_user.institution_id
     
-    # 获取排期数据
-    timeline = await schedule_management_service.get_schedule_timeline(
-        db, start_date, end_date, None, institution_id
+    query = schedule_export_service.build_query(start_date, end_date, venue_id, institution_id)
+    
+    return StreamingResponse(
+        schedule_export_service.iter_xlsx(query),
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f"attachment; filename=schedules_{start_date}_{end_date}.xlsx"}
     )
+
+@router.get("/export/csv")
+async def export_schedules_csv(
+    start_date: date = Query(..., description="开始日期"),
+    end_date: date = Query(..., description="结束日期"),
+    venue_id: Optional[int] = Query(None, description="考场ID筛选"),
+    institution_id: Optional[int] = Query(None, description="机构ID筛选"),
+    current_user: User = Depends(require_permission(Permission.SCHEDULE_READ))
+):
+    """导出排期数据为CSV（流式输出）"""
     
-    # 这里应该实现Excel生成逻辑
-    # 暂时返回数据结构，后续可以集成openpyxl
+    # 机构用户只能导出自己机构的数据
+    if current_user.institution_id:
+        institution_id = current_user.institution_id
     
-    return {
-        "message": "排期数据导出（开发中）",
-        "data_preview": timeline,
-        "note": "Excel导出功能正在开发中，当前返回数据预览"
-    }
\ No newline at end of file
+    query = schedule_export_service.build_query(start_date, end_date, venue_id, institution_id)
+    
+    return StreamingResponse(
+        schedule_export_service.iter_csv(query),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f"attachment; filename=schedules_{start_date}_{end_date}.csv"}
+    )
@@ -8,6 +8,8 @@ from src.dependencies.permissions import (
     require_venue_view, require_venue_create, require_venue_update,
     require_venue_delete, require_venue_manage, require_venue_stats
 )
+from src.core.fields import FIELDS_QUERY, parse_fields, row_dicts
+from src.core.responses import ORJSONResponse
 from src.core.audit import (
     audit_venue_create, audit_venue_update, audit_venue_delete, audit_venue_read
 )
@@ -23,6 +25,12 @@ router = APIRouter(
     tags=["场地管理"],
 )
 
+# 列表接口可返回的字段
+VENUE_LIST_FIELDS = (
+    "id", "name", "type", "address", "description", "capacity", "contact_person", "contact_phone",
+    "equipment_info", "is_active", "status", "created_at", "updated_at"
+)
+
 @router.post("/", response_model=VenueResponse, status_code=http_status.HTTP_201_CREATED)
 @audit_venue_create()
 async def create_venue(
@@ -52,10 +60,12 @@ async def get_venues(
     status: Optional[str] = Query(None, description="状态筛选(active/inactive)"),
     venue_type: Optional[str] = Query(None, description="考场类型筛选"),
     search: Optional[str] = Query(None, description="搜索关键词(名称/地址/联系人)"),
+    fields: Optional[str] = FIELDS_QUERY,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_venue_view())
 ):
-    """获取考场列表 - 支持分页、筛选和搜索"""
+    """获取考场列表 - 支持分页、筛选和搜索，可通过fields只返回部分字段"""
+    selected_fields = parse_fields(fields, VENUE_LIST_FIELDS)
     try:
         skip = (page - 1) * size
         venues, total = await VenueService.get_multi(
@@ -64,11 +74,26 @@ async def get_venues(
             limit=size,
             status=status,
             venue_type=venue_type,
-            search=search
+            search=search,
+            fields=selected_fields
         )
+        pages = (total + size - 1) // size
+        
+        if selected_fields:
+            # 部分字段不符合VenueRead，直接序列化
+            return ORJSONResponse({
+                "code": 200,
+                "message": "获取考场列表成功",
+                "data": {
+                    "items": row_dicts(venues, selected_fields),
+                    "total": total,
+                    "page": page,
+                    "size": size,
+                    "pages": pages
+                }
+            })
         
         venue_reads = [VenueRead.model_validate(venue) for venue in venues]
-        pages = (total + size - 1) // size
         
         return VenueListResponseWrapper(
             code=200,
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import datetime
 from src.dependencies.get_db import get_db
 from src.dependencies.get_current_user import get_current_user
+from src.dependencies.auth import get_current_candidate_id
+from src.db.session import get_async_session
+from src.core.http_cache import make_etag, is_not_modified
+from src.core.responses import ORJSONResponse
 from src.models.user import User
 from src.models.candidate import Candidate, CandidateStatus
 from src.models.schedule import Schedule
@@ -11,6 +16,9 @@ from src.models.venue import Venue
 from src.schemas.wx_miniprogram import WxLoginRequest, WxLoginResponse, QrCodeResponse
 from src.services.wx_miniprogram import WxMiniprogramService
 from src.services.venue import VenueService
+from src.services.candidate_home import candidate_home_service, parse_versions, section_version
+from src.services.candidate_login import candidate_login_service
+from src.core.rate_limit import client_ip
 from src.core.auth import create_access_token
 from src.core.config import settings
 
@@ -26,75 +34,36 @@ async def wx_health_check():
         "features": ["考生登录", "信息查询", "签到功能"]
     }
 
+@router.get("/home")
+async def get_home(
+    request: Request,
+    versions: Optional[str] = Query(None, description="已缓存分区的版本号，如 candidate:版本号,queue:版本号"),
+    candidate_id: int = Depends(get_current_candidate_id),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """小程序首页：考生信息、考试安排、签到二维码、排队状态一次返回（需携带考生令牌）"""
+    home = await candidate_home_service.get_home(db, candidate_id, parse_versions(versions))
+    etag = make_etag(section_version({name: section["version"] for name, section in home["sections"].items()}))
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if is_not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return ORJSONResponse({"message": "首页数据获取成功", "data": home}, headers=headers)
+
 @router.post("/login-by-idcard")
 async def login_by_idcard(
-    id_card: str = Query(..., description="18位身份证号码")
+    request: Request,
+    id_card: str = Query(..., description="18位身份证号码"),
+    db: AsyncSession = Depends(get_async_session)
 ):
     """考生通过身份证号码登录（核心功能）"""
-    
-    # 验证身份证号格式
-    if not id_card or len(id_card) != 18:
-        raise HTTPException(
-            status_code=400, 
-            detail="身份证号格式不正确，请输入18位身份证号"
-        )
-    
-    # 模拟考生数据库查询
-    mock_candidates = {
-        "110101199001011234": {
-            "id": 1,
-            "name": "张三",
-            "id_number": "110101199001011234",
-            "phone": "13800138001",
-            "exam_product": "无人机驾驶员考试",
-            "exam_product_id": 1,
-            "institution": "北京航空培训中心",
-            "institution_id": 1,
-            "status": "待排期",
-            "registration_date": "2025-08-01"
-        },
-        "110101199002021234": {
-            "id": 2,
-            "name": "李四",
-            "id_number": "110101199002021234",
-            "phone": "13800138002",
-            "exam_product": "无人机驾驶员考试",
-            "exam_product_id": 1,
-            "institution": "上海飞行学院",
-            "institution_id": 2,
-            "status": "已排期",
-            "registration_date": "2025-08-02"
-        },
-        "110101199003031234": {
-            "id": 3,
-            "name": "王五",
-            "id_number": "110101199003031234",
-            "phone": "13800138003",
-            "exam_product": "航拍摄影师认证",
-            "exam_product_id": 2,
-            "institution": "北京航空培训中心",
-            "institution_id": 1,
-            "status": "待排期",
-            "registration_date": "2025-08-03"
-        }
-    }
-    
-    # 查找考生
-    candidate = mock_candidates.get(id_card)
-    if not candidate:
-        raise HTTPException(
-            status_code=404, 
-            detail="未找到该身份证号对应的考生信息，请联系培训机构确认报名状态"
-        )
-    
-    # 生成简单的访问令牌（实际项目中应使用JWT）
-    access_token = f"candidate_{candidate['id']}_{id_card[-4:]}"
-    
+    login = await candidate_login_service.login(db, id_card, client_ip(request))
     return {
         "message": "登录成功",
-        "access_token": access_token,
-        "candidate_info": candidate,
-        "login_time": "2025-08-03T19:45:00"
+        "access_token": login["access_token"],
+        "token_type": login["token_type"],
+        "expires_in": login["expires_in"],
+        "candidate_info": candidate_login_service.candidate_info(login["candidate"]),
+        "login_time": datetime.now().isoformat()
     }
 
 @router.get("/candidate-info/{candidate_id}")
@@ -4,6 +4,7 @@ from src.models.candidate import Candidate
 from src.schemas.candidate import CandidateCreate, CandidateUpdate, BatchImportResponse
 import pandas as pd
 from io import BytesIO
+from functools import lru_cache
 
 class CandidateService:
     @staticmethod
@@ -138,8 +139,9 @@ class CandidateService:
             )
 
     @staticmethod
+    @lru_cache(maxsize=1)
     def get_template_data() -> bytes:
-        """生成导入模板"""
+        """生成导入模板（内容固定，生成一次后缓存）"""
         template_data = {
             'name': ['张三', '李四'],
             'id_number': ['110101199001011234', '110101199002021234'],
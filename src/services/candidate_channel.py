@@ -0,0 +1,216 @@
+"""
+考生实时通道
+考生通过WebSocket订阅自己当日的排期及所在考场，排队位置变化、即将轮到、考场状态变化时由服务端推送。
+排队位置来自排队索引的变化通知，只重新计算受影响队列中已订阅的排期；考场状态来自公共看板的增量。
+每个连接的待发送消息按(类型, 排期/考场)合并，只保留最新状态，客户端处理慢时不会无限积压
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.models.schedule import Schedule
+from src.services.public_board import PublicBoard, public_board
+from src.services.queue_index import QueueIndex, QueueKey, queue_index
+from src.services.wait_time import WaitTimeEstimator, wait_time_estimator
+
+logger = logging.getLogger(__name__)
+
+
+class CandidateConnection:
+    """一个考生连接及其待发送消息"""
+
+    def __init__(self, candidate_id: int, send: Callable[[Dict[str, Any]], Awaitable[None]], max_pending: Optional[int] = None):
+        self.candidate_id = candidate_id
+        self.schedule_ids: Set[int] = set()
+        self.venue_ids: Set[int] = set()
+        self.max_pending = max_pending or settings.CANDIDATE_CHANNEL_MAX_PENDING
+        self.dropped = 0  # 因积压被丢弃的消息数
+        self._send = send
+        self._pending: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+
+    def push(self, key: Hashable, message: Dict[str, Any]):
+        """加入待发送消息，同一key未发送的旧消息被替换；超过上限时丢弃最早的消息"""
+        self._pending.pop(key, None)
+        self._pending[key] = message
+        while len(self._pending) > self.max_pending:
+            self._pending.popitem(last=False)
+            self.dropped += 1
+        self._wakeup.set()
+
+    @property
+    def pending(self) -> List[Dict[str, Any]]:
+        return list(self._pending.values())
+
+    async def run_sender(self):
+        """按顺序发送待发送消息，发送失败（连接已关闭）时结束"""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending:
+                _, message = self._pending.popitem(last=False)
+                await self._send(message)
+
+
+class CandidateChannel:
+    """考生实时通道的订阅关系及推送"""
+
+    def __init__(
+        self,
+        index: QueueIndex = queue_index,
+        board: PublicBoard = public_board,
+        estimator: WaitTimeEstimator = wait_time_estimator
+    ):
+        self.index = index
+        self.board = board
+        self.estimator = estimator
+        self.next_position = settings.CANDIDATE_CHANNEL_NEXT_POSITION
+        self._connections: Set[CandidateConnection] = set()
+        self._schedule_watchers: Dict[int, Set[CandidateConnection]] = {}
+        self._venue_watchers: Dict[int, Set[CandidateConnection]] = {}
+        self._schedules: Dict[int, Tuple[QueueKey, Optional[int]]] = {}  # 排期ID -> (队列, 考试产品ID)
+        self._queue_schedules: Dict[QueueKey, Set[int]] = {}
+        self._positions: Dict[int, Optional[int]] = {}  # 上次推送的排队位置
+        self._alerted: Set[int] = set()
+        index.add_listener(self.on_queue_changed)
+        board.add_listener(self.on_venues_changed, active=lambda: bool(self._connections))
+
+    async def load_schedules(self, db: AsyncSession, candidate_id: int, day: Optional[date] = None) -> List[Schedule]:
+        """考生当日未取消的排期"""
+        day = day or date.today()
+        result = await db.execute(
+            select(Schedule).where(
+                and_(
+                    Schedule.candidate_id == candidate_id,
+                    Schedule.scheduled_date >= day,
+                    Schedule.scheduled_date < day + timedelta(days=1),
+                    or_(Schedule.status.is_(None), Schedule.status != "cancelled")
+                )
+            ).order_by(Schedule.start_time)
+        )
+        return list(result.scalars().all())
+
+    async def register(self, connection: CandidateConnection, schedules: Iterable[Schedule]):
+        """订阅排期及其考场，并推送当前状态快照"""
+        venues = await self.board.venues()
+        schedules = list(schedules)
+        for schedule in schedules:
+            # 重建索引后新建的排期先加入索引（在订阅前加入，避免在快照之前推送）
+            self.index.ensure(schedule)
+
+        self._connections.add(connection)
+        for schedule in schedules:
+            queue_key = self.index.queue_key(schedule)
+            connection.schedule_ids.add(schedule.id)
+            self._schedule_watchers.setdefault(schedule.id, set()).add(connection)
+            self._schedules[schedule.id] = (queue_key, schedule.exam_product_id)
+            self._queue_schedules.setdefault(queue_key, set()).add(schedule.id)
+            if schedule.venue_id is not None:
+                connection.venue_ids.add(schedule.venue_id)
+                self._venue_watchers.setdefault(schedule.venue_id, set()).add(connection)
+
+        positions = [self._position_message(schedule_id) for schedule_id in sorted(connection.schedule_ids)]
+        for message in positions:
+            self._positions[message["schedule_id"]] = message["position"]
+        connection.push("snapshot", {
+            "type": "snapshot",
+            "candidate_id": connection.candidate_id,
+            "schedules": positions,
+            "venues": [venues[venue_id] for venue_id in sorted(connection.venue_ids) if venue_id in venues],
+            "timestamp": datetime.utcnow().isoformat()
+        })
+        for message in positions:
+            self._check_next(message)
+
+    def unregister(self, connection: CandidateConnection):
+        self._connections.discard(connection)
+        for schedule_id in connection.schedule_ids:
+            watchers = self._schedule_watchers.get(schedule_id)
+            if watchers is None:
+                continue
+            watchers.discard(connection)
+            if not watchers:
+                del self._schedule_watchers[schedule_id]
+                queue_key, _ = self._schedules.pop(schedule_id)
+                self._queue_schedules[queue_key].discard(schedule_id)
+                if not self._queue_schedules[queue_key]:
+                    del self._queue_schedules[queue_key]
+                self._positions.pop(schedule_id, None)
+                self._alerted.discard(schedule_id)
+        for venue_id in connection.venue_ids:
+            watchers = self._venue_watchers.get(venue_id)
+            if watchers is not None:
+                watchers.discard(connection)
+                if not watchers:
+                    del self._venue_watchers[venue_id]
+
+    @property
+    def connection_count(self) -> int:
+        return len(self._connections)
+
+    # ===== 变化通知 =====
+
+    def on_queue_changed(self, queue_keys: Optional[Set[QueueKey]]):
+        """排队索引变化：只重新计算受影响队列中已订阅的排期，位置变化时推送"""
+        if queue_keys is None:
+            schedule_ids = list(self._schedules)
+        else:
+            schedule_ids = [
+                schedule_id
+                for queue_key in queue_keys
+                for schedule_id in self._queue_schedules.get(queue_key, ())
+            ]
+        for schedule_id in schedule_ids:
+            message = self._position_message(schedule_id)
+            if self._positions.get(schedule_id) == message["position"]:
+                continue
+            self._positions[schedule_id] = message["position"]
+            for connection in self._schedule_watchers.get(schedule_id, ()):
+                connection.push(("position", schedule_id), message)
+            self._check_next(message)
+
+    def on_venues_changed(self, venues: List[Dict[str, Any]]):
+        """考场状态变化：推送给订阅该考场的连接"""
+        for venue in venues:
+            for connection in self._venue_watchers.get(venue["venue_id"], ()):
+                connection.push(("venue", venue["venue_id"]), {"type": "venue", "venue": venue})
+
+    def _position_message(self, schedule_id: int) -> Dict[str, Any]:
+        (venue_id, schedule_type, day), exam_product_id = self._schedules[schedule_id]
+        position = self.index.position(schedule_id)
+        return {
+            "type": "position",
+            "schedule_id": schedule_id,
+            "venue_id": venue_id,
+            "schedule_type": schedule_type,
+            "position": position,
+            "total_waiting": self.index.length(venue_id, schedule_type, day),
+            "estimated_wait_minutes": self.estimator.estimate_wait(position, venue_id, exam_product_id, schedule_type)
+        }
+
+    def _check_next(self, message: Dict[str, Any]):
+        """排到前next_position位时提醒一次"""
+        schedule_id, position = message["schedule_id"], message["position"]
+        if not position or position > self.next_position or schedule_id in self._alerted:
+            return
+        self._alerted.add(schedule_id)
+        venue = (self.board.board or {}).get(message["venue_id"])
+        venue_name = venue["venue_name"] if venue else "考场"
+        for connection in self._schedule_watchers.get(schedule_id, ()):
+            connection.push(("next", schedule_id), {
+                "type": "next",
+                "schedule_id": schedule_id,
+                "venue_id": message["venue_id"],
+                "position": position,
+                "message": f"即将轮到您，请到{venue_name}候考"
+            })
+
+
+# 单例通道
+candidate_channel = CandidateChannel()
@@ -0,0 +1,205 @@
+"""
+小程序首页聚合
+一次请求返回考生信息、考试安排、签到二维码及排队状态四个分区。数据库只查询两次（考生连同考试产品和机构名称、
+今日起的排期连同考场名称），二维码令牌在内存中签发，排队位置来自排队索引，考场状态来自考场状态投影。
+每个分区带有内容版本号及建议缓存秒数；客户端提交已缓存分区的版本号时，未变化的分区只返回版本号
+"""
+import hashlib
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.responses import dumps
+from src.institutions.models import Institution
+from src.models.candidate import Candidate
+from src.models.exam_product import ExamProduct
+from src.models.schedule import Schedule
+from src.models.venue import Venue
+from src.services.qrcode_batch import SCHEDULE_TYPE_NAMES, mask_id_number
+from src.services.qrcode_service import QRCodeService, qrcode_service
+from src.services.queue_index import QueueIndex, queue_index
+from src.services.venue_projection import VenueProjection, venue_projection
+from src.services.wait_time import WaitTimeEstimator, wait_time_estimator
+
+SECTIONS = ("candidate", "schedules", "qrcode", "queue")
+
+# 各分区建议的缓存秒数；二维码分区为距令牌重新签发的秒数
+SECTION_MAX_AGE = {"candidate": 600, "schedules": 60, "queue": 10}
+
+
+def section_version(content: Any) -> str:
+    return hashlib.blake2b(dumps(content), digest_size=8).hexdigest()
+
+
+def parse_versions(versions: Optional[str]) -> Dict[str, str]:
+    """解析客户端已缓存的分区版本号，格式 candidate:版本号,queue:版本号"""
+    known = {}
+    for item in (versions or "").split(","):
+        name, _, version = item.strip().partition(":")
+        if name in SECTIONS and version:
+            known[name] = version
+    return known
+
+
+class CandidateHomeService:
+    """小程序首页数据"""
+
+    def __init__(
+        self,
+        qrcode: QRCodeService = qrcode_service,
+        index: QueueIndex = queue_index,
+        projection: VenueProjection = venue_projection,
+        estimator: WaitTimeEstimator = wait_time_estimator
+    ):
+        self.qrcode = qrcode
+        self.index = index
+        self.projection = projection
+        self.estimator = estimator
+
+    async def get_home(
+        self,
+        db: AsyncSession,
+        candidate_id: int,
+        known: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        candidate, exam_product_name, institution_name = await self._load_candidate(db, candidate_id)
+        schedules = await self._load_schedules(db, candidate_id)
+        now = datetime.utcnow()
+
+        qrcode, qr_max_age = await self._qrcode_section(candidate_id, schedules, now)
+        sections = {
+            "candidate": (self._candidate_section(candidate, exam_product_name, institution_name),
+                          SECTION_MAX_AGE["candidate"]),
+            "schedules": (self._schedules_section(schedules), SECTION_MAX_AGE["schedules"]),
+            "qrcode": (qrcode, qr_max_age),
+            "queue": (self._queue_section(schedules), SECTION_MAX_AGE["queue"])
+        }
+
+        known = known or {}
+        result = {}
+        for name, (content, max_age) in sections.items():
+            version = section_version(content)
+            result[name] = {"version": version, "max_age": max_age}
+            if known.get(name) == version:
+                result[name]["not_modified"] = True
+            else:
+                result[name]["data"] = content
+        return {"candidate_id": candidate_id, "sections": result, "updated_at": now.isoformat()}
+
+    # ===== 查询 =====
+
+    async def _load_candidate(self, db: AsyncSession, candidate_id: int) -> Tuple[Candidate, Optional[str], Optional[str]]:
+        row = (await db.execute(
+            select(Candidate, ExamProduct.name, Institution.name)
+            .outerjoin(ExamProduct, ExamProduct.id == Candidate.exam_product_id)
+            .outerjoin(Institution, Institution.id == Candidate.institution_id)
+            .where(Candidate.id == candidate_id)
+        )).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="考生信息不存在")
+        return row
+
+    async def _load_schedules(self, db: AsyncSession, candidate_id: int) -> List[Tuple[Schedule, Optional[str]]]:
+        """今日及以后未取消的排期（按开始时间）"""
+        today = date.today()
+        result = await db.execute(
+            select(Schedule, Venue.name)
+            .outerjoin(Venue, Venue.id == Schedule.venue_id)
+            .where(and_(
+                Schedule.candidate_id == candidate_id,
+                Schedule.scheduled_date >= today,
+                or_(Schedule.status.is_(None), Schedule.status != "cancelled")
+            ))
+            .order_by(Schedule.start_time, Schedule.id)
+        )
+        return result.all()
+
+    # ===== 分区 =====
+
+    def _candidate_section(
+        self,
+        candidate: Candidate,
+        exam_product_name: Optional[str],
+        institution_name: Optional[str]
+    ) -> Dict[str, Any]:
+        return {
+            "id": candidate.id,
+            "name": candidate.name,
+            "id_number": mask_id_number(candidate.id_number),
+            "phone": candidate.phone,
+            "status": candidate.status,
+            "exam_product": exam_product_name,
+            "institution": institution_name
+        }
+
+    def _schedules_section(self, schedules: List[Tuple[Schedule, Optional[str]]]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": schedule.id,
+                "activity_name": SCHEDULE_TYPE_NAMES.get(schedule.schedule_type, schedule.schedule_type),
+                "schedule_type": schedule.schedule_type,
+                "exam_date": schedule.start_time.date().isoformat(),
+                "start_time": schedule.start_time.strftime("%H:%M"),
+                "end_time": schedule.end_time.strftime("%H:%M"),
+                "venue": venue_name or "未分配考场",
+                "status": schedule.status,
+                "check_in_status": schedule.check_in_status
+            }
+            for schedule, venue_name in schedules
+        ]
+
+    async def _qrcode_section(
+        self,
+        candidate_id: int,
+        schedules: List[Tuple[Schedule, Optional[str]]],
+        now: datetime
+    ) -> Tuple[Dict[str, Any], int]:
+        next_schedule, venue_name = next(
+            ((schedule, venue_name) for schedule, venue_name in schedules if self.qrcode.is_upcoming(schedule, now)),
+            (None, None)
+        )
+        qr_result = await self.qrcode.build_qrcode(candidate_id, next_schedule, venue_name)
+        expires_at = datetime.fromisoformat(qr_result["qr_data"]["expires_at"])
+        return (
+            {
+                "qr_data": qr_result["qr_data"],
+                "qr_image": qr_result["qr_image"],
+                "next_schedule": qr_result["next_schedule"]
+            },
+            self.qrcode.token_refresh_seconds(expires_at)
+        )
+
+    def _queue_section(self, schedules: List[Tuple[Schedule, Optional[str]]]) -> List[Dict[str, Any]]:
+        """今日待签到排期的排队位置（排队索引未覆盖今日时不返回位置）"""
+        today = date.today()
+        use_index = self.index.day == today
+        queue = []
+        for schedule, venue_name in schedules:
+            if schedule.check_in_status != "not_checked_in" or schedule.start_time.date() != today:
+                continue
+            position = total_waiting = estimated_wait = None
+            if use_index:
+                position = self.index.ensure(schedule)
+                total_waiting = self.index.length(*self.index.queue_key(schedule))
+                estimated_wait = self.estimator.estimate_wait(
+                    position, schedule.venue_id, schedule.exam_product_id, schedule.schedule_type
+                )
+            venue = self.projection.venue_state(schedule.venue_id) if schedule.venue_id else None
+            queue.append({
+                "schedule_id": schedule.id,
+                "venue_name": venue_name or "未分配考场",
+                "activity_name": SCHEDULE_TYPE_NAMES.get(schedule.schedule_type, schedule.schedule_type),
+                "position": position,
+                "total_waiting": total_waiting,
+                "estimated_wait_minutes": estimated_wait,
+                "venue_status": venue["status"] if venue else None,
+                "current_candidate": venue["current_candidate"] if venue else None
+            })
+        return queue
+
+
+# 单例服务实例
+candidate_home_service = CandidateHomeService()
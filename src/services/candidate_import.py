@@ -3,17 +3,34 @@
 支持Excel模板下载、批量导入和数据验证
 """
 import pandas as pd
+import numpy as np
 import io
-from typing import List, Dict, Any, Tuple, Optional
+import uuid
+import json
+import hashlib
+from typing import List, Dict, Any, Tuple, Optional, Callable, Awaitable
 from fastapi import HTTPException, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, delete, and_, literal, func
 from datetime import datetime
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.datavalidation import DataValidation
 import re
 
 from src.models.candidate import Candidate
 from src.models.exam_product import ExamProduct
+from src.models.candidate_import import CandidateImportStaging
 from src.db.models import User
+from src.core.config import settings
+from src.core.executors import run_in_thread
+from src.core.security import hash_id_number
+
+# 首尾空白判断用到的字符码点（与str.strip()默认行为一致）
+WHITESPACE_CODES = np.array([ord(char) for char in map(chr, range(0x3001)) if char.isspace()])
+
+# 身份证号末位X在校验码比较时的占位值
+ID_CHECK_CODE_X = 10
 
 
 class CandidateImportService:
@@ -33,50 +50,114 @@ class CandidateImportService:
     # 必填字段
     REQUIRED_FIELDS = ["考生姓名", "身份证号", "联系电话", "考试产品名称"]
     
+    # Excel列名 -> 内部字段名
+    COLUMN_FIELDS = {
+        "考生姓名": "name",
+        "身份证号": "id_number",
+        "联系电话": "phone",
+        "邮箱": "email",
+        "性别": "gender",
+        "考试产品名称": "exam_product_name",
+        "备注": "notes"
+    }
+    
+    # 校验规则（列式匹配使用）
+    PHONE_PATTERN = r'^1[3-9]\d{9}$'
+    EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+    
+    # GB 11643-1999 身份证校验码：前17位加权和对11取模后映射
+    ID_CHECK_WEIGHTS = np.array([7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2])
+    ID_CHECK_CODES = np.array([1, 0, ID_CHECK_CODE_X, 9, 8, 7, 6, 5, 4, 3, 2])
+    
+    # 模板中下拉选项覆盖的数据行数
+    TEMPLATE_MAX_ROWS = 10000
+    
+    # 写入暂存表的字段
+    STAGING_FIELDS = [
+        "name", "id_number", "phone", "email", "gender",
+        "birth_date", "exam_product_id", "notes"
+    ]
+    
     def __init__(self):
         self.errors: List[str] = []
         self.warnings: List[str] = []
+        self.chunk_size = settings.IMPORT_CHUNK_SIZE  # 每批写入行数
+        self._template_cache: Optional[Tuple[str, bytes]] = None  # (产品目录版本, 模板内容)
     
-    async def generate_template(self) -> bytes:
-        """生成Excel导入模板"""
-        # 创建示例数据
-        sample_data = {
-            "考生姓名": ["张三", "李四", "王五"],
-            "身份证号": ["110101199001011234", "110101199002021234", "110101199003031234"],
-            "联系电话": ["13800138001", "13800138002", "13800138003"],
-            "邮箱": ["zhangsan@example.com", "lisi@example.com", "wangwu@example.com"],
-            "性别": ["男", "女", "男"],
-            "考试产品名称": ["多旋翼视距内驾驶员", "航拍摄影师认证", "植保飞行操作证"],
-            "备注": ["", "有经验", "新手"]
-        }
+    async def get_template(self, db: AsyncSession) -> Tuple[str, bytes]:
+        """
+        获取导入模板及其版本号
         
-        # 创建DataFrame
-        df = pd.DataFrame(sample_data)
+        模板按考试产品目录版本缓存在内存中，产品增删或改名后才重新生成
+        """
+        result = await db.execute(select(ExamProduct.id, ExamProduct.name).order_by(ExamProduct.id))
+        products = result.all()
+        catalog = json.dumps([[product_id, name] for product_id, name in products], ensure_ascii=False)
+        version = hashlib.sha1(catalog.encode("utf-8")).hexdigest()[:16]
         
-        # 创建Excel文件
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # 写入数据表
-            df.to_excel(writer, sheet_name='考生信息', index=False)
+        cached = self._template_cache
+        if cached and cached[0] == version:
+            return cached
+        
+        content = await run_in_thread(self.generate_template, [name for _, name in products])
+        self._template_cache = (version, content)
+        return self._template_cache
+    
+    def generate_template(self, product_names: Optional[List[str]] = None) -> bytes:
+        """生成Excel导入模板，考试产品名称列提供下拉选项"""
+        product_names = product_names or []
+        sample_products = product_names or ["多旋翼视距内驾驶员", "航拍摄影师认证", "植保飞行操作证"]
+        
+        workbook = Workbook()
+        
+        # 数据表
+        sheet = workbook.active
+        sheet.title = "考生信息"
+        sheet.append(self.TEMPLATE_COLUMNS)
+        sample_rows = [
+            ["张三", "110101199001011237", "13800138001", "zhangsan@example.com", "男", ""],
+            ["李四", "110101199002021234", "13800138002", "lisi@example.com", "女", "有经验"],
+            ["王五", "110101199003031231", "13800138003", "wangwu@example.com", "男", "新手"],
+        ]
+        for index, row in enumerate(sample_rows):
+            sheet.append(row[:5] + [sample_products[index % len(sample_products)], row[5]])
+        
+        # 说明表
+        instructions = workbook.create_sheet("填写说明")
+        instructions.append(["字段名", "是否必填", "说明"])
+        descriptions = [
+            "考生真实姓名",
+            "18位身份证号码",
+            "11位手机号码",
+            "电子邮箱地址（选填）",
+            "男/女（选填）",
+            "必须为系统中已存在的考试产品名称，可从下拉列表选择",
+            "其他备注信息（选填）"
+        ]
+        for column, description in zip(self.TEMPLATE_COLUMNS, descriptions):
+            instructions.append([column, "是" if column in self.REQUIRED_FIELDS else "否", description])
+        
+        # 考试产品下拉列表（名称写入隐藏表，避免内联列表的255字符限制）
+        if product_names:
+            product_sheet = workbook.create_sheet("考试产品")
+            for name in product_names:
+                product_sheet.append([name])
+            product_sheet.sheet_state = "hidden"
             
-            # 创建说明表
-            instructions = {
-                "字段名": self.TEMPLATE_COLUMNS,
-                "是否必填": ["是" if col in self.REQUIRED_FIELDS else "否" for col in self.TEMPLATE_COLUMNS],
-                "说明": [
-                    "考生真实姓名",
-                    "18位身份证号码",
-                    "11位手机号码",
-                    "电子邮箱地址（选填）",
-                    "男/女（选填）",
-                    "必须为系统中已存在的考试产品名称",
-                    "其他备注信息（选填）"
-                ]
-            }
-            instructions_df = pd.DataFrame(instructions)
-            instructions_df.to_excel(writer, sheet_name='填写说明', index=False)
+            column = get_column_letter(self.TEMPLATE_COLUMNS.index("考试产品名称") + 1)
+            validation = DataValidation(
+                type="list",
+                formula1=f"'考试产品'!$A$1:$A${len(product_names)}",
+                allow_blank=True,
+                showErrorMessage=True,
+                errorTitle="考试产品不存在",
+                error="请从下拉列表中选择考试产品"
+            )
+            validation.add(f"{column}2:{column}{self.TEMPLATE_MAX_ROWS + 1}")
+            sheet.add_data_validation(validation)
         
-        output.seek(0)
+        output = io.BytesIO()
+        workbook.save(output)
         return output.getvalue()
     
     async def validate_excel_file(self, file: UploadFile) -> bool:
@@ -99,12 +180,14 @@ class CandidateImportService:
     
     async def parse_excel_file(self, file: UploadFile) -> pd.DataFrame:
         """解析Excel文件"""
+        contents = await file.read()
+        return self.parse_excel_content(contents)
+    
+    def parse_excel_content(self, contents: bytes) -> pd.DataFrame:
+        """解析Excel文件内容"""
         try:
-            # 读取文件内容
-            contents = await file.read()
-            
-            # 使用pandas读取Excel
-            df = pd.read_excel(io.BytesIO(contents), sheet_name=0)
+            # 使用pandas读取Excel（统一按文本读取，避免身份证号/手机号被转成数字）
+            df = pd.read_excel(io.BytesIO(contents), sheet_name=0, dtype=str)
             
             # 验证列名
             expected_columns = set(self.TEMPLATE_COLUMNS)
@@ -129,84 +212,209 @@ class CandidateImportService:
     
     def validate_candidate_data(self, row: pd.Series, row_index: int) -> Dict[str, Any]:
         """验证单行考生数据"""
-        errors = []
-        warnings = []
-        
-        # 提取数据
-        name = str(row.get("考生姓名", "")).strip()
-        id_number = str(row.get("身份证号", "")).strip()
-        phone = str(row.get("联系电话", "")).strip()
-        email = str(row.get("邮箱", "")).strip() if pd.notna(row.get("邮箱")) else None
-        gender = str(row.get("性别", "")).strip() if pd.notna(row.get("性别")) else None
-        exam_product_name = str(row.get("考试产品名称", "")).strip()
-        notes = str(row.get("备注", "")).strip() if pd.notna(row.get("备注")) else None
-        
-        # 验证必填字段
-        if not name:
-            errors.append(f"第{row_index + 2}行：考生姓名不能为空")
-        elif len(name) > 50:
-            errors.append(f"第{row_index + 2}行：考生姓名不能超过50个字符")
-        
-        if not id_number:
-            errors.append(f"第{row_index + 2}行：身份证号不能为空")
-        elif not self._validate_id_number(id_number):
-            errors.append(f"第{row_index + 2}行：身份证号格式不正确")
-        
-        if not phone:
-            errors.append(f"第{row_index + 2}行：联系电话不能为空")
-        elif not self._validate_phone(phone):
-            errors.append(f"第{row_index + 2}行：联系电话格式不正确")
-        
-        if not exam_product_name:
-            errors.append(f"第{row_index + 2}行：考试产品名称不能为空")
-        
-        # 验证可选字段
-        if email and not self._validate_email(email):
-            errors.append(f"第{row_index + 2}行：邮箱格式不正确")
-        
-        if gender and gender not in ["男", "女"]:
-            warnings.append(f"第{row_index + 2}行：性别应为'男'或'女'，已设置为空")
-            gender = None
+        frame = pd.DataFrame([row]).set_axis([row_index])
+        result = self.validate_candidate_frame(frame)
+        
+        data = result["data"].iloc[0].to_dict()
+        if pd.isna(data["birth_date"]):
+            data["birth_date"] = None
         
         return {
-            "valid": len(errors) == 0,
-            "errors": errors,
-            "warnings": warnings,
-            "data": {
-                "name": name,
-                "id_number": id_number,
-                "phone": phone,
-                "email": email,
-                "gender": gender,
-                "exam_product_name": exam_product_name,
-                "notes": notes
-            }
+            "valid": bool(result["valid"].iloc[0]),
+            "errors": result["errors"],
+            "warnings": result["warnings"],
+            "data": data
         }
     
-    def _validate_id_number(self, id_number: str) -> bool:
-        """验证身份证号格式"""
-        if len(id_number) != 18:
-            return False
+    def validate_candidate_frame(
+        self,
+        df: pd.DataFrame,
+        exam_products: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        列式验证考生数据
+        
+        整张表按列转换为NumPy字符数组，用码点矩阵完成身份证号、手机号等校验，
+        只在出错的单元格上拼接提示信息。错误和警告信息与逐行验证一致（按行号、字段顺序排列）。
+        传入exam_products时同时校验考试产品是否存在，并补充exam_product_id。
         
-        # 前17位必须是数字
-        if not id_number[:17].isdigit():
-            return False
+        返回:
+        - data: 规范化后的考生数据（内部字段名，含出生日期）
+        - valid: 每行是否通过验证
+        - errors / warnings: 带行号的错误和警告信息
+        """
+        columns = {
+            field: self._text_column(df, column)
+            for column, field in self.COLUMN_FIELDS.items()
+        }
+        name = columns["name"]
+        id_number = columns["id_number"]
+        phone = columns["phone"]
+        email = columns["email"]
+        gender = columns["gender"]
+        exam_product_name = columns["exam_product_name"]
         
-        # 最后一位可以是数字或X
-        if not (id_number[17].isdigit() or id_number[17].upper() == 'X'):
-            return False
+        id_format_ok, id_checksum_ok, birth_date = self._check_id_numbers(id_number)
         
-        return True
+        # 邮箱规则复杂，仅对非空邮箱做正则匹配
+        email_filled = email != ""
+        email_ok = np.ones(len(email), dtype=bool)
+        if email_filled.any():
+            email_ok[email_filled] = pd.Series(email[email_filled]).str.match(self.EMAIL_PATTERN).to_numpy()
+        
+        # 按字段顺序排列的错误规则：(错误条件, 错误信息)
+        error_rules = [
+            (name == "", "考生姓名不能为空"),
+            (np.char.str_len(name) > 50, "考生姓名不能超过50个字符"),
+            (id_number == "", "身份证号不能为空"),
+            ((id_number != "") & ~id_format_ok, "身份证号格式不正确"),
+            (id_format_ok & ~id_checksum_ok, "身份证号校验码不正确"),
+            (id_format_ok & id_checksum_ok & np.isnat(birth_date), "身份证号出生日期无效"),
+            (phone == "", "联系电话不能为空"),
+            ((phone != "") & ~self._check_phones(phone), "联系电话格式不正确"),
+            (exam_product_name == "", "考试产品名称不能为空"),
+            (email_filled & ~email_ok, "邮箱格式不正确"),
+        ]
+        valid = ~np.logical_or.reduce([condition for condition, _ in error_rules])
+        
+        # 考试产品只对其余字段均通过的行校验
+        product_ids = None
+        if exam_products is not None:
+            product_ids = pd.Series(exam_product_name).map(exam_products)
+            product_missing = valid & product_ids.isna().to_numpy()
+            error_rules.append((product_missing, "考试产品'{value}'不存在"))
+            valid &= ~product_missing
+        
+        invalid_gender = (gender != "") & (gender != "男") & (gender != "女")
+        warning_rules = [
+            (invalid_gender, "性别应为'男'或'女'，已设置为空"),
+        ]
+        gender[invalid_gender] = ""
+        
+        row_numbers = df.index.to_numpy()
+        data = pd.DataFrame(
+            {field: values.astype(object) for field, values in columns.items()},
+            index=df.index
+        )
+        # 选填字段空值统一为None
+        for field in ("email", "gender", "notes"):
+            data[field] = data[field].where(data[field] != "", None)
+        # 出生日期无效的行必然未通过验证，有效行均为合法日期
+        data["birth_date"] = birth_date
+        if product_ids is not None:
+            data["exam_product_id"] = pd.Series(product_ids.to_numpy(), index=df.index).astype("Int64").astype(object).where(valid, None)
+        
+        return {
+            "data": data,
+            "valid": pd.Series(valid, index=df.index),
+            "errors": self._collect_messages(row_numbers, error_rules, exam_product_name),
+            "warnings": self._collect_messages(row_numbers, warning_rules)
+        }
+    
+    @staticmethod
+    def _text_column(df: pd.DataFrame, column: str) -> np.ndarray:
+        """将列转换为去除首尾空白的NumPy字符串数组，缺失值为空字符串"""
+        if column not in df.columns:
+            return np.full(len(df), "", dtype="U1")
+        
+        values = df[column].to_numpy(dtype=object)
+        values[pd.isna(values)] = ""
+        text = values.astype(str)
+        if not text.size or text.itemsize == 0:
+            return text
+        
+        # 只对首尾存在空白的单元格做strip
+        codes = text.view(np.uint32).reshape(len(text), -1)
+        last = np.maximum(np.char.str_len(text) - 1, 0)
+        edges = np.stack([codes[:, 0], codes[np.arange(len(text)), last]])
+        padded = (np.isin(edges, WHITESPACE_CODES)).any(axis=0)
+        if padded.any():
+            text[padded] = np.char.strip(text[padded])
+        return text
+    
+    @staticmethod
+    def _code_matrix(values: np.ndarray, width: int) -> np.ndarray:
+        """把定长字符串数组转换为 (行数, width) 的码点矩阵，超长部分截断"""
+        return values.astype(f"U{width}").view(np.uint32).reshape(len(values), width)
+    
+    def _check_id_numbers(self, id_number: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        按GB 11643校验身份证号
+        
+        返回格式是否正确、校验码是否正确、出生日期（datetime64，无效为NaT）三个数组
+        """
+        codes = self._code_matrix(id_number, 18)
+        is_digit = (codes >= ord("0")) & (codes <= ord("9"))
+        last = codes[:, 17]
+        format_ok = (
+            (np.char.str_len(id_number) == 18)
+            & is_digit[:, :17].all(axis=1)
+            & (is_digit[:, 17] | (last == ord("X")) | (last == ord("x")))
+        )
+        
+        digits = np.where(is_digit, codes - ord("0"), 0).astype(np.int64)
+        expected = self.ID_CHECK_CODES[(digits[:, :17] @ self.ID_CHECK_WEIGHTS) % 11]
+        actual = np.where(is_digit[:, 17], digits[:, 17], ID_CHECK_CODE_X)
+        checksum_ok = format_ok & (expected == actual)
+        
+        # 第7-14位为出生日期YYYYMMDD，组装后再反向校验月日是否合法
+        year = digits[:, 6:10] @ np.array([1000, 100, 10, 1])
+        month = digits[:, 10:12] @ np.array([10, 1])
+        day = digits[:, 12:14] @ np.array([10, 1])
+        date_ok = format_ok & (year >= 1900) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31)
+        
+        birth_date = np.full(len(id_number), np.datetime64("NaT"), dtype="datetime64[D]")
+        months = (np.where(date_ok, year, 1970) - 1970) * 12 + np.where(date_ok, month, 1) - 1
+        month_start = months.astype("datetime64[M]").astype("datetime64[D]")
+        candidate = month_start + (np.where(date_ok, day, 1) - 1)
+        same_month = candidate.astype("datetime64[M]") == months.astype("datetime64[M]")
+        date_ok &= same_month & (candidate <= np.datetime64("today"))
+        birth_date[date_ok] = candidate[date_ok]
+        
+        return format_ok, checksum_ok, birth_date
+    
+    def _check_phones(self, phone: np.ndarray) -> np.ndarray:
+        """手机号：11位数字，1开头，第二位为3-9"""
+        codes = self._code_matrix(phone, 11)
+        return (
+            (np.char.str_len(phone) == 11)
+            & ((codes >= ord("0")) & (codes <= ord("9"))).all(axis=1)
+            & (codes[:, 0] == ord("1"))
+            & (codes[:, 1] >= ord("3"))
+        )
+    
+    @staticmethod
+    def _collect_messages(
+        row_numbers: np.ndarray,
+        rules: List[Tuple[np.ndarray, str]],
+        values: Optional[np.ndarray] = None
+    ) -> List[str]:
+        """
+        按行优先、规则顺序生成提示信息
+        
+        只遍历触发了规则的单元格；信息模板中的{value}由values对应行填充
+        """
+        if not rules:
+            return []
+        hits = np.column_stack([condition for condition, _ in rules])
+        rows, rule_indexes = np.nonzero(hits)
+        return [
+            f"第{row_numbers[row] + 2}行：" + rules[rule][1].format(value=values[row] if values is not None else "")
+            for row, rule in zip(rows.tolist(), rule_indexes.tolist())
+        ]
+    
+    def _validate_id_number(self, id_number: str) -> bool:
+        """验证身份证号格式（含GB 11643校验码和出生日期）"""
+        format_ok, checksum_ok, birth_date = self._check_id_numbers(np.array([id_number]))
+        return bool(checksum_ok[0] and not np.isnat(birth_date[0]))
     
     def _validate_phone(self, phone: str) -> bool:
         """验证手机号格式"""
-        pattern = r'^1[3-9]\d{9}$'
-        return bool(re.match(pattern, phone))
+        return bool(re.match(self.PHONE_PATTERN, phone))
     
     def _validate_email(self, email: str) -> bool:
         """验证邮箱格式"""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email))
+        return bool(re.match(self.EMAIL_PATTERN, email))
     
     async def import_candidates_batch(
         self,
@@ -216,41 +424,65 @@ class CandidateImportService:
     ) -> Dict[str, Any]:
         """批量导入考生"""
         
+        batch_id = uuid.uuid4().hex
+        prepared = await self.prepare_import(df, db, batch_id)
+        if not prepared["success"]:
+            return prepared
+        
+        # 分批从暂存表写入考生表，每批单独提交
+        try:
+            imported_count = await self.commit_staged_candidates(
+                db, batch_id, current_user.institution_id, current_user.id
+            )
+        except Exception as e:
+            remaining = await self.count_staged(db, batch_id)
+            imported_count = prepared["valid_count"] - remaining
+            return {
+                "success": False,
+                "total_rows": len(df),
+                "imported_count": imported_count,
+                "remaining_count": remaining,
+                "batch_id": batch_id,
+                "message": f"导入中断：已导入{imported_count}条，剩余{remaining}条保留在暂存批次{batch_id}中。错误：{str(e)}"
+            }
+        
+        return {
+            "success": True,
+            "total_rows": len(df),
+            "imported_count": imported_count,
+            "warning_count": len(prepared["warnings"]),
+            "warnings": prepared["warnings"],
+            "message": f"成功导入{imported_count}条考生记录"
+        }
+    
+    async def prepare_import(
+        self,
+        df: pd.DataFrame,
+        db: AsyncSession,
+        batch_id: str
+    ) -> Dict[str, Any]:
+        """
+        验证导入数据并写入暂存批次
+        
+        验证失败、Excel内重复或身份证号已存在时返回 success=False，且不保留暂存数据
+        """
+        
         # 获取所有考试产品，用于验证
         result = await db.execute(select(ExamProduct))
         exam_products = {product.name: product.id for product in result.scalars().all()}
         
-        validation_results = []
-        valid_candidates = []
-        total_errors = []
-        total_warnings = []
-        
-        # 逐行验证数据
-        for index, row in df.iterrows():
-            validation = self.validate_candidate_data(row, index)
-            validation_results.append(validation)
-            
-            if validation["valid"]:
-                # 验证考试产品是否存在
-                exam_product_name = validation["data"]["exam_product_name"]
-                if exam_product_name not in exam_products:
-                    validation["valid"] = False
-                    validation["errors"].append(
-                        f"第{index + 2}行：考试产品'{exam_product_name}'不存在"
-                    )
-                else:
-                    validation["data"]["exam_product_id"] = exam_products[exam_product_name]
-                    valid_candidates.append(validation["data"])
-            
-            total_errors.extend(validation["errors"])
-            total_warnings.extend(validation["warnings"])
+        # 列式验证全部数据（在线程池中执行，避免大文件验证阻塞事件循环）
+        validation = await run_in_thread(self.validate_candidate_frame, df, exam_products)
+        total_errors = validation["errors"]
+        total_warnings = validation["warnings"]
+        valid_count = int(validation["valid"].sum())
         
         # 如果有错误，返回错误信息
         if total_errors:
             return {
                 "success": False,
                 "total_rows": len(df),
-                "valid_count": len(valid_candidates),
+                "valid_count": valid_count,
                 "error_count": len(total_errors),
                 "warning_count": len(total_warnings),
                 "errors": total_errors[:20],  # 最多返回20个错误
@@ -258,15 +490,9 @@ class CandidateImportService:
                 "message": f"数据验证失败，共{len(total_errors)}个错误"
             }
         
-        # 检查重复的身份证号
-        id_numbers = [candidate["id_number"] for candidate in valid_candidates]
-        duplicate_ids = []
-        seen_ids = set()
-        for id_number in id_numbers:
-            if id_number in seen_ids:
-                duplicate_ids.append(id_number)
-            else:
-                seen_ids.add(id_number)
+        # 检查Excel内重复的身份证号
+        valid_data = validation["data"][validation["valid"]]
+        duplicate_ids = valid_data["id_number"][valid_data["id_number"].duplicated()].unique().tolist()
         
         if duplicate_ids:
             return {
@@ -274,56 +500,151 @@ class CandidateImportService:
                 "message": f"Excel中存在重复的身份证号：{', '.join(duplicate_ids)}"
             }
         
-        # 检查数据库中是否已存在
-        existing_result = await db.execute(
-            select(Candidate.id_number).where(
-                Candidate.id_number.in_(id_numbers)
-            )
-        )
-        existing_ids = [row[0] for row in existing_result.all()]
+        # 写入暂存表，在数据库内与考生表关联查重
+        try:
+            await self.stage_candidates(db, batch_id, valid_data)
+            existing_ids = await self.find_existing_id_numbers(db, batch_id)
+        except Exception as e:
+            await db.rollback()
+            await self.clear_staging(db, batch_id)
+            return {
+                "success": False,
+                "message": f"导入失败：{str(e)}"
+            }
         
         if existing_ids:
+            await self.clear_staging(db, batch_id)
             return {
                 "success": False,
                 "message": f"以下身份证号已存在于系统中：{', '.join(existing_ids)}"
             }
         
-        # 执行批量导入
-        try:
-            imported_count = 0
-            for candidate_data in valid_candidates:
-                candidate = Candidate(
-                    name=candidate_data["name"],
-                    id_number=candidate_data["id_number"],
-                    phone=candidate_data["phone"],
-                    email=candidate_data["email"],
-                    gender=candidate_data["gender"],
-                    exam_product_id=candidate_data["exam_product_id"],
-                    institution_id=current_user.institution_id,
-                    created_by=current_user.id,
-                    notes=candidate_data["notes"],
-                    status="待排期"
-                )
-                db.add(candidate)
-                imported_count += 1
-            
+        return {
+            "success": True,
+            "total_rows": len(df),
+            "valid_count": valid_count,
+            "warnings": total_warnings
+        }
+    
+    async def stage_candidates(
+        self,
+        db: AsyncSession,
+        batch_id: str,
+        valid_data: pd.DataFrame,
+        chunk_size: Optional[int] = None
+    ) -> int:
+        """
+        将验证通过的考生数据分批写入暂存表
+        
+        每批使用一条 executemany 插入并提交，返回暂存的行数
+        """
+        chunk_size = chunk_size or self.chunk_size
+        staged = valid_data[self.STAGING_FIELDS].assign(
+            batch_id=batch_id,
+            row_number=valid_data.index.to_numpy() + 2
+        )
+        records = staged.astype(object).where(staged.notna(), None).to_dict("records")
+        
+        for start in range(0, len(records), chunk_size):
+            chunk = records[start:start + chunk_size]
+            for record in chunk:
+                record["row_number"] = int(record["row_number"])
+                record["exam_product_id"] = int(record["exam_product_id"])
+                record["id_number_hash"] = hash_id_number(record["id_number"])
+            await db.execute(insert(CandidateImportStaging), chunk)
             await db.commit()
+        
+        return len(records)
+    
+    async def find_existing_id_numbers(self, db: AsyncSession, batch_id: str) -> List[str]:
+        """查询暂存批次中已存在于考生表的身份证号（按身份证号索引关联）"""
+        result = await db.execute(
+            select(CandidateImportStaging.id_number)
+            .join(Candidate, Candidate.id_number == CandidateImportStaging.id_number)
+            .where(CandidateImportStaging.batch_id == batch_id)
+            .order_by(CandidateImportStaging.row_number)
+        )
+        return list(dict.fromkeys(result.scalars().all()))
+    
+    async def commit_staged_candidates(
+        self,
+        db: AsyncSession,
+        batch_id: str,
+        institution_id: int,
+        created_by: int,
+        chunk_size: Optional[int] = None,
+        on_chunk: Optional[Callable[[int], Awaitable[Any]]] = None
+    ) -> int:
+        """
+        将暂存批次分批写入考生表
+        
+        每批执行一条 INSERT ... SELECT（以NOT EXISTS排除已存在的身份证号），
+        并在同一事务中删除已写入的暂存行后提交。中途失败时只回滚当前批次，
+        未写入的数据仍保留在暂存表中，可再次调用本方法续传。
+        
+        on_chunk 在每批提交前以本批写入数调用，可在同一事务中记录进度
+        
+        返回本次写入的考生数
+        """
+        chunk_size = chunk_size or self.chunk_size
+        staging = CandidateImportStaging
+        total = 0
+        
+        while True:
+            row_numbers = (await db.execute(
+                select(staging.row_number)
+                .where(staging.batch_id == batch_id)
+                .order_by(staging.row_number)
+                .limit(chunk_size)
+            )).scalars().all()
+            if not row_numbers:
+                break
             
-            return {
-                "success": True,
-                "total_rows": len(df),
-                "imported_count": imported_count,
-                "warning_count": len(total_warnings),
-                "warnings": total_warnings,
-                "message": f"成功导入{imported_count}条考生记录"
-            }
+            in_chunk = and_(
+                staging.batch_id == batch_id,
+                staging.row_number.between(row_numbers[0], row_numbers[-1])
+            )
+            already_exists = select(Candidate.id).where(Candidate.id_number == staging.id_number).exists()
             
-        except Exception as e:
-            await db.rollback()
-            return {
-                "success": False,
-                "message": f"导入失败：{str(e)}"
-            }
+            try:
+                result = await db.execute(
+                    insert(Candidate).from_select(
+                        [
+                            "name", "id_number", "id_number_hash", "id_card", "phone", "email", "gender",
+                            "birth_date", "exam_product_id", "notes",
+                            "institution_id", "created_by", "status"
+                        ],
+                        select(
+                            staging.name, staging.id_number, staging.id_number_hash, staging.id_number, staging.phone,
+                            staging.email, staging.gender, staging.birth_date,
+                            staging.exam_product_id, staging.notes,
+                            literal(institution_id), literal(created_by), literal("待排期")
+                        ).where(in_chunk, ~already_exists)
+                    )
+                )
+                await db.execute(delete(staging).where(in_chunk))
+                if on_chunk:
+                    await on_chunk(result.rowcount)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+            
+            total += result.rowcount
+        
+        return total
+    
+    async def count_staged(self, db: AsyncSession, batch_id: str) -> int:
+        """统计暂存批次中尚未写入考生表的行数"""
+        result = await db.execute(
+            select(func.count(CandidateImportStaging.id)).where(CandidateImportStaging.batch_id == batch_id)
+        )
+        return result.scalar() or 0
+    
+    async def clear_staging(self, db: AsyncSession, batch_id: str):
+        """删除暂存批次"""
+        await db.execute(delete(CandidateImportStaging).where(CandidateImportStaging.batch_id == batch_id))
+        await db.commit()
 
 # 单例服务实例
 candidate_import_service = CandidateImportService()
\ No newline at end of file
@@ -0,0 +1,329 @@
+"""
+考生导入后台任务服务
+上传文件后立即返回任务ID，由后台工作协程完成验证和分批写入；
+导入进度与每批考生数据在同一事务中提交，服务重启后从最后提交的批次继续
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import select, update, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.core.executors import run_in_thread
+from src.db.session import async_session_maker
+from src.db.models import User
+from src.models.candidate_import import CandidateImportJob, ImportJobStatus
+from src.services.candidate_import import candidate_import_service
+
+logger = logging.getLogger(__name__)
+
+
+class CandidateImportJobService:
+    """考生导入任务服务"""
+
+    def __init__(self, session_maker=async_session_maker):
+        self.session_maker = session_maker
+        self.worker_count = settings.IMPORT_WORKERS
+        self.upload_dir = settings.IMPORT_UPLOAD_DIR
+        self.stale_seconds = settings.IMPORT_JOB_STALE_SECONDS  # 超过该时间无进度视为任务中断
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self):
+        """启动工作协程，并恢复中断的任务"""
+        if self._workers:
+            return
+
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+        try:
+            recovered = await self.recover_jobs()
+            if recovered:
+                logger.info(f"恢复{recovered}个未完成的导入任务")
+        except Exception as e:
+            logger.warning(f"恢复导入任务失败: {e}")
+
+    async def stop(self):
+        """停止工作协程，未完成的任务在下次启动时恢复"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    async def submit(self, file: UploadFile, db: AsyncSession, current_user: User) -> CandidateImportJob:
+        """保存上传文件并创建导入任务"""
+        contents = await file.read()
+
+        job_id = uuid.uuid4().hex
+        file_path = os.path.join(self.upload_dir, f"{job_id}{os.path.splitext(file.filename)[1]}")
+        await run_in_thread(self._write_file, file_path, contents)
+
+        job = CandidateImportJob(
+            id=job_id,
+            institution_id=current_user.institution_id,
+            created_by=current_user.id,
+            file_name=file.filename,
+            file_path=file_path,
+            status=ImportJobStatus.PENDING
+        )
+        db.add(job)
+        await db.commit()
+
+        self._enqueue(job_id)
+        return job
+
+    async def recover_jobs(self) -> int:
+        """将中断的未完成任务重新加入队列"""
+        async with self.session_maker() as db:
+            result = await db.execute(
+                select(CandidateImportJob.id).where(
+                    CandidateImportJob.status.in_(ImportJobStatus.UNFINISHED),
+                    self._claimable()
+                )
+            )
+            job_ids = result.scalars().all()
+
+        for job_id in job_ids:
+            self._enqueue(job_id)
+        return len(job_ids)
+
+    async def resume(self, db: AsyncSession, job: CandidateImportJob) -> CandidateImportJob:
+        """从最后提交的批次继续执行失败的任务"""
+        if job.status != ImportJobStatus.FAILED:
+            raise HTTPException(status_code=400, detail="只有失败的任务可以续传")
+
+        if not await candidate_import_service.count_staged(db, job.id):
+            raise HTTPException(status_code=400, detail="该任务没有待导入的数据，请重新上传文件")
+
+        job.status = ImportJobStatus.IMPORTING
+        job.message = None
+        job.finished_at = None
+        job.heartbeat_at = None
+        await db.commit()
+
+        self._enqueue(job.id)
+        return job
+
+    async def get_job(self, db: AsyncSession, job_id: str, current_user: User) -> CandidateImportJob:
+        """获取导入任务，机构用户只能查看本机构的任务"""
+        job = await db.get(CandidateImportJob, job_id)
+        if not job or (current_user.institution_id and job.institution_id != current_user.institution_id):
+            raise HTTPException(status_code=404, detail="导入任务不存在")
+        return job
+
+    async def list_jobs(
+        self,
+        db: AsyncSession,
+        institution_id: Optional[int] = None,
+        page: int = 1,
+        size: int = 10
+    ) -> Dict[str, Any]:
+        """分页查询导入历史"""
+        conditions = []
+        if institution_id:
+            conditions.append(CandidateImportJob.institution_id == institution_id)
+
+        summary = (await db.execute(
+            select(
+                func.count(CandidateImportJob.id),
+                func.coalesce(func.sum(CandidateImportJob.imported_count), 0),
+                func.max(CandidateImportJob.created_at)
+            ).where(*conditions)
+        )).one()
+
+        result = await db.execute(
+            select(CandidateImportJob)
+            .where(*conditions)
+            .order_by(CandidateImportJob.created_at.desc())
+            .offset((page - 1) * size)
+            .limit(size)
+        )
+
+        return {
+            "items": [self.job_to_dict(job) for job in result.scalars().all()],
+            "total": summary[0],
+            "total_imported": int(summary[1]),
+            "recent_import": summary[2].isoformat() if summary[2] else None
+        }
+
+    def job_to_dict(self, job: CandidateImportJob) -> Dict[str, Any]:
+        """导入任务转换为响应数据"""
+        return {
+            "job_id": job.id,
+            "institution_id": job.institution_id,
+            "created_by": job.created_by,
+            "file_name": job.file_name,
+            "status": job.status,
+            "total_rows": job.total_rows,
+            "valid_count": job.valid_count,
+            "imported_count": job.imported_count,
+            "error_count": job.error_count,
+            "progress": round(job.imported_count * 100 / job.valid_count, 1) if job.valid_count else 0,
+            "errors": job.errors or [],
+            "warnings": job.warnings or [],
+            "message": job.message,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None
+        }
+
+    async def run_job(self, db: AsyncSession, job_id: str):
+        """执行导入任务：验证并暂存数据，然后分批写入考生表"""
+        if not await self._claim(db, job_id):
+            return
+
+        job = await db.get(CandidateImportJob, job_id)
+        try:
+            if job.status != ImportJobStatus.IMPORTING and not await self._prepare(db, job):
+                return
+            await self._import(db, job)
+        except Exception as e:
+            # 已提交的批次保留，剩余数据留在暂存表中等待续传
+            await db.rollback()
+            logger.error(f"导入任务{job_id}中断: {e}")
+            await self._finish(db, job_id, ImportJobStatus.FAILED, message=f"导入中断：{str(e)}")
+
+    async def _prepare(self, db: AsyncSession, job: CandidateImportJob) -> bool:
+        """验证上传文件并写入暂存表，验证失败时结束任务"""
+        job.status = ImportJobStatus.VALIDATING
+        job.started_at = job.started_at or datetime.now()
+        job.heartbeat_at = datetime.now()
+        await db.commit()
+
+        # 清理上次验证中断时残留的暂存数据
+        await candidate_import_service.clear_staging(db, job.id)
+
+        try:
+            contents = await run_in_thread(self._read_file, job.file_path)
+            df = await run_in_thread(candidate_import_service.parse_excel_content, contents)
+        except (HTTPException, OSError) as e:
+            message = e.detail if isinstance(e, HTTPException) else f"读取上传文件失败：{str(e)}"
+            await self._finish(db, job.id, ImportJobStatus.FAILED, message=message)
+            return False
+
+        prepared = await candidate_import_service.prepare_import(df, db, job.id)
+        if not prepared["success"]:
+            await self._finish(
+                db, job.id, ImportJobStatus.FAILED,
+                total_rows=prepared.get("total_rows", len(df)),
+                valid_count=prepared.get("valid_count", 0),
+                error_count=prepared.get("error_count", 0),
+                errors=prepared.get("errors"),
+                warnings=prepared.get("warnings"),
+                message=prepared["message"]
+            )
+            return False
+
+        file_path = job.file_path
+        job.status = ImportJobStatus.IMPORTING
+        job.total_rows = prepared["total_rows"]
+        job.valid_count = prepared["valid_count"]
+        job.imported_count = 0
+        job.warnings = prepared["warnings"][:100]
+        job.file_path = None
+        job.heartbeat_at = datetime.now()
+        await db.commit()
+
+        # 导入状态提交后上传文件不再需要；提交前中断时仍可从文件重新验证
+        self._remove_file(file_path)
+        return True
+
+    async def _import(self, db: AsyncSession, job: CandidateImportJob):
+        """分批写入考生表，每批的进度与数据在同一事务中提交"""
+
+        async def record_progress(count: int):
+            await db.execute(
+                update(CandidateImportJob)
+                .where(CandidateImportJob.id == job.id)
+                .values(
+                    imported_count=CandidateImportJob.imported_count + count,
+                    heartbeat_at=datetime.now()
+                )
+            )
+
+        await candidate_import_service.commit_staged_candidates(
+            db, job.id, job.institution_id, job.created_by, on_chunk=record_progress
+        )
+
+        await db.refresh(job)
+        await self._finish(
+            db, job.id, ImportJobStatus.COMPLETED,
+            message=f"成功导入{job.imported_count}条考生记录"
+        )
+
+    async def _claim(self, db: AsyncSession, job_id: str) -> bool:
+        """
+        认领任务
+
+        以条件更新写入心跳时间，多个进程同时恢复同一任务时只有一个能认领成功
+        """
+        result = await db.execute(
+            update(CandidateImportJob)
+            .where(
+                CandidateImportJob.id == job_id,
+                CandidateImportJob.status.in_(ImportJobStatus.UNFINISHED),
+                self._claimable()
+            )
+            .values(heartbeat_at=datetime.now())
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+    def _claimable(self):
+        """未被认领或心跳已过期的任务"""
+        stale_before = datetime.now() - timedelta(seconds=self.stale_seconds)
+        return or_(
+            CandidateImportJob.heartbeat_at.is_(None),
+            CandidateImportJob.heartbeat_at < stale_before
+        )
+
+    async def _finish(self, db: AsyncSession, job_id: str, status: str, **values):
+        """结束任务并记录结果"""
+        await db.execute(
+            update(CandidateImportJob)
+            .where(CandidateImportJob.id == job_id)
+            .values(status=status, finished_at=datetime.now(), heartbeat_at=datetime.now(), **values)
+        )
+        await db.commit()
+
+    async def _worker(self):
+        """工作协程：依次执行队列中的任务"""
+        while True:
+            job_id = await self._queue.get()
+            try:
+                async with self.session_maker() as db:
+                    await self.run_job(db, job_id)
+            except Exception as e:
+                logger.error(f"导入任务{job_id}执行失败: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _enqueue(self, job_id: str):
+        """加入任务队列，未启动工作协程时由下次启动恢复"""
+        if self._queue is not None:
+            self._queue.put_nowait(job_id)
+
+    def _write_file(self, file_path: str, contents: bytes):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(contents)
+
+    def _read_file(self, file_path: str) -> bytes:
+        with open(file_path, "rb") as f:
+            return f.read()
+
+    def _remove_file(self, file_path: Optional[str]):
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+
+
+# 单例服务实例
+candidate_import_job_service = CandidateImportJobService()
@@ -0,0 +1,87 @@
+"""
+考生身份证号登录
+按身份证号的带密钥哈希在索引列上查询（一次索引读取，不扫描、不记录原始身份证号），成功后签发考生访问令牌。
+按客户端IP和身份证号分别使用令牌桶限流，IP限流在查询数据库之前执行
+"""
+import logging
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.auth import create_candidate_token
+from src.core.config import settings
+from src.core.rate_limit import TokenBucketLimiter
+from src.core.security import hash_id_number
+from src.models.candidate import Candidate
+from src.services.qrcode_batch import mask_id_number
+
+logger = logging.getLogger(__name__)
+
+
+class CandidateLoginService:
+    """考生登录服务"""
+
+    def __init__(self):
+        self.ip_limiter = TokenBucketLimiter(settings.CANDIDATE_LOGIN_IP_PER_MINUTE)
+        self.id_limiter = TokenBucketLimiter(settings.CANDIDATE_LOGIN_ID_PER_MINUTE)
+        self.token_expire_minutes = settings.CANDIDATE_TOKEN_EXPIRE_MINUTES
+
+    async def login(self, db: AsyncSession, id_number: str, client_ip: Optional[str]) -> Dict[str, Any]:
+        """验证身份证号并签发令牌；格式错误400，限流429，考生不存在404"""
+        self._check_rate(self.ip_limiter, f"ip:{client_ip}")
+
+        id_number = (id_number or "").strip()
+        if len(id_number) != 18:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="身份证号格式不正确，请输入18位身份证号"
+            )
+
+        id_number_hash = hash_id_number(id_number)
+        self._check_rate(self.id_limiter, f"id:{id_number_hash}")
+
+        result = await db.execute(
+            select(Candidate).where(Candidate.id_number_hash == id_number_hash).limit(1)
+        )
+        candidate = result.scalar_one_or_none()
+        if not candidate:
+            logger.info(f"考生登录失败: ip={client_ip}, id_hash={id_number_hash[:12]}")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="未找到该身份证号对应的考生信息，请联系培训机构确认报名状态"
+            )
+
+        return {
+            "access_token": create_candidate_token(candidate.id),
+            "token_type": "bearer",
+            "expires_in": self.token_expire_minutes * 60,
+            "candidate": candidate
+        }
+
+    def _check_rate(self, limiter: TokenBucketLimiter, key: str):
+        wait = limiter.acquire(key)
+        if wait:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="登录尝试过于频繁，请稍后再试",
+                headers={"Retry-After": str(int(wait) + 1)}
+            )
+
+    @staticmethod
+    def candidate_info(candidate: Candidate) -> Dict[str, Any]:
+        """登录响应中的考生信息（身份证号脱敏）"""
+        return {
+            "id": candidate.id,
+            "name": candidate.name,
+            "id_number": mask_id_number(candidate.id_number),
+            "phone": candidate.phone,
+            "status": candidate.status,
+            "institution_id": candidate.institution_id,
+            "exam_product_id": candidate.exam_product_id
+        }
+
+
+# 单例服务实例
+candidate_login_service = CandidateLoginService()
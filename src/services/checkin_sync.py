@@ -0,0 +1,258 @@
+"""
+离线扫码同步服务
+考务人员设备在网络不可用时本地校验二维码并暂存签到记录，恢复网络后批量上传；
+服务端在一个事务内幂等地应用，同一排期以最早的扫码时间为准。
+同时提供考场当日的精简名单，供设备离线核对排期与考生
+"""
+import hashlib
+import json
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.core.qr_token import QRTokenError, QRTokenExpired, decode_qr_token
+from src.db.models import User
+from src.models.candidate import Candidate
+from src.models.schedule import Schedule
+from src.services.qrcode_service import CHECKED_IN_STATUSES
+from src.services.realtime_events import publish_checkin
+from src.services.venue_projection import mask_name
+
+ROSTER_FIELDS = ["schedule_id", "candidate_id", "candidate_name", "schedule_type", "start_time", "end_time", "checked_in"]
+
+
+class CheckinSyncService:
+    """离线扫码同步服务"""
+
+    def __init__(self):
+        self.secret_key = settings.QRCODE_SECRET_KEY
+        self.max_clock_skew = timedelta(minutes=5)  # 允许设备时钟超前的时间
+        self.early_checkin = timedelta(minutes=30)  # 可提前签到的时间
+
+    async def build_roster(self, db: AsyncSession, venue_id: int, exam_date: date) -> Dict[str, Any]:
+        """考场当日名单，每行按ROSTER_FIELDS顺序排列，version随内容变化"""
+        result = await db.execute(
+            select(
+                Schedule.id, Schedule.candidate_id, Candidate.name, Schedule.schedule_type,
+                Schedule.start_time, Schedule.end_time, Schedule.check_in_status
+            )
+            .join(Candidate, Candidate.id == Schedule.candidate_id)
+            .where(
+                and_(
+                    Schedule.venue_id == venue_id,
+                    Schedule.scheduled_date >= exam_date,
+                    Schedule.scheduled_date < exam_date + timedelta(days=1),
+                    or_(Schedule.status.is_(None), Schedule.status != "cancelled")
+                )
+            )
+            .order_by(Schedule.start_time, Schedule.id)
+        )
+
+        rows = [
+            [
+                schedule_id, candidate_id, mask_name(name), schedule_type,
+                start_time.strftime("%H:%M"), end_time.strftime("%H:%M"),
+                1 if check_in_status in CHECKED_IN_STATUSES else 0
+            ]
+            for schedule_id, candidate_id, name, schedule_type, start_time, end_time, check_in_status in result.all()
+        ]
+        version = hashlib.sha1(json.dumps(rows, ensure_ascii=False).encode()).hexdigest()[:16]
+
+        return {
+            "venue_id": venue_id,
+            "exam_date": exam_date.isoformat(),
+            "version": version,
+            "fields": ROSTER_FIELDS,
+            "rows": rows
+        }
+
+    async def apply_scans(
+        self,
+        db: AsyncSession,
+        scans: List[Tuple[str, datetime]],
+        staff_user: User
+    ) -> Dict[str, Any]:
+        """
+        批量应用离线扫码记录(二维码内容, 扫码时间)
+
+        每条记录的结果为 applied（成为该排期的签到记录）、duplicate（已同步过）、
+        superseded（已有更早的扫码）或 rejected（二维码无效、排期不符、排期已取消等）；
+        全部写入在同一事务中提交，重复上传同一批记录不会产生新的写入
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(scans)
+        by_schedule: Dict[int, List[Dict[str, Any]]] = {}
+        now = datetime.utcnow()
+
+        # 校验签名及扫码时令牌是否有效
+        for index, (qr_data, scanned_at) in enumerate(scans):
+            scanned_at = self._to_utc(scanned_at)
+            if scanned_at > now + self.max_clock_skew:
+                results[index] = self._result(index, None, "rejected", "扫码时间晚于服务器时间")
+                continue
+            try:
+                token = decode_qr_token(self.secret_key, qr_data, now=self._to_local(scanned_at))
+            except QRTokenExpired:
+                results[index] = self._result(index, None, "rejected", "扫码时二维码已过期")
+                continue
+            except QRTokenError:
+                results[index] = self._result(index, None, "rejected", "二维码无效")
+                continue
+            if token["type"] != "schedule_checkin" or not token["schedule_id"]:
+                results[index] = self._result(index, None, "rejected", "不是签到二维码")
+                continue
+            by_schedule.setdefault(token["schedule_id"], []).append({"index": index, "scanned_at": scanned_at, **token})
+
+        schedules = {}
+        if by_schedule:
+            result = await db.execute(select(Schedule).where(Schedule.id.in_(list(by_schedule))))
+            schedules = {schedule.id: schedule for schedule in result.scalars().all()}
+
+        schedule_rows = []
+        winners: Dict[int, Tuple[Dict[str, Any], int, str]] = {}  # 排期ID -> (胜出的扫码, 考生ID, 签到状态)
+        for schedule_id, schedule_scans in by_schedule.items():
+            schedule = schedules.get(schedule_id)
+            winner = None
+            # 同一排期以最早的有效扫码为准
+            for scan in sorted(schedule_scans, key=lambda scan: (scan["scanned_at"], scan["index"])):
+                index = scan["index"]
+                if not schedule or schedule.candidate_id != scan["candidate_id"]:
+                    results[index] = self._result(index, schedule_id, "rejected", "排期记录不存在")
+                elif schedule.status == "cancelled":
+                    results[index] = self._result(index, schedule_id, "rejected", "排期已取消")
+                elif scan["scanned_at"] < schedule.start_time - self.early_checkin:
+                    results[index] = self._result(index, schedule_id, "rejected", "扫码时未到签到时间")
+                elif winner is not None:
+                    same_scan = scan["nonce"] == winner["nonce"] and scan["scanned_at"] == winner["scanned_at"]
+                    results[index] = self._result(
+                        index, schedule_id, "duplicate" if same_scan else "superseded",
+                        "批次内重复记录" if same_scan else "已有更早的扫码记录"
+                    )
+                else:
+                    winner = scan
+            if winner is None:
+                continue
+
+            index = winner["index"]
+            if schedule.check_in_status in CHECKED_IN_STATUSES and schedule.check_in_time:
+                if schedule.check_in_nonce == winner["nonce"] and schedule.check_in_time == winner["scanned_at"]:
+                    results[index] = self._result(index, schedule_id, "duplicate", "已同步", schedule.check_in_status)
+                    continue
+                if schedule.check_in_time <= winner["scanned_at"]:
+                    results[index] = self._result(index, schedule_id, "superseded", "已有更早的签到记录", schedule.check_in_status)
+                    continue
+
+            checkin_status = "late" if winner["scanned_at"] > schedule.end_time else "checked_in"
+            schedule_rows.append({
+                "b_id": schedule_id,
+                "b_status": checkin_status,
+                "b_time": winner["scanned_at"],
+                "b_nonce": winner["nonce"],
+                "b_by": staff_user.id
+            })
+            winners[schedule_id] = (winner, schedule.candidate_id, checkin_status)
+
+        applied_ids = []
+        try:
+            if schedule_rows:
+                await db.execute(self._checkin_statement(), schedule_rows)
+                # 条件更新可能未命中（并发同步已写入更早的扫码或排期已被取消），以写入后的排期记录确定结果
+                written = await db.execute(
+                    select(
+                        Schedule.id, Schedule.status, Schedule.check_in_nonce, Schedule.check_in_time,
+                        Schedule.check_in_status
+                    )
+                    .where(Schedule.id.in_(list(winners)))
+                )
+                candidate_rows = []
+                for schedule_id, status, nonce, check_in_time, check_in_status in written.all():
+                    winner, candidate_id, checkin_status = winners[schedule_id]
+                    index = winner["index"]
+                    if status == "cancelled":
+                        results[index] = self._result(index, schedule_id, "rejected", "排期已取消")
+                    elif nonce == winner["nonce"] and check_in_time == winner["scanned_at"]:
+                        applied_ids.append(schedule_id)
+                        candidate_rows.append({
+                            "b_id": candidate_id,
+                            "b_status": "考试中" if checkin_status == "checked_in" else "迟到"
+                        })
+                        results[index] = self._result(index, schedule_id, "applied", "签到成功", checkin_status)
+                    else:
+                        results[index] = self._result(index, schedule_id, "superseded", "已有更早的签到记录", check_in_status)
+                if candidate_rows:
+                    await db.execute(
+                        update(Candidate.__table__)
+                        .where(Candidate.__table__.c.id == bindparam("b_id"))
+                        .values(status=bindparam("b_status")),
+                        candidate_rows
+                    )
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+        if applied_ids:
+            await publish_checkin(applied_ids)
+
+        summary = {status: 0 for status in ("applied", "duplicate", "superseded", "rejected")}
+        for result in results:
+            summary[result["status"]] += 1
+        return {"summary": summary, "results": results, "synced_at": now.isoformat()}
+
+    def _checkin_statement(self):
+        """按排期写入签到：排期未取消，且仍未签到或已有的签到时间晚于本次扫码时更新"""
+        table = Schedule.__table__
+        return (
+            update(table)
+            .where(
+                and_(
+                    table.c.id == bindparam("b_id"),
+                    or_(table.c.status.is_(None), table.c.status != "cancelled"),
+                    or_(
+                        table.c.check_in_status.is_(None),
+                        and_(*[table.c.check_in_status != checked_in for checked_in in CHECKED_IN_STATUSES]),
+                        table.c.check_in_time.is_(None),
+                        table.c.check_in_time > bindparam("b_time")
+                    )
+                )
+            )
+            .values(
+                check_in_status=bindparam("b_status"),
+                check_in_time=bindparam("b_time"),
+                check_in_nonce=bindparam("b_nonce"),
+                check_in_by=bindparam("b_by"),
+                status="confirmed"
+            )
+        )
+
+    def _result(
+        self,
+        index: int,
+        schedule_id: Optional[int],
+        status: str,
+        detail: str,
+        checkin_status: Optional[str] = None
+    ) -> Dict[str, Any]:
+        return {
+            "index": index,
+            "schedule_id": schedule_id,
+            "status": status,
+            "detail": detail,
+            "checkin_status": checkin_status
+        }
+
+    def _to_utc(self, value: datetime) -> datetime:
+        """转为不带时区的UTC时间（与签到时间列一致），不带时区的输入按UTC处理"""
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.replace(microsecond=0)
+
+    def _to_local(self, value: datetime) -> datetime:
+        """UTC时间转为本地时间（二维码过期时间按本地时间校验）"""
+        return value.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+
+
+# 单例服务实例
+checkin_sync_service = CheckinSyncService()
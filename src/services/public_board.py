@@ -0,0 +1,222 @@
+"""
+公共看板推送
+每个worker从考场状态投影读取当日各考场状态，与上次结果比较得到增量，通过SSE推送给所有大屏；
+新连接先收到完整快照，之后只收到有变化的考场。保留最近的增量供断线重连时按Last-Event-ID补发，
+无法补发（超出保留范围、其他worker产生的ID、推送积压）时重新发送快照
+"""
+import asyncio
+import json
+import logging
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from src.core.config import settings
+from src.services.venue_projection import VenueProjection, venue_projection
+
+logger = logging.getLogger(__name__)
+
+def summarize(board: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    venues = board.values()
+    return {
+        "total_venues": len(board),
+        "active_venues": sum(1 for venue in venues if venue["status"] == "active"),
+        "total_waiting_candidates": sum(venue["waiting_count"] for venue in venues),
+        "active_exams": sum(1 for venue in venues if venue["current_candidate"])
+    }
+
+
+def format_event(event: Dict[str, Any]) -> str:
+    """编码为SSE消息"""
+    return (
+        f"id: {event['id']}\n"
+        f"event: {event['event']}\n"
+        f"data: {json.dumps(event['data'], ensure_ascii=False, separators=(',', ':'))}\n\n"
+    )
+
+
+class BoardSubscriber:
+    """一个SSE连接，事件积压超过上限时丢弃积压并改为发送快照"""
+
+    def __init__(self, max_pending: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.resync = False
+
+    def put(self, event: Dict[str, Any]):
+        if self.resync:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.resync = True
+            self.queue.put_nowait(None)  # 唤醒等待中的连接
+
+
+class PublicBoard:
+    """公共看板状态及SSE订阅"""
+
+    def __init__(self, projection: VenueProjection = venue_projection):
+        self.projection = projection
+        self.refresh_seconds = settings.PUBLIC_BOARD_REFRESH_SECONDS
+        self.heartbeat_seconds = settings.PUBLIC_BOARD_HEARTBEAT_SECONDS
+        self.max_pending = settings.PUBLIC_BOARD_MAX_PENDING
+        self.epoch = uuid.uuid4().hex[:8]  # 事件ID前缀，区分不同worker及重启
+        self.seq = 0
+        self.board: Optional[Dict[int, Dict[str, Any]]] = None
+        self.summary: Dict[str, Any] = {}
+        self.updated_at: Optional[datetime] = None
+        self.stale = True  # 无连接期间不比较，下一个连接到来时先刷新
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=settings.PUBLIC_BOARD_HISTORY)
+        self._subscribers: set = set()
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self._demands: List[Callable[[], bool]] = []  # 其他需要看板保持刷新的使用方
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def last_event_id(self) -> str:
+        return f"{self.epoch}-{self.seq}"
+
+    # ===== 状态计算 =====
+
+    def apply(self, board: Dict[int, Dict[str, Any]], now: datetime) -> Optional[Dict[str, Any]]:
+        """用新计算的状态替换当前状态，有变化时生成增量事件并推送"""
+        previous = self.board
+        self.board, self.updated_at = board, now
+        summary = summarize(board)
+        if previous is None:
+            self.summary = summary
+            return None
+
+        changed = [venue for venue_id, venue in board.items() if previous.get(venue_id) != venue]
+        removed = [venue_id for venue_id in previous if venue_id not in board]
+        if not changed and not removed and summary == self.summary:
+            return None
+
+        self.summary = summary
+        self.seq += 1
+        event = {
+            "id": self.last_event_id,
+            "event": "patch",
+            "data": {"venues": changed, "removed": removed, "summary": summary, "updated_at": now.isoformat()}
+        }
+        self._history.append(event)
+        for subscriber in list(self._subscribers):
+            subscriber.put(event)
+        for listener in self._listeners:
+            try:
+                listener(changed)
+            except Exception as e:
+                logger.warning(f"考场状态变化通知失败: {e}")
+        return event
+
+    async def refresh(self):
+        """从考场状态投影读取并与当前状态比较"""
+        now = datetime.utcnow().replace(microsecond=0)
+        self.apply(self.projection.venue_states(now), now)
+        self.stale = False
+
+    def add_listener(
+        self,
+        listener: Callable[[List[Dict[str, Any]]], None],
+        active: Optional[Callable[[], bool]] = None
+    ):
+        """注册考场状态变化回调，参数为有变化的考场；active返回True时即使没有SSE连接也保持刷新"""
+        self._listeners.append(listener)
+        if active:
+            self._demands.append(active)
+
+    async def venues(self) -> Dict[int, Dict[str, Any]]:
+        """当前各考场状态，无连接期间未比较时先刷新"""
+        if self.stale:
+            await self.refresh()
+        return self.board or {}
+
+    def notify(self):
+        """考场状态投影有变化，尽快比较并推送"""
+        self._changed.set()
+
+    # ===== 订阅 =====
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "id": self.last_event_id,
+            "event": "snapshot",
+            "data": {
+                "venues": list(self.board.values()) if self.board else [],
+                "summary": self.summary,
+                "updated_at": self.updated_at.isoformat() if self.updated_at else None
+            }
+        }
+
+    def replay(self, last_event_id: Optional[str]) -> List[Dict[str, Any]]:
+        """断线重连时需补发的事件，无法补发时返回快照"""
+        if last_event_id == self.last_event_id:
+            return []
+        epoch, _, seq = (last_event_id or "").partition("-")
+        if epoch == self.epoch and seq.isdigit():
+            missed = [event for event in self._history if int(event["id"].rsplit("-", 1)[1]) > int(seq)]
+            if missed and int(missed[0]["id"].rsplit("-", 1)[1]) == int(seq) + 1:
+                return missed
+        return [self.snapshot()]
+
+    async def subscribe(self, last_event_id: Optional[str] = None) -> Tuple[BoardSubscriber, List[Dict[str, Any]]]:
+        """注册连接，返回(订阅者, 首先发送的事件)"""
+        if self.stale:
+            await self.refresh()
+        subscriber = BoardSubscriber(self.max_pending)
+        self._subscribers.add(subscriber)
+        return subscriber, self.replay(last_event_id)
+
+    def unsubscribe(self, subscriber: BoardSubscriber):
+        self._subscribers.discard(subscriber)
+
+    async def next_event(self, subscriber: BoardSubscriber) -> Optional[Dict[str, Any]]:
+        """等待下一个事件，超过心跳间隔返回None"""
+        try:
+            event = await asyncio.wait_for(subscriber.queue.get(), self.heartbeat_seconds)
+        except asyncio.TimeoutError:
+            return None
+        if subscriber.resync:
+            subscriber.resync = False
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            return self.snapshot()
+        return event
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    # ===== 后台刷新 =====
+
+    async def start(self):
+        if self._task:
+            return
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self):
+        """有连接时定期比较（当前考试随时间变化），收到变更通知时提前比较"""
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), self.refresh_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+            if self._subscribers or any(active() for active in self._demands):
+                await self.refresh()
+            else:
+                self.stale = True
+
+
+# 单例看板
+public_board = PublicBoard()
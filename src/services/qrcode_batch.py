@@ -0,0 +1,305 @@
+"""
+考试日二维码批量生成服务
+为指定日期/考场/机构的全部排期生成签到二维码或准考证，
+在进程池中渲染图像，按块流式输出ZIP或多页PDF
+"""
+import asyncio
+import io
+import zipfile
+import zlib
+from datetime import date, datetime, time, timedelta
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+import qrcode
+from PIL import Image, ImageDraw, ImageFont
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.core.executors import ExecutorPool, process_pool
+from src.core.qr_token import encode_qr_token
+from src.models.candidate import Candidate
+from src.models.schedule import Schedule
+from src.models.venue import Venue
+
+# A4纸150dpi下的像素尺寸及PDF页面尺寸(pt)
+PAGE_SIZE = (1240, 1754)
+PAGE_SIZE_PT = (595.28, 841.89)
+# 每页准考证排列：2列4行
+SLIP_COLUMNS, SLIP_ROWS = 2, 4
+SLIPS_PER_PAGE = SLIP_COLUMNS * SLIP_ROWS
+
+SCHEDULE_TYPE_NAMES = {"theory": "理论考试", "practical": "实操考试", "waiting": "候考"}
+
+# 每个进程加载一次的字体
+_fonts: Dict[Tuple[Optional[str], int], Any] = {}
+
+
+# ===== 以下渲染函数在进程池中执行，需为模块级函数 =====
+
+def make_qr_image(token: str, box_size: int = 10, border: int = 4) -> Image.Image:
+    """渲染二维码图像"""
+    qr = qrcode.QRCode(
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        box_size=box_size,
+        border=border,
+    )
+    qr.add_data(token)
+    qr.make(fit=True)
+    return qr.make_image(fill_color="black", back_color="white").get_image()
+
+
+def render_qr_pngs(items: List[Tuple[str, str]]) -> List[Tuple[str, bytes]]:
+    """批量渲染二维码PNG，items为(文件名, 令牌)"""
+    rendered = []
+    for filename, token in items:
+        buffer = io.BytesIO()
+        make_qr_image(token).save(buffer, format="PNG")
+        rendered.append((filename, buffer.getvalue()))
+    return rendered
+
+
+def render_slip_page(slips: List[Dict[str, Any]], font_path: Optional[str] = None) -> Tuple[int, int, bytes]:
+    """
+    渲染一页准考证（灰度），返回(宽, 高, Flate压缩的像素数据)
+
+    压缩后的像素数据可直接作为PDF图像对象内容
+    """
+    page = Image.new("L", PAGE_SIZE, 255)
+    draw = ImageDraw.Draw(page)
+    slip_width, slip_height = PAGE_SIZE[0] // SLIP_COLUMNS, PAGE_SIZE[1] // SLIP_ROWS
+    title_font, text_font = _load_font(font_path, 32), _load_font(font_path, 24)
+
+    for index, slip in enumerate(slips):
+        left = (index % SLIP_COLUMNS) * slip_width
+        top = (index // SLIP_COLUMNS) * slip_height
+        draw.rectangle([left + 10, top + 10, left + slip_width - 10, top + slip_height - 10], outline=0, width=2)
+
+        qr_image = make_qr_image(slip["token"], box_size=7, border=2).convert("L")
+        qr_size = min(slip_height - 40, qr_image.width)
+        page.paste(qr_image.resize((qr_size, qr_size)), (left + slip_width - qr_size - 20, top + 20))
+
+        lines = [
+            (slip["candidate_name"], title_font),
+            (slip["id_number"], text_font),
+            (slip["schedule_type"], text_font),
+            (slip["start_time"], text_font),
+            (slip["venue_name"], text_font),
+        ]
+        y = top + 30
+        for text, font in lines:
+            draw.text((left + 30, y), text, fill=0, font=font)
+            y += 48
+
+    return page.width, page.height, zlib.compress(page.tobytes(), 6)
+
+
+def _load_font(font_path: Optional[str], size: int):
+    """加载字体（需支持中文），不可用时使用默认字体"""
+    key = (font_path, size)
+    if key not in _fonts:
+        try:
+            _fonts[key] = ImageFont.truetype(font_path, size)
+        except (OSError, TypeError, ValueError):
+            _fonts[key] = ImageFont.load_default(size)
+    return _fonts[key]
+
+
+# ===== 流式输出 =====
+
+class _ChunkBuffer(io.RawIOBase):
+    """只写缓冲区，供zipfile写入后按块取出"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class PdfImageStream:
+    """
+    逐页输出的PDF写入器
+
+    每页为一张整页灰度图像；页对象按顺序写出，页树、目录和交叉引用表在最后写出，
+    因此无需在内存中保留整个文档
+    """
+
+    CATALOG_ID, PAGES_ID = 1, 2
+
+    def __init__(self, page_size_pt: Tuple[float, float] = PAGE_SIZE_PT):
+        self.page_width, self.page_height = page_size_pt
+        self._offset = 0
+        self._offsets: Dict[int, int] = {}
+        self._page_ids: List[int] = []
+        self._next_id = 3
+
+    def header(self) -> bytes:
+        return self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def page(self, width: int, height: int, data: bytes) -> bytes:
+        """输出一页（图像对象、内容流、页对象）"""
+        image_id, content_id, page_id = self._next_id, self._next_id + 1, self._next_id + 2
+        self._next_id += 3
+        self._page_ids.append(page_id)
+
+        content = f"q {self.page_width} 0 0 {self.page_height} 0 0 cm /Im0 Do Q".encode()
+        return b"".join([
+            self._object(image_id, (
+                f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode /Length {len(data)} >>"
+            ).encode(), data),
+            self._object(content_id, f"<< /Length {len(content)} >>".encode(), content),
+            self._object(page_id, (
+                f"<< /Type /Page /Parent {self.PAGES_ID} 0 R /MediaBox [0 0 {self.page_width} {self.page_height}] "
+                f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> /Contents {content_id} 0 R >>"
+            ).encode()),
+        ])
+
+    def trailer(self) -> bytes:
+        """输出页树、目录、交叉引用表和文件尾"""
+        kids = " ".join(f"{page_id} 0 R" for page_id in self._page_ids)
+        body = self._object(self.PAGES_ID, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>".encode())
+        body += self._object(self.CATALOG_ID, f"<< /Type /Catalog /Pages {self.PAGES_ID} 0 R >>".encode())
+
+        xref_offset = self._offset
+        lines = [f"xref\n0 {self._next_id}\n", "0000000000 65535 f \n"]
+        lines += [f"{self._offsets[object_id]:010d} 00000 n \n" for object_id in range(1, self._next_id)]
+        lines.append(f"trailer\n<< /Size {self._next_id} /Root {self.CATALOG_ID} 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n")
+        return body + self._emit("".join(lines).encode())
+
+    def _object(self, object_id: int, dictionary: bytes, stream: Optional[bytes] = None) -> bytes:
+        self._offsets[object_id] = self._offset
+        parts = [f"{object_id} 0 obj\n".encode(), dictionary]
+        if stream is not None:
+            parts += [b"\nstream\n", stream, b"\nendstream"]
+        parts.append(b"\nendobj\n")
+        return self._emit(b"".join(parts))
+
+    def _emit(self, data: bytes) -> bytes:
+        self._offset += len(data)
+        return data
+
+
+class QRCodeBatchService:
+    """二维码批量生成服务"""
+
+    def __init__(self, pool: ExecutorPool = process_pool):
+        self.pool = pool
+        self.font_path = settings.SLIP_FONT_PATH
+        self.secret_key = settings.QRCODE_SECRET_KEY
+        self.qr_chunk_size = 50  # 每个渲染任务的二维码数
+
+    async def load_slips(
+        self,
+        db: AsyncSession,
+        exam_date: date,
+        venue_id: Optional[int] = None,
+        institution_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """查询考试日的排期并签发签到令牌（有效期至考试日结束）"""
+        query = (
+            select(
+                Schedule.id, Schedule.candidate_id, Schedule.schedule_type, Schedule.start_time,
+                Candidate.name, Candidate.id_number, Venue.name
+            )
+            .join(Candidate, Candidate.id == Schedule.candidate_id)
+            .outerjoin(Venue, Venue.id == Schedule.venue_id)
+            .where(
+                and_(
+                    Schedule.scheduled_date >= exam_date,
+                    Schedule.scheduled_date < exam_date + timedelta(days=1),
+                    or_(Schedule.status.is_(None), Schedule.status != "cancelled")
+                )
+            )
+            .order_by(Schedule.venue_id, Schedule.start_time, Schedule.id)
+        )
+        if venue_id:
+            query = query.where(Schedule.venue_id == venue_id)
+        if institution_id:
+            query = query.where(Candidate.institution_id == institution_id)
+
+        expires_at = datetime.combine(exam_date, time.max).replace(microsecond=0)
+        result = await db.execute(query)
+
+        return [
+            {
+                "schedule_id": schedule_id,
+                "token": encode_qr_token(self.secret_key, "schedule_checkin", candidate_id, expires_at, schedule_id),
+                "candidate_name": name,
+                "id_number": self._mask_id_number(id_number),
+                "schedule_type": SCHEDULE_TYPE_NAMES.get(schedule_type, schedule_type),
+                "start_time": start_time.strftime("%Y-%m-%d %H:%M"),
+                "venue_name": venue_name or "未分配考场"
+            }
+            for schedule_id, candidate_id, schedule_type, start_time, name, id_number, venue_name in result.all()
+        ]
+
+    async def iter_zip(self, slips: List[Dict[str, Any]]) -> AsyncIterator[bytes]:
+        """逐块输出二维码PNG的ZIP包（PNG已压缩，ZIP内不再压缩）"""
+        items = [(f"{slip['schedule_id']}_{slip['candidate_name']}.png", slip["token"]) for slip in slips]
+        buffer = _ChunkBuffer()
+
+        with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+            async for rendered in self._map_ordered(render_qr_pngs, self._chunks(items, self.qr_chunk_size)):
+                for filename, png in rendered:
+                    archive.writestr(filename, png)
+                yield buffer.drain()
+        yield buffer.drain()
+
+    async def iter_pdf(self, slips: List[Dict[str, Any]]) -> AsyncIterator[bytes]:
+        """逐页输出准考证PDF，每页8张"""
+        pdf = PdfImageStream()
+        yield pdf.header()
+
+        pages = self._chunks(slips, SLIPS_PER_PAGE)
+        async for width, height, data in self._map_ordered(render_slip_page, pages, self.font_path):
+            yield pdf.page(width, height, data)
+        yield pdf.trailer()
+
+    async def _map_ordered(self, func: Callable, chunks: Iterable[Any], *args) -> AsyncIterator[Any]:
+        """
+        在进程池中按顺序执行渲染任务
+
+        最多同时提交 进程数×2 个任务，既让每个进程保持忙碌，又不会一次性积压全部结果
+        """
+        window = self.pool.max_workers * 2
+        pending: List[asyncio.Future] = []
+
+        try:
+            for chunk in chunks:
+                pending.append(asyncio.ensure_future(self.pool.run(func, chunk, *args)))
+                if len(pending) >= window:
+                    yield await pending.pop(0)
+            while pending:
+                yield await pending.pop(0)
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _chunks(self, items: List[Any], size: int) -> Iterable[List[Any]]:
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
+
+    def _mask_id_number(self, id_number: str) -> str:
+        return mask_id_number(id_number)
+
+
+def mask_id_number(id_number: Optional[str]) -> str:
+    """身份证号脱敏，只保留前6位和后4位"""
+    if not id_number or len(id_number) < 10:
+        return id_number or ""
+    return id_number[:6] + "*" * (len(id_number) - 10) + id_number[-4:]
+
+
+# 单例服务实例
+qrcode_batch_service = QRCodeBatchService()
@@ -5,31 +5,69 @@
 import qrcode
 import io
 import base64
-import json
-import secrets
-from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
+import hashlib
+from qrcode.image.svg import SvgPathImage
+from typing import Dict, Any, Optional, Tuple
+from datetime import date, datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, update, and_, or_, func
 from fastapi import HTTPException
 
 from src.models.candidate import Candidate
 from src.models.schedule import Schedule
 from src.models.venue import Venue
 from src.db.models import User
+from src.core.config import settings
+from src.core.cache import MemoryTTLCache
+from src.core.executors import run_in_process
+from src.core.qr_token import encode_qr_token, decode_qr_token, QRTokenError, QRTokenExpired
+from src.services.queue_index import queue_index
+from src.services.realtime_events import publish_checkin
+from src.services.wait_time import wait_time_estimator
+
+# 已完成签到的状态
+CHECKED_IN_STATUSES = ("checked_in", "late")
+
+
+def render_qr_bytes(data: str, image_format: str = "png") -> bytes:
+    """渲染二维码为PNG或SVG字节（在进程池中执行）"""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    
+    buffer = io.BytesIO()
+    if image_format == "svg":
+        qr.make_image(image_factory=SvgPathImage).save(buffer)
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+# 可生成签到二维码的排期状态
+NEXT_SCHEDULE_STATUSES = ("待确认", "confirmed")
 
 
 class QRCodeService:
     """二维码服务"""
     
     def __init__(self):
-        self.secret_key = "exam_site_qrcode_secret_2025"
-        self.qr_expire_minutes = 60  # 二维码有效期(分钟)
+        self.secret_key = settings.QRCODE_SECRET_KEY
+        self.qr_expire_minutes = settings.QRCODE_EXPIRE_MINUTES  # 二维码有效期(分钟)
+        # 令牌在有效期过半前重复使用，相同内容的二维码图像只渲染一次
+        self.token_reuse_seconds = self.qr_expire_minutes * 60 / 2
+        self._token_cache = MemoryTTLCache(maxsize=10000, ttl=self.token_reuse_seconds)
+        self._image_cache = MemoryTTLCache(maxsize=2000, ttl=self.qr_expire_minutes * 60)
     
     async def generate_candidate_qrcode(
         self,
         db: AsyncSession,
-        candidate_id: int
+        candidate_id: int,
+        include_image: bool = True
     ) -> Dict[str, Any]:
         """为考生生成动态二维码"""
         
@@ -45,53 +83,67 @@ class QRCodeService:
         # 获取考生的下一个待进行的排期
         next_schedule = await self._get_next_schedule(db, candidate_id)
         
+        venue_name = None
+        if next_schedule:
+            venue_result = await db.execute(
+                select(Venue.name).where(Venue.id == next_schedule.venue_id)
+            )
+            venue_name = venue_result.scalar_one_or_none()
+        
+        return await self.build_qrcode(candidate_id, next_schedule, venue_name, include_image)
+    
+    async def build_qrcode(
+        self,
+        candidate_id: int,
+        next_schedule: Optional[Schedule],
+        venue_name: Optional[str] = None,
+        include_image: bool = True
+    ) -> Dict[str, Any]:
+        """由已查询的下一个排期生成二维码，不访问数据库"""
+        
         if not next_schedule:
             # 如果没有待进行的排期，生成基础二维码
+            qr_token, expires_at = self._issue_token("candidate_info", candidate_id)
             qr_data = {
                 "type": "candidate_info",
                 "candidate_id": candidate_id,
-                "candidate_name": candidate.name,
-                "id_number": candidate.id_number,
-                "timestamp": datetime.utcnow().isoformat(),
-                "expires_at": (datetime.utcnow() + timedelta(minutes=self.qr_expire_minutes)).isoformat(),
-                "token": self._generate_secure_token(candidate_id)
+                "expires_at": expires_at.isoformat()
             }
         else:
             # 生成包含排期信息的二维码
-            venue_result = await db.execute(
-                select(Venue).where(Venue.id == next_schedule.venue_id)
-            )
-            venue = venue_result.scalar_one_or_none()
-            
+            qr_token, expires_at = self._issue_token("schedule_checkin", candidate_id, next_schedule.id)
             qr_data = {
                 "type": "schedule_checkin",
                 "schedule_id": next_schedule.id,
                 "candidate_id": candidate_id,
-                "candidate_name": candidate.name,
-                "id_number": candidate.id_number,
-                "schedule_type": next_schedule.schedule_type,
-                "venue_name": venue.name if venue else "未知场地",
-                "start_time": next_schedule.start_time.isoformat(),
-                "timestamp": datetime.utcnow().isoformat(),
-                "expires_at": (datetime.utcnow() + timedelta(minutes=self.qr_expire_minutes)).isoformat(),
-                "token": self._generate_secure_token(f"{next_schedule.id}_{candidate_id}")
+                "expires_at": expires_at.isoformat()
             }
         
-        # 生成二维码图像
-        qr_image_base64 = self._generate_qr_image(json.dumps(qr_data, ensure_ascii=False))
+        # 生成二维码图像（二维码内容为签名令牌，不含个人信息）
+        qr_image_base64 = await self._generate_qr_image(qr_token) if include_image else None
         
         return {
             "qr_data": qr_data,
+            "qr_token": qr_token,
             "qr_image": qr_image_base64,
             "next_schedule": {
-                "id": next_schedule.id if next_schedule else None,
-                "schedule_type": next_schedule.schedule_type if next_schedule else None,
-                "start_time": next_schedule.start_time.isoformat() if next_schedule else None,
-                "venue_name": venue.name if next_schedule and venue else None,
-                "status": next_schedule.status if next_schedule else None
+                "id": next_schedule.id,
+                "schedule_type": next_schedule.schedule_type,
+                "start_time": next_schedule.start_time.isoformat(),
+                "venue_name": venue_name,
+                "status": next_schedule.status
             } if next_schedule else None
         }
     
+    @staticmethod
+    def is_upcoming(schedule: Schedule, now: Optional[datetime] = None) -> bool:
+        """是否为待进行的排期（与 _get_next_schedule 的条件一致）"""
+        return (
+            schedule.status in NEXT_SCHEDULE_STATUSES
+            and schedule.check_in_status == "not_checked_in"
+            and schedule.start_time > (now or datetime.utcnow())
+        )
+    
     async def _get_next_schedule(
         self,
         db: AsyncSession,
@@ -103,7 +155,7 @@ class QRCodeService:
         query = select(Schedule).where(
             and_(
                 Schedule.candidate_id == candidate_id,
-                Schedule.status.in_(["待确认", "confirmed"]),
+                Schedule.status.in_(NEXT_SCHEDULE_STATUSES),
                 Schedule.check_in_status == "not_checked_in",
                 Schedule.start_time > datetime.utcnow()
             )
@@ -112,33 +164,45 @@ class QRCodeService:
         result = await db.execute(query)
         return result.scalars().first()
     
-    def _generate_secure_token(self, data: str) -> str:
-        """生成安全令牌"""
-        import hashlib
-        timestamp = str(int(datetime.utcnow().timestamp()))
-        raw_token = f"{data}_{timestamp}_{self.secret_key}"
-        return hashlib.sha256(raw_token.encode()).hexdigest()[:16]
+    def _issue_token(
+        self,
+        token_type: str,
+        candidate_id: int,
+        schedule_id: Optional[int] = None
+    ) -> Tuple[str, datetime]:
+        """签发二维码令牌，有效期过半前重复使用同一令牌"""
+        key = (token_type, candidate_id, schedule_id)
+        cached = self._token_cache.get(key)
+        if cached:
+            return cached
+        
+        expires_at = (datetime.now() + timedelta(minutes=self.qr_expire_minutes)).replace(microsecond=0)
+        issued = (encode_qr_token(self.secret_key, token_type, candidate_id, expires_at, schedule_id), expires_at)
+        self._token_cache.set(key, issued)
+        return issued
+    
+    def token_refresh_seconds(self, expires_at: datetime) -> int:
+        """距令牌重新签发的秒数，用作客户端缓存时间"""
+        remaining = (expires_at - datetime.now()).total_seconds() - self.token_reuse_seconds
+        return max(0, int(remaining))
     
-    def _generate_qr_image(self, data: str) -> str:
+    async def render_qr_image(self, data: str, image_format: str = "png") -> Tuple[str, bytes]:
+        """
+        渲染二维码图像，返回(内容哈希, 图像字节)
+        
+        按内容哈希缓存，有效期与二维码有效期一致；渲染在共享进程池中执行
+        """
+        digest = hashlib.sha256(f"{image_format}:{data}".encode()).hexdigest()[:32]
+        content = self._image_cache.get(digest)
+        if content is None:
+            content = await run_in_process(render_qr_bytes, data, image_format)
+            self._image_cache.set(digest, content)
+        return digest, content
+    
+    async def _generate_qr_image(self, data: str) -> str:
         """生成二维码图像（Base64编码）"""
-        
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_M,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-        
-        # 创建图像
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # 转换为Base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
-        
+        _, content = await self.render_qr_image(data)
+        img_str = base64.b64encode(content).decode()
         return f"data:image/png;base64,{img_str}"
     
     async def scan_qrcode_checkin(
@@ -149,19 +213,13 @@ class QRCodeService:
     ) -> Dict[str, Any]:
         """扫码签到处理"""
         
+        # 先校验签名和有效期，无效的二维码不访问数据库
         try:
-            # 解析二维码数据
-            qr_data = json.loads(qr_data_str)
-        except json.JSONDecodeError:
-            raise HTTPException(status_code=400, detail="二维码格式错误")
-        
-        # 验证二维码是否过期
-        try:
-            expires_at = datetime.fromisoformat(qr_data.get("expires_at", ""))
-            if datetime.utcnow() > expires_at:
-                raise HTTPException(status_code=400, detail="二维码已过期，请刷新")
-        except ValueError:
-            raise HTTPException(status_code=400, detail="二维码时间格式错误")
+            qr_data = decode_qr_token(self.secret_key, qr_data_str)
+        except QRTokenExpired:
+            raise HTTPException(status_code=400, detail="二维码已过期，请刷新")
+        except QRTokenError:
+            raise HTTPException(status_code=400, detail="二维码无效")
         
         # 验证二维码类型
         qr_type = qr_data.get("type")
@@ -178,36 +236,23 @@ class QRCodeService:
         qr_data: Dict[str, Any],
         staff_user: User
     ) -> Dict[str, Any]:
-        """处理排期签到"""
+        """
+        处理排期签到
+        
+        不加行锁：签到通过条件UPDATE（仅当仍为未签到状态时）完成，并发扫码只有一个写入成功；
+        二维码随机数作为幂等键，同一二维码的重复扫码直接返回首次签到结果，不再写库
+        """
         
         schedule_id = qr_data.get("schedule_id")
         if not schedule_id:
             raise HTTPException(status_code=400, detail="二维码中缺少排期信息")
         
-        # 获取排期信息
-        schedule_result = await db.execute(
-            select(Schedule).where(Schedule.id == schedule_id)
-        )
-        schedule = schedule_result.scalar_one_or_none()
-        
-        if not schedule:
+        schedule, candidate, venue_name = await self._load_checkin_row(db, schedule_id)
+        if not schedule or schedule.candidate_id != qr_data["candidate_id"]:
             raise HTTPException(status_code=404, detail="排期记录不存在")
         
-        # 检查是否已经签到
-        if schedule.check_in_status == "checked_in":
-            raise HTTPException(status_code=400, detail="该考生已完成签到")
-        
-        # 获取考生信息
-        candidate_result = await db.execute(
-            select(Candidate).where(Candidate.id == schedule.candidate_id)
-        )
-        candidate = candidate_result.scalar_one_or_none()
-        
-        # 获取场地信息
-        venue_result = await db.execute(
-            select(Venue).where(Venue.id == schedule.venue_id)
-        )
-        venue = venue_result.scalar_one_or_none()
+        if schedule.check_in_status in CHECKED_IN_STATUSES:
+            return await self._replay_checkin(db, schedule, candidate, venue_name, qr_data["nonce"])
         
         # 检查签到时间（可以在开始前30分钟签到）
         now = datetime.utcnow()
@@ -223,23 +268,98 @@ class QRCodeService:
         elif now > latest_checkin:
             checkin_status = "late"
         
-        # 更新签到状态
-        schedule.check_in_status = checkin_status
-        schedule.check_in_time = now
-        schedule.status = "confirmed"
+        # 条件更新签到状态，只有仍未签到时才会写入
+        result = await db.execute(
+            update(Schedule)
+            .where(
+                and_(
+                    Schedule.id == schedule.id,
+                    or_(Schedule.check_in_status.is_(None), Schedule.check_in_status == "not_checked_in")
+                )
+            )
+            .values(
+                check_in_status=checkin_status,
+                check_in_time=now,
+                check_in_nonce=qr_data["nonce"],
+                check_in_by=staff_user.id,
+                status="confirmed"
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            # 并发扫码中已有其他请求完成签到，结束当前事务后读取最新结果
+            await db.rollback()
+            schedule, candidate, venue_name = await self._load_checkin_row(db, schedule_id)
+            return await self._replay_checkin(db, schedule, candidate, venue_name, qr_data["nonce"])
         
         # 更新考生状态
         if candidate:
-            if checkin_status == "checked_in":
-                candidate.status = "考试中"
-            else:
-                candidate.status = "迟到"
-        
-        # 更新排队信息
-        await self._update_queue_position(db, schedule)
+            await db.execute(
+                update(Candidate)
+                .where(Candidate.id == candidate.id)
+                .values(status="考试中" if checkin_status == "checked_in" else "迟到")
+                .execution_options(synchronize_session=False)
+            )
         
         await db.commit()
         
+        # 各进程移出排队索引，其余考生的排队位置在读取时计算
+        await publish_checkin([schedule.id])
+        
+        return self._checkin_result(
+            schedule, candidate, venue_name, checkin_status, now, staff_user.username
+        )
+    
+    async def _load_checkin_row(
+        self,
+        db: AsyncSession,
+        schedule_id: int
+    ) -> Tuple[Optional[Schedule], Optional[Candidate], Optional[str]]:
+        """读取排期及其考生、场地名称（总是读取数据库最新值）"""
+        result = await db.execute(
+            select(Schedule, Candidate, Venue.name)
+            .outerjoin(Candidate, Candidate.id == Schedule.candidate_id)
+            .outerjoin(Venue, Venue.id == Schedule.venue_id)
+            .where(Schedule.id == schedule_id)
+            .execution_options(populate_existing=True)
+        )
+        row = result.first()
+        return tuple(row) if row else (None, None, None)
+    
+    async def _replay_checkin(
+        self,
+        db: AsyncSession,
+        schedule: Schedule,
+        candidate: Optional[Candidate],
+        venue_name: Optional[str],
+        nonce: str
+    ) -> Dict[str, Any]:
+        """已签到的排期：同一二维码重复扫码返回首次签到结果，其他二维码提示已签到"""
+        if schedule.check_in_nonce != nonce:
+            raise HTTPException(status_code=400, detail="该考生已完成签到")
+        
+        staff_username = None
+        if schedule.check_in_by:
+            staff_username = (await db.execute(
+                select(User.username).where(User.id == schedule.check_in_by)
+            )).scalar_one_or_none()
+        
+        result = self._checkin_result(
+            schedule, candidate, venue_name, schedule.check_in_status, schedule.check_in_time, staff_username
+        )
+        result["duplicate"] = True
+        return result
+    
+    def _checkin_result(
+        self,
+        schedule: Schedule,
+        candidate: Optional[Candidate],
+        venue_name: Optional[str],
+        checkin_status: str,
+        checkin_time: datetime,
+        staff_username: Optional[str]
+    ) -> Dict[str, Any]:
+        """签到结果"""
         return {
             "success": True,
             "message": f"考生 {candidate.name if candidate else '未知'} 签到成功",
@@ -247,16 +367,17 @@ class QRCodeService:
             "candidate": {
                 "id": candidate.id if candidate else None,
                 "name": candidate.name if candidate else "未知",
-                "id_number": qr_data.get("id_number", "未知")
+                "id_number": candidate.id_number if candidate else "未知"
             },
             "schedule": {
                 "id": schedule.id,
                 "schedule_type": schedule.schedule_type,
                 "start_time": schedule.start_time.isoformat(),
-                "venue_name": venue.name if venue else "未知场地"
+                "venue_name": venue_name or "未知场地"
             },
-            "checkin_time": now.isoformat(),
-            "staff_user": staff_user.username
+            "checkin_time": checkin_time.isoformat(),
+            "staff_user": staff_username,
+            "duplicate": False
         }
     
     async def _process_candidate_info_scan(
@@ -323,81 +444,70 @@ class QRCodeService:
             "scan_time": datetime.utcnow().isoformat()
         }
     
-    async def _update_queue_position(
-        self,
-        db: AsyncSession,
-        current_schedule: Schedule
-    ):
-        """更新排队位置信息"""
-        
-        # 获取同一场地、同一类型考试的排队情况
-        query = select(Schedule).where(
-            and_(
-                Schedule.venue_id == current_schedule.venue_id,
-                Schedule.schedule_type == current_schedule.schedule_type,
-                Schedule.scheduled_date == current_schedule.scheduled_date,
-                Schedule.check_in_status == "not_checked_in",
-                Schedule.start_time > current_schedule.start_time
-            )
-        ).order_by(Schedule.start_time)
-        
-        result = await db.execute(query)
-        waiting_schedules = result.scalars().all()
-        
-        # 更新排队位置
-        for i, schedule in enumerate(waiting_schedules):
-            schedule.queue_position = i + 1
-            # 估算等待时间（基于平均考试时长）
-            schedule.estimated_wait_time = (i + 1) * 15  # 15分钟每人
-    
     async def get_candidate_queue_status(
         self,
         db: AsyncSession,
         candidate_id: int
     ) -> Dict[str, Any]:
-        """获取考生排队状态"""
+        """
+        获取考生排队状态
+        
+        考生今日全部排期在一次查询中取得；排队位置优先从排队索引读取，
+        索引未覆盖今日时改用窗口函数在同一查询中计算
+        """
+        
+        today = date.today()
+        today_filter = and_(
+            Schedule.scheduled_date >= today,
+            Schedule.scheduled_date < today + timedelta(days=1),
+            Schedule.check_in_status == "not_checked_in",
+            or_(Schedule.status.is_(None), Schedule.status != "cancelled")
+        )
+        use_index = queue_index.day == today
         
-        # 获取考生今日的排期
-        today_schedules_result = await db.execute(
-            select(Schedule).where(
-                and_(
-                    Schedule.candidate_id == candidate_id,
-                    Schedule.scheduled_date == datetime.utcnow().date(),
-                    Schedule.check_in_status == "not_checked_in"
-                )
-            ).order_by(Schedule.start_time)
+        if use_index:
+            query = select(Schedule, Venue.name).where(
+                and_(today_filter, Schedule.candidate_id == candidate_id)
+            )
+        else:
+            queue_partition = (Schedule.venue_id, Schedule.schedule_type)
+            ranked = select(
+                Schedule.id,
+                Schedule.candidate_id,
+                func.row_number().over(
+                    partition_by=queue_partition, order_by=(Schedule.start_time, Schedule.id)
+                ).label("queue_position"),
+                func.count().over(partition_by=queue_partition).label("total_waiting")
+            ).where(today_filter).subquery()
+            query = (
+                select(Schedule, Venue.name, ranked.c.queue_position, ranked.c.total_waiting)
+                .join(ranked, ranked.c.id == Schedule.id)
+                .where(ranked.c.candidate_id == candidate_id)
+            )
+        
+        result = await db.execute(
+            query.outerjoin(Venue, Venue.id == Schedule.venue_id).order_by(Schedule.start_time)
         )
-        schedules = today_schedules_result.scalars().all()
         
         queue_status = []
-        for schedule in schedules:
-            venue_result = await db.execute(
-                select(Venue).where(Venue.id == schedule.venue_id)
-            )
-            venue = venue_result.scalar_one_or_none()
-            
-            # 计算当前排队位置
-            queue_query = select(Schedule).where(
-                and_(
-                    Schedule.venue_id == schedule.venue_id,
-                    Schedule.schedule_type == schedule.schedule_type,
-                    Schedule.scheduled_date == schedule.scheduled_date,
-                    Schedule.check_in_status == "not_checked_in",
-                    Schedule.start_time <= schedule.start_time
-                )
-            ).order_by(Schedule.start_time)
-            
-            queue_result = await db.execute(queue_query)
-            queue_schedules = queue_result.scalars().all()
-            queue_position = len(queue_schedules)
+        for row in result.all():
+            schedule, venue_name = row[0], row[1]
+            if use_index:
+                queue_position = queue_index.ensure(schedule)
+                total_waiting = queue_index.length(*queue_index.queue_key(schedule))
+            else:
+                queue_position, total_waiting = row[2], row[3]
             
             queue_status.append({
                 "schedule_id": schedule.id,
                 "schedule_type": schedule.schedule_type,
-                "venue_name": venue.name if venue else "未知场地",
+                "venue_name": venue_name or "未知场地",
                 "start_time": schedule.start_time.isoformat(),
                 "queue_position": queue_position,
-                "estimated_wait_time": queue_position * 15,
+                "total_waiting": total_waiting,
+                "estimated_wait_time": wait_time_estimator.estimate_wait(
+                    queue_position, schedule.venue_id, schedule.exam_product_id, schedule.schedule_type
+                ),
                 "status": schedule.status
             })
         
@@ -0,0 +1,231 @@
+"""
+排队索引
+按(考场, 排期类型, 日期)在内存中维护待签到排期的有序队列，签到或新增排期时以O(log n)更新，
+排队位置在读取时计算；服务启动时及定期从数据库重建。
+排期表的queue_position列仅作为可选的快照，按配置定期批量写回
+"""
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sortedcontainers import SortedList
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.db.session import async_session_maker
+from src.models.schedule import Schedule
+from src.services.wait_time import wait_time_estimator
+
+logger = logging.getLogger(__name__)
+
+QueueKey = Tuple[Optional[int], str, date]  # (考场ID, 排期类型, 日期)
+EntryKey = Tuple[datetime, int]  # (开始时间, 排期ID)
+
+
+class QueueIndex:
+    """待签到排期的内存有序索引"""
+
+    def __init__(self, session_maker=async_session_maker):
+        self.session_maker = session_maker
+        self.refresh_seconds = settings.QUEUE_INDEX_REFRESH_SECONDS
+        self.snapshot_enabled = settings.QUEUE_SNAPSHOT_FLUSH
+        self._queues: Dict[QueueKey, SortedList] = {}
+        self._entries: Dict[int, Tuple[QueueKey, EntryKey]] = {}
+        self._products: Dict[int, Optional[int]] = {}  # 排期的考试产品ID，用于估算等待时间
+        self._dirty: Set[QueueKey] = set()  # 上次写快照后有变化的队列
+        self._flushed: Dict[int, int] = {}  # 上次写入的排队位置
+        self._removed_while_loading: Optional[Set[int]] = None
+        self._listeners: List[Callable[[Optional[Set[QueueKey]]], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self.day: Optional[date] = None  # 索引覆盖的日期
+        self.loaded_at: Optional[datetime] = None
+
+    # ===== 索引操作 =====
+
+    def add(self, schedule: Schedule):
+        """加入待签到排期（已存在时按新的考场/时间重新排列）"""
+        self.remove(schedule.id, record=False)
+        queue_key = self.queue_key(schedule)
+        entry_key = (schedule.start_time, schedule.id)
+        self._queues.setdefault(queue_key, SortedList()).add(entry_key)
+        self._entries[schedule.id] = (queue_key, entry_key)
+        self._products[schedule.id] = schedule.exam_product_id
+        self._dirty.add(queue_key)
+        self._notify({queue_key})
+
+    def remove(self, schedule_id: int, record: bool = True) -> bool:
+        """移出排期（签到、取消等），返回是否在队列中"""
+        if record and self._removed_while_loading is not None:
+            self._removed_while_loading.add(schedule_id)
+
+        entry = self._entries.pop(schedule_id, None)
+        if entry is None:
+            return False
+        self._products.pop(schedule_id, None)
+        queue_key, entry_key = entry
+        queue = self._queues[queue_key]
+        queue.remove(entry_key)
+        if not queue:
+            del self._queues[queue_key]
+        self._dirty.add(queue_key)
+        self._notify({queue_key})
+        return True
+
+    def ensure(self, schedule: Schedule) -> Optional[int]:
+        """
+        返回待签到排期的排队位置，不在索引中时（如重建后新建的排期）先加入；
+        已取消、已签到或非索引日期的排期返回None
+        """
+        if (
+            schedule.status == "cancelled"
+            or schedule.check_in_status != "not_checked_in"
+            or self.queue_key(schedule)[2] != self.day
+        ):
+            return None
+        if schedule.id not in self._entries:
+            self.add(schedule)
+        return self.position(schedule.id)
+
+    def position(self, schedule_id: int) -> Optional[int]:
+        """排队位置（从1开始），不在队列中返回None"""
+        entry = self._entries.get(schedule_id)
+        if entry is None:
+            return None
+        queue_key, entry_key = entry
+        return self._queues[queue_key].index(entry_key) + 1
+
+    def length(self, venue_id: Optional[int], schedule_type: str, day: date) -> int:
+        """队列中的等待人数"""
+        return len(self._queues.get((venue_id, schedule_type, day), ()))
+
+    def waiting_ids(self, venue_id: Optional[int], schedule_type: str, day: date) -> List[int]:
+        """按排队顺序返回排期ID"""
+        return [schedule_id for _, schedule_id in self._queues.get((venue_id, schedule_type, day), ())]
+
+    def __contains__(self, schedule_id: int) -> bool:
+        return schedule_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add_listener(self, listener: Callable[[Optional[Set[QueueKey]]], None]):
+        """注册队列变化回调，参数为有变化的队列，整体重建时为None"""
+        self._listeners.append(listener)
+
+    def _notify(self, queue_keys: Optional[Set[QueueKey]]):
+        for listener in self._listeners:
+            try:
+                listener(queue_keys)
+            except Exception as e:
+                logger.warning(f"排队变化通知失败: {e}")
+
+    @staticmethod
+    def queue_key(schedule: Schedule) -> QueueKey:
+        scheduled_date = schedule.scheduled_date
+        if isinstance(scheduled_date, datetime):
+            scheduled_date = scheduled_date.date()
+        return schedule.venue_id, schedule.schedule_type, scheduled_date
+
+    # ===== 重建与快照 =====
+
+    def load(self, schedules: Iterable[Schedule]):
+        """以给定的待签到排期替换整个索引"""
+        queues: Dict[QueueKey, List[EntryKey]] = {}
+        entries: Dict[int, Tuple[QueueKey, EntryKey]] = {}
+        products: Dict[int, Optional[int]] = {}
+        for schedule in schedules:
+            queue_key = self.queue_key(schedule)
+            entry_key = (schedule.start_time, schedule.id)
+            queues.setdefault(queue_key, []).append(entry_key)
+            entries[schedule.id] = (queue_key, entry_key)
+            products[schedule.id] = schedule.exam_product_id
+
+        self._queues = {queue_key: SortedList(items) for queue_key, items in queues.items()}
+        self._entries = entries
+        self._products = products
+        self._dirty = set(self._queues)
+        self.loaded_at = datetime.utcnow()
+        self._notify(None)
+
+    async def rebuild(self, db: AsyncSession, day: Optional[date] = None):
+        """从数据库重建指定日期（默认今天）的队列（未取消且未签到的排期）"""
+        day = day or date.today()
+        self._removed_while_loading = set()
+        try:
+            result = await db.execute(
+                select(Schedule).where(
+                    and_(
+                        Schedule.scheduled_date >= day,
+                        Schedule.scheduled_date < day + timedelta(days=1),
+                        Schedule.check_in_status == "not_checked_in",
+                        or_(Schedule.status.is_(None), Schedule.status != "cancelled")
+                    )
+                )
+            )
+            self.load(result.scalars().all())
+            self.day = day
+            # 查询期间完成的签到可能未包含在查询结果中，重新移除
+            for schedule_id in self._removed_while_loading:
+                self.remove(schedule_id, record=False)
+        finally:
+            self._removed_while_loading = None
+
+    async def flush(self, db: AsyncSession) -> int:
+        """将有变化的队列中位置变动的排期批量写回排期表，返回写入行数"""
+        rows: List[Dict[str, Any]] = []
+        for queue_key in self._dirty:
+            venue_id, schedule_type, _ = queue_key
+            for position, (_, schedule_id) in enumerate(self._queues.get(queue_key, ()), start=1):
+                if self._flushed.get(schedule_id) != position:
+                    self._flushed[schedule_id] = position
+                    rows.append({
+                        "id": schedule_id,
+                        "queue_position": position,
+                        "estimated_wait_time": wait_time_estimator.estimate_wait(
+                            position, venue_id, self._products.get(schedule_id), schedule_type
+                        )
+                    })
+        self._dirty = set()
+        # 已离开队列的排期不再跟踪
+        self._flushed = {schedule_id: position for schedule_id, position in self._flushed.items() if schedule_id in self._entries}
+
+        if rows:
+            await db.execute(update(Schedule), rows)
+            await db.commit()
+        return len(rows)
+
+    # ===== 后台刷新 =====
+
+    async def start(self):
+        """重建索引并启动定期刷新"""
+        if self._task:
+            return
+        await self.refresh()
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def refresh(self):
+        """重建索引，并按配置写回快照"""
+        try:
+            async with self.session_maker() as db:
+                if self.snapshot_enabled:
+                    await self.flush(db)
+                await self.rebuild(db)
+        except Exception as e:
+            logger.warning(f"刷新排队索引失败: {e}")
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            await self.refresh()
+
+
+# 单例索引实例
+queue_index = QueueIndex()
@@ -0,0 +1,133 @@
+"""
+实时状态事件
+签到、排期及考场变更的发布入口，以及各进程收到事件后对排队索引、考场状态投影和公共看板的更新。
+导入本模块即在单例事件总线上注册处理函数
+"""
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, Iterable
+
+from src.core.event_bus import EventBus, EventType, event_bus
+from src.models.schedule import Schedule
+from src.services.public_board import PublicBoard, public_board
+from src.services.queue_index import QueueIndex, queue_index
+from src.services.venue_projection import VenueProjection, venue_projection
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_FIELDS = ("id", "candidate_id", "venue_id", "exam_product_id", "schedule_type", "status", "check_in_status")
+SCHEDULE_TIME_FIELDS = ("scheduled_date", "start_time", "end_time")
+
+
+def schedule_event(schedule: Schedule) -> Dict[str, Any]:
+    """排期中与内存状态相关的字段（可JSON序列化）"""
+    data = {field: getattr(schedule, field) for field in SCHEDULE_FIELDS}
+    for field in SCHEDULE_TIME_FIELDS:
+        value = getattr(schedule, field)
+        if isinstance(value, date) and not isinstance(value, datetime):
+            value = datetime.combine(value, datetime.min.time())
+        data[field] = value.isoformat() if value else None
+    return data
+
+
+def schedule_from_event(data: Dict[str, Any]) -> Schedule:
+    """由事件负载还原出不关联会话的排期对象"""
+    values = {field: data.get(field) for field in SCHEDULE_FIELDS}
+    for field in SCHEDULE_TIME_FIELDS:
+        values[field] = datetime.fromisoformat(data[field]) if data.get(field) else None
+    return Schedule(**values)
+
+
+# ===== 发布 =====
+
+async def publish_checkin(schedule_ids: Iterable[int]):
+    await event_bus.publish(EventType.CHECKIN, schedule_ids=list(schedule_ids))
+
+
+async def publish_schedules_changed(schedules: Iterable[Schedule] = (), deleted: Iterable[int] = ()):
+    await event_bus.publish(
+        EventType.SCHEDULE_CHANGED,
+        schedules=[schedule_event(schedule) for schedule in schedules],
+        deleted=list(deleted)
+    )
+
+
+async def publish_venues_changed(venue_ids: Iterable[int]):
+    await event_bus.publish(EventType.VENUE_CHANGED, venue_ids=list(venue_ids))
+
+
+# ===== 处理 =====
+
+class RealtimeEventHandlers:
+    """将事件应用到本进程的排队索引、考场状态投影和公共看板"""
+
+    def __init__(
+        self,
+        index: QueueIndex = queue_index,
+        projection: VenueProjection = venue_projection,
+        board: PublicBoard = public_board
+    ):
+        self.index = index
+        self.projection = projection
+        self.board = board
+
+    def register(self, bus: EventBus):
+        bus.subscribe(EventType.CHECKIN, self.on_checkin)
+        bus.subscribe(EventType.SCHEDULE_CHANGED, self.on_schedules_changed)
+        bus.subscribe(EventType.VENUE_CHANGED, self.on_venues_changed)
+        bus.subscribe(EventType.RESYNC, self.on_resync)
+
+    def on_checkin(self, payload: Dict[str, Any]):
+        for schedule_id in payload["schedule_ids"]:
+            self.index.remove(schedule_id)
+        self.projection.apply_checkin(payload["schedule_ids"])
+        self.board.notify()
+
+    async def on_schedules_changed(self, payload: Dict[str, Any]):
+        missing_names = []
+        for data in payload.get("schedules", ()):
+            schedule = schedule_from_event(data)
+            if self._is_waiting(schedule):
+                self.index.add(schedule)
+            else:
+                self.index.remove(schedule.id)
+            if self.projection.apply_schedule(schedule):
+                missing_names.append(schedule.id)
+        for schedule_id in payload.get("deleted", ()):
+            self.index.remove(schedule_id)
+            self.projection.remove_schedule(schedule_id)
+        self.board.notify()
+
+        if missing_names:
+            try:
+                async with self.projection.session_maker() as db:
+                    await self.projection.load_candidate_names(db, missing_names)
+                self.board.notify()
+            except Exception as e:
+                logger.warning(f"读取新排期考生姓名失败: {e}")
+
+    async def on_venues_changed(self, payload: Dict[str, Any]):
+        try:
+            async with self.projection.session_maker() as db:
+                await self.projection.reload_venues(db, payload["venue_ids"])
+        except Exception as e:
+            logger.warning(f"读取考场失败: {e}")
+        self.board.notify()
+
+    async def on_resync(self, payload: Dict[str, Any]):
+        await self.index.refresh()
+        await self.projection.refresh()
+        self.board.notify()
+
+    def _is_waiting(self, schedule: Schedule) -> bool:
+        """是否应在排队索引中：索引日期内、未取消且未签到"""
+        return (
+            self.index.day is not None
+            and self.index.queue_key(schedule)[2] == self.index.day
+            and schedule.status != "cancelled"
+            and schedule.check_in_status == "not_checked_in"
+        )
+
+
+realtime_event_handlers = RealtimeEventHandlers()
+realtime_event_handlers.register(event_bus)
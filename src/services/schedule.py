@@ -1,3 +1,4 @@
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
@@ -222,8 +223,8 @@ class ScheduleService:
         - 包含成功状态和详细信息的字典
         """
         try:
-            # 获取排期信息（使用行锁）
-            schedule = db.query(Schedule).filter(Schedule.id == schedule_id).with_for_update().first()
+            # 获取排期信息（不加行锁，签到由下方的条件更新保证只写入一次）
+            schedule = db.query(Schedule).filter(Schedule.id == schedule_id).first()
             if not schedule:
                 return {
                     "success": False,
@@ -264,15 +265,25 @@ class ScheduleService:
             is_late = check_in_time > schedule.start_time + timedelta(minutes=15)
             check_in_status = "迟到" if is_late else "已签到"
             
-            # 更新排期表
-            schedule.check_in_status = check_in_status
-            schedule.check_in_time = check_in_time
+            # 条件更新排期表：仅当仍未签到时写入，并发签到只有一个成功
+            values = {"check_in_status": check_in_status, "check_in_time": check_in_time, "check_in_by": operator_id}
             if notes:
-                schedule.notes = f"{schedule.notes or ''}\n[签到备注] {notes}"
+                values["notes"] = func.coalesce(Schedule.notes, "") + f"\n[签到备注] {notes}"
+            updated = db.query(Schedule).filter(
+                Schedule.id == schedule_id,
+                or_(Schedule.check_in_status.is_(None), Schedule.check_in_status.notin_(["已签到", "迟到"]))
+            ).update(values, synchronize_session=False)
+            if updated == 0:
+                db.rollback()
+                return {
+                    "success": False,
+                    "error": "该考生已经签到"
+                }
             
             # 获取考生信息
             candidate = db.query(Candidate).filter(Candidate.id == schedule.candidate_id).first()
             if not candidate:
+                db.rollback()
                 return {
                     "success": False,
                     "error": "考生信息不存在"
@@ -0,0 +1,144 @@
+"""
+排期数据导出服务
+使用服务端游标分批读取排期数据，按块生成CSV或Excel，导出大量数据时内存占用保持不变
+"""
+import csv
+import io
+import tempfile
+from datetime import date, datetime, timedelta
+from typing import Any, AsyncIterator, List, Optional, Sequence
+
+from openpyxl import Workbook
+from sqlalchemy import and_, select
+from sqlalchemy.sql import Select
+
+from src.core.executors import run_in_thread
+from src.db.session import async_session_maker
+from src.models.candidate import Candidate
+from src.models.exam_product import ExamProduct
+from src.models.schedule import Schedule
+from src.models.venue import Venue
+
+
+class ScheduleExportService:
+    """排期导出服务"""
+
+    # 导出列：(表头, 查询列)
+    EXPORT_COLUMNS = [
+        ("排期ID", Schedule.id),
+        ("排期日期", Schedule.scheduled_date),
+        ("开始时间", Schedule.start_time),
+        ("结束时间", Schedule.end_time),
+        ("排期类型", Schedule.schedule_type),
+        ("状态", Schedule.status),
+        ("签到状态", Schedule.check_in_status),
+        ("签到时间", Schedule.check_in_time),
+        ("考生姓名", Candidate.name),
+        ("身份证号", Candidate.id_number),
+        ("联系电话", Candidate.phone),
+        ("机构ID", Candidate.institution_id),
+        ("考场", Venue.name),
+        ("考试产品", ExamProduct.name),
+        ("备注", Schedule.notes),
+    ]
+
+    def __init__(self, session_maker=async_session_maker):
+        self.session_maker = session_maker
+        self.fetch_size = 1000  # 服务端游标每次读取行数
+        self.file_chunk_size = 64 * 1024  # Excel文件分块发送大小
+
+    @property
+    def headers(self) -> List[str]:
+        return [header for header, _ in self.EXPORT_COLUMNS]
+
+    def build_query(
+        self,
+        start_date: date,
+        end_date: date,
+        venue_id: Optional[int] = None,
+        institution_id: Optional[int] = None
+    ) -> Select:
+        """构建导出查询，一次关联考生、考场和考试产品"""
+        query = (
+            select(*[column for _, column in self.EXPORT_COLUMNS])
+            .join(Candidate, Candidate.id == Schedule.candidate_id)
+            .outerjoin(Venue, Venue.id == Schedule.venue_id)
+            .outerjoin(ExamProduct, ExamProduct.id == Schedule.exam_product_id)
+            .where(
+                and_(
+                    Schedule.scheduled_date >= start_date,
+                    Schedule.scheduled_date < end_date + timedelta(days=1)
+                )
+            )
+            .order_by(Schedule.start_time, Schedule.id)
+        )
+
+        if venue_id:
+            query = query.where(Schedule.venue_id == venue_id)
+
+        if institution_id:
+            query = query.where(Candidate.institution_id == institution_id)
+
+        return query
+
+    async def iter_row_batches(self, query: Select) -> AsyncIterator[Sequence[Any]]:
+        """
+        通过服务端游标分批读取查询结果
+
+        导出在响应发送期间进行，请求依赖的数据库会话此时已关闭，因此使用独立会话
+        """
+        async with self.session_maker() as db:
+            result = await db.stream(query.execution_options(yield_per=self.fetch_size))
+            async for partition in result.partitions(self.fetch_size):
+                yield partition
+
+    async def iter_csv(self, query: Select) -> AsyncIterator[bytes]:
+        """逐批生成CSV内容（UTF-8 BOM，便于Excel直接打开）"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.headers)
+        yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+        async for rows in self.iter_row_batches(query):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(self._format_row(row) for row in rows)
+            yield buffer.getvalue().encode("utf-8")
+
+    async def iter_xlsx(self, query: Select) -> AsyncIterator[bytes]:
+        """
+        生成Excel内容
+
+        使用openpyxl只写模式逐行写入（工作表内容落盘到临时文件），
+        保存到临时文件后分块发送
+        """
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet("排期数据")
+        worksheet.append(self.headers)
+
+        async for rows in self.iter_row_batches(query):
+            await run_in_thread(self._append_rows, worksheet, rows)
+
+        with tempfile.TemporaryFile() as output:
+            await run_in_thread(workbook.save, output)
+            output.seek(0)
+            while True:
+                chunk = await run_in_thread(output.read, self.file_chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def _append_rows(self, worksheet, rows: Sequence[Any]):
+        for row in rows:
+            worksheet.append(list(row))
+
+    def _format_row(self, row: Sequence[Any]) -> List[Any]:
+        """CSV中日期时间统一为ISO格式，空值输出为空字符串"""
+        return [
+            value.isoformat(sep=" ") if isinstance(value, datetime) else ("" if value is None else value)
+            for value in row
+        ]
+
+
+# 单例服务实例
+schedule_export_service = ScheduleExportService()
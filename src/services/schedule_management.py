@@ -13,6 +13,17 @@ from src.models.schedule import Schedule
 from src.models.exam_product import ExamProduct
 from src.models.venue import Venue
 from src.db.models import User
+from src.services.realtime_events import publish_schedules_changed
+
+
+# 时间线中每条排期可返回的字段：排期自身的列，以及关联的考生、考场、考试产品（字段名、查询列、缺失时的名称）
+TIMELINE_SCHEDULE_FIELDS = ("id", "start_time", "end_time", "schedule_type", "status", "check_in_status")
+TIMELINE_RELATED_FIELDS = {
+    "candidate": (("id", "name", "id_number"), (Candidate.id, Candidate.name, Candidate.id_number), "未知"),
+    "venue": (("id", "name", "type"), (Venue.id, Venue.name, Venue.type), "未知"),
+    "exam_product": (("id", "name"), (ExamProduct.id, ExamProduct.name), "未知")
+}
+TIMELINE_FIELDS = TIMELINE_SCHEDULE_FIELDS + tuple(TIMELINE_RELATED_FIELDS)
 
 
 class ScheduleManagementService:
@@ -266,6 +277,7 @@ class ScheduleManagementService:
             
             # 创建排期记录
             created_schedules = []
+            schedules = []
             for i, candidate in enumerate(candidates):
                 if exam_type == "theory":
                     # 理论考试按批次分配
@@ -290,6 +302,7 @@ class ScheduleManagementService:
                 )
                 
                 db.add(schedule)
+                schedules.append(schedule)
                 created_schedules.append({
                     "candidate_id": candidate.id,
                     "candidate_name": candidate.name,
@@ -301,6 +314,7 @@ class ScheduleManagementService:
                 candidate.status = "已排期"
             
             await db.commit()
+            await publish_schedules_changed(schedules)
             
             return {
                 "success": True,
@@ -327,90 +341,74 @@ class ScheduleManagementService:
         start_date: date,
         end_date: Optional[date] = None,
         venue_id: Optional[int] = None,
-        institution_id: Optional[int] = None
+        institution_id: Optional[int] = None,
+        fields: Optional[List[str]] = None
     ) -> Dict[str, Any]:
-        """获取排期时间线"""
+        """获取排期时间线；指定fields时每条排期只查询并返回这些字段，未用到的关联表不连接"""
         
         if not end_date:
             end_date = start_date
-        
-        # 构建查询条件
-        query = select(Schedule).where(
-            and_(
-                Schedule.scheduled_date >= start_date,
-                Schedule.scheduled_date <= end_date
+        fields = fields or TIMELINE_FIELDS
+        
+        # 只查询需要的列，关联信息一次连接查询
+        columns = [Schedule.scheduled_date, Schedule.schedule_type, Candidate.institution_id]
+        columns += [getattr(Schedule, field) for field in fields if field in TIMELINE_SCHEDULE_FIELDS]
+        related = [field for field in fields if field in TIMELINE_RELATED_FIELDS]
+        for field in related:
+            columns += TIMELINE_RELATED_FIELDS[field][1]
+        
+        query = (
+            select(*columns)
+            .select_from(Schedule)
+            .outerjoin(Candidate, Candidate.id == Schedule.candidate_id)
+            .where(
+                and_(
+                    Schedule.scheduled_date >= start_date,
+                    Schedule.scheduled_date < end_date + timedelta(days=1)
+                )
             )
         )
+        if "venue" in related:
+            query = query.outerjoin(Venue, Venue.id == Schedule.venue_id)
+        if "exam_product" in related:
+            query = query.outerjoin(ExamProduct, ExamProduct.id == Schedule.exam_product_id)
         
         if venue_id:
             query = query.where(Schedule.venue_id == venue_id)
         
         if institution_id:
-            query = query.join(Candidate).where(Candidate.institution_id == institution_id)
+            query = query.where(Candidate.institution_id == institution_id)
         
         query = query.order_by(Schedule.start_time)
         
         result = await db.execute(query)
-        schedules = result.scalars().all()
+        rows = result.all()
         
-        # 组织时间线数据
+        # 组织时间线数据（按日期分组）
         timeline_data = {}
-        
-        for schedule in schedules:
-            # 获取关联信息
-            candidate_result = await db.execute(
-                select(Candidate).where(Candidate.id == schedule.candidate_id)
-            )
-            candidate = candidate_result.scalar_one_or_none()
-            
-            venue_result = await db.execute(
-                select(Venue).where(Venue.id == schedule.venue_id)
-            )
-            venue = venue_result.scalar_one_or_none()
-            
-            exam_product_result = await db.execute(
-                select(ExamProduct).where(ExamProduct.id == schedule.exam_product_id)
-            )
-            exam_product = exam_product_result.scalar_one_or_none()
-            
-            # 按日期分组
-            date_key = schedule.scheduled_date.isoformat()
-            if date_key not in timeline_data:
-                timeline_data[date_key] = []
-            
-            timeline_data[date_key].append({
-                "id": schedule.id,
-                "start_time": schedule.start_time.isoformat(),
-                "end_time": schedule.end_time.isoformat(),
-                "schedule_type": schedule.schedule_type,
-                "status": schedule.status,
-                "check_in_status": schedule.check_in_status,
-                "candidate": {
-                    "id": candidate.id if candidate else None,
-                    "name": candidate.name if candidate else "未知",
-                    "id_number": candidate.id_number if candidate else "未知"
-                },
-                "venue": {
-                    "id": venue.id if venue else None,
-                    "name": venue.name if venue else "未知",
-                    "type": venue.type if venue else "未知"
-                },
-                "exam_product": {
-                    "id": exam_product.id if exam_product else None,
-                    "name": exam_product.name if exam_product else "未知"
-                }
-            })
-        
         # 按机构统计
         institution_stats = {}
-        for schedule in schedules:
-            candidate_result = await db.execute(
-                select(Candidate).where(Candidate.id == schedule.candidate_id)
+        
+        for row in rows:
+            scheduled_date, schedule_type, inst_id, *values = row
+            values = iter(values)
+            
+            item = {}
+            for field in fields:
+                if field in TIMELINE_SCHEDULE_FIELDS:
+                    value = next(values)
+                    item[field] = value.isoformat() if isinstance(value, datetime) else value
+            for field in related:
+                keys, _, default_name = TIMELINE_RELATED_FIELDS[field]
+                related_values = [next(values) for _ in keys]
+                if related_values[0] is None:
+                    related_values = [None] + [default_name] * (len(keys) - 1)
+                item[field] = dict(zip(keys, related_values))
+            timeline_data.setdefault(scheduled_date.isoformat(), []).append(
+                {field: item[field] for field in fields}
             )
-            candidate = candidate_result.scalar_one_or_none()
             
-            if candidate and candidate.institution_id:
-                inst_id = candidate.institution_id
+            if inst_id:
                 if inst_id not in institution_stats:
                     institution_stats[inst_id] = {
                         "total_schedules": 0,
@@ -419,15 +417,15 @@ class ScheduleManagementService:
                     }
                 
                 institution_stats[inst_id]["total_schedules"] += 1
-                if schedule.schedule_type == "theory":
+                if schedule_type == "theory":
                     institution_stats[inst_id]["theory_count"] += 1
-                elif schedule.schedule_type == "practical":
+                elif schedule_type == "practical":
                     institution_stats[inst_id]["practical_count"] += 1
         
         return {
             "start_date": start_date.isoformat(),
             "end_date": end_date.isoformat(),
-            "total_schedules": len(schedules),
+            "total_schedules": len(rows),
             "timeline": timeline_data,
             "institution_stats": institution_stats
         }
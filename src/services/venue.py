@@ -1,9 +1,11 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func
-from typing import List, Optional, Tuple
+from typing import Any, List, Optional, Sequence, Tuple
 from src.models.venue import Venue
 from src.schemas.venue import VenueCreate, VenueUpdate
 from src.core.cache import cache_result, invalidate_cache_on_change, CacheConfig
+from src.core.fields import model_columns
+from src.services.realtime_events import publish_venues_changed
 
 
 class VenueService:
@@ -25,6 +27,7 @@ class VenueService:
         db.add(db_venue)
         db.commit()
         db.refresh(db_venue)
+        await publish_venues_changed([db_venue.id])
         return db_venue
 
     @staticmethod
@@ -41,10 +44,11 @@ class VenueService:
         limit: int = 100,
         status: Optional[str] = None,
         venue_type: Optional[str] = None,
-        search: Optional[str] = None
-    ) -> Tuple[List[Venue], int]:
-        """获取考场列表，支持筛选和搜索"""
-        query = db.query(Venue)
+        search: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> Tuple[List[Any], int]:
+        """获取考场列表，支持筛选和搜索；指定fields时只查询这些列，返回结果行"""
+        query = db.query(*model_columns(Venue, fields)) if fields else db.query(Venue)
         
         # 状态筛选
         if status:
@@ -89,6 +93,7 @@ class VenueService:
                 setattr(db_venue, field, value)
             db.commit()
             db.refresh(db_venue)
+            await publish_venues_changed([venue_id])
         return db_venue
 
     @staticmethod
@@ -99,6 +104,7 @@ class VenueService:
         if db_venue:
             db.delete(db_venue)
             db.commit()
+            await publish_venues_changed([venue_id])
             return True
         return False
     
@@ -128,6 +134,7 @@ class VenueService:
             Venue.id.in_(venue_ids)
         ).update({Venue.status: status}, synchronize_session=False)
         db.commit()
+        await publish_venues_changed(venue_ids)
         return updated_count
 
     @staticmethod
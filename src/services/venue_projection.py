@@ -0,0 +1,295 @@
+"""
+考场实时状态投影
+启动时从数据库加载当日排期及考场，之后由签到、排期变更（新建、改期、开始、完成、取消）及考场变更事件更新；
+各考场的当前考试、待签到名单、下一场开始时间及状态在内存中计算，读取时不访问数据库。
+计算结果在事件到达或到达下一个开始/结束时间前一直有效，读取为字典查找
+"""
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.db.session import async_session_maker
+from src.models.candidate import Candidate
+from src.models.schedule import CheckInStatus, Schedule
+from src.models.venue import Venue
+from src.services.qrcode_batch import SCHEDULE_TYPE_NAMES
+
+logger = logging.getLogger(__name__)
+
+CHECKED_IN = (CheckInStatus.CHECKED_IN.value, CheckInStatus.LATE.value)
+
+
+def mask_name(name: Optional[str]) -> Optional[str]:
+    return name[0] + "*" * (len(name) - 1) if name and len(name) > 1 else name
+
+
+class ScheduleState(NamedTuple):
+    """投影中的一条排期"""
+    id: int
+    candidate_id: int
+    candidate_name: Optional[str]  # 已脱敏
+    venue_id: Optional[int]
+    exam_product_id: Optional[int]
+    schedule_type: str
+    start_time: datetime
+    end_time: datetime
+    status: Optional[str]
+    check_in_status: Optional[str]
+
+
+class VenueProjection:
+    """当日各考场状态的内存投影"""
+
+    def __init__(self, session_maker=async_session_maker):
+        self.session_maker = session_maker
+        self.refresh_seconds = settings.VENUE_PROJECTION_REFRESH_SECONDS
+        self.day: Optional[date] = None
+        self.loaded_at: Optional[datetime] = None
+        self._venues: Dict[int, Dict[str, Any]] = {}
+        self._schedules: Dict[int, ScheduleState] = {}
+        self._by_candidate: Dict[int, Set[int]] = {}
+        self._view: Optional[Dict[str, Any]] = None
+        self._valid_until: Optional[datetime] = None  # 下一个开始/结束时间，此前计算结果不变
+        self._applied_while_loading: Optional[List[Tuple[Callable, tuple]]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ===== 加载 =====
+
+    def load(self, day: date, venues: Iterable[Venue], schedules: Iterable[ScheduleState]):
+        self.day = day
+        self._venues = {venue.id: self._venue_info(venue) for venue in venues}
+        self._schedules = {}
+        self._by_candidate = {}
+        for schedule in schedules:
+            self._put(schedule)
+        self.loaded_at = datetime.utcnow()
+        self._invalidate()
+
+    async def rebuild(self, db: AsyncSession, day: Optional[date] = None):
+        """从数据库加载指定日期（默认今天）的考场及排期"""
+        day = day or date.today()
+        self._applied_while_loading = []
+        try:
+            venues = (await db.execute(select(Venue))).scalars().all()
+            self.load(day, venues, await self._load_schedules(db, [
+                Schedule.scheduled_date >= day,
+                Schedule.scheduled_date < day + timedelta(days=1)
+            ]))
+            # 查询期间到达的事件可能未反映在查询结果中，重新应用
+            applied, self._applied_while_loading = self._applied_while_loading, None
+            for method, args in applied:
+                method(*args)
+        finally:
+            self._applied_while_loading = None
+
+    async def refresh(self):
+        try:
+            async with self.session_maker() as db:
+                await self.rebuild(db)
+        except Exception as e:
+            logger.warning(f"刷新考场状态投影失败: {e}")
+
+    async def _load_schedules(self, db: AsyncSession, conditions: List[Any]) -> List[ScheduleState]:
+        result = await db.execute(
+            select(
+                Schedule.id, Schedule.candidate_id, Candidate.name, Schedule.venue_id, Schedule.exam_product_id,
+                Schedule.schedule_type, Schedule.start_time, Schedule.end_time, Schedule.status, Schedule.check_in_status
+            )
+            .outerjoin(Candidate, Candidate.id == Schedule.candidate_id)
+            .where(and_(*conditions, or_(Schedule.status.is_(None), Schedule.status != "cancelled")))
+        )
+        return [ScheduleState(row[0], row[1], mask_name(row[2]), *row[3:]) for row in result.all()]
+
+    @staticmethod
+    def _venue_info(venue: Venue) -> Dict[str, Any]:
+        return {
+            "venue_id": venue.id,
+            "venue_name": venue.name,
+            "venue_type": venue.type,
+            "status": "active" if venue.is_active and venue.status == "active" else venue.status or "closed"
+        }
+
+    # ===== 事件 =====
+
+    def _record(self, method: Callable, *args):
+        if self._applied_while_loading is not None:
+            self._applied_while_loading.append((method, args))
+
+    def apply_checkin(self, schedule_ids: Iterable[int]):
+        schedule_ids = list(schedule_ids)
+        self._record(self.apply_checkin, schedule_ids)
+        for schedule_id in schedule_ids:
+            schedule = self._schedules.get(schedule_id)
+            if schedule is not None and schedule.check_in_status not in CHECKED_IN:
+                self._schedules[schedule_id] = schedule._replace(check_in_status=CheckInStatus.CHECKED_IN.value)
+        self._invalidate()
+
+    def apply_schedule(self, schedule: Schedule) -> bool:
+        """新建或修改的排期；不属于当日或已取消时移出。返回是否需要补充考生姓名"""
+        self._record(self.apply_schedule, schedule)
+        scheduled_date = schedule.scheduled_date
+        if isinstance(scheduled_date, datetime):
+            scheduled_date = scheduled_date.date()
+        if scheduled_date != self.day or schedule.status == "cancelled":
+            self.remove_schedule(schedule.id)
+            return False
+
+        previous = self._schedules.get(schedule.id)
+        candidate_name = previous.candidate_name if previous and previous.candidate_id == schedule.candidate_id else None
+        if previous is not None:
+            self._by_candidate[previous.candidate_id].discard(schedule.id)
+        self._put(ScheduleState(
+            schedule.id, schedule.candidate_id, candidate_name, schedule.venue_id, schedule.exam_product_id,
+            schedule.schedule_type, schedule.start_time, schedule.end_time, schedule.status, schedule.check_in_status
+        ))
+        self._invalidate()
+        return candidate_name is None
+
+    def remove_schedule(self, schedule_id: int):
+        self._record(self.remove_schedule, schedule_id)
+        schedule = self._schedules.pop(schedule_id, None)
+        if schedule is not None:
+            self._by_candidate[schedule.candidate_id].discard(schedule_id)
+            self._invalidate()
+
+    def _put(self, schedule: ScheduleState):
+        self._schedules[schedule.id] = schedule
+        self._by_candidate.setdefault(schedule.candidate_id, set()).add(schedule.id)
+
+    async def load_candidate_names(self, db: AsyncSession, schedule_ids: Iterable[int]):
+        """补充新排期的考生姓名（事件中不携带考生信息）"""
+        candidate_ids = {self._schedules[schedule_id].candidate_id for schedule_id in schedule_ids if schedule_id in self._schedules}
+        if not candidate_ids:
+            return
+        names = dict((await db.execute(
+            select(Candidate.id, Candidate.name).where(Candidate.id.in_(candidate_ids))
+        )).all())
+        for schedule_id, schedule in list(self._schedules.items()):
+            if schedule.candidate_name is None and schedule.candidate_id in names:
+                self._schedules[schedule_id] = schedule._replace(candidate_name=mask_name(names[schedule.candidate_id]))
+        self._invalidate()
+
+    async def reload_venues(self, db: AsyncSession, venue_ids: Iterable[int]):
+        """重新读取有变化的考场，已删除的考场移出"""
+        venue_ids = set(venue_ids)
+        venues = (await db.execute(select(Venue).where(Venue.id.in_(venue_ids)))).scalars().all()
+        for venue_id in venue_ids:
+            self._venues.pop(venue_id, None)
+        for venue in venues:
+            self._venues[venue.id] = self._venue_info(venue)
+        self._invalidate()
+
+    def _invalidate(self):
+        self._view = None
+
+    # ===== 读取 =====
+
+    def _current_view(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        now = now or datetime.utcnow()
+        if (
+            self._view is None
+            or now < self._view["computed_at"]
+            or (self._valid_until is not None and now >= self._valid_until)
+        ):
+            self._view = self._compute(now)
+        return self._view
+
+    def _compute(self, now: datetime) -> Dict[str, Any]:
+        venues = {
+            venue_id: {
+                **info,
+                "current_candidate": None,
+                "current_exam": None,
+                "current_end_time": None,
+                "waiting_count": 0,
+                "next_start_time": None
+            }
+            for venue_id, info in sorted(self._venues.items())
+        }
+        waiting: Dict[int, List[ScheduleState]] = {venue_id: [] for venue_id in venues}
+        counts = {"total": 0, "completed": 0, "in_progress": 0, "waiting": 0, "scheduled": 0}
+        valid_until = None
+
+        for schedule in sorted(self._schedules.values(), key=lambda schedule: (schedule.start_time, schedule.id)):
+            counts["total"] += 1
+            for boundary in (schedule.start_time, schedule.end_time):
+                if boundary > now and (valid_until is None or boundary < valid_until):
+                    valid_until = boundary
+            checked_in = schedule.check_in_status in CHECKED_IN
+            if schedule.status == "completed" or (checked_in and schedule.end_time <= now):
+                counts["completed"] += 1
+                continue
+            if schedule.end_time <= now:
+                continue  # 未签到且已结束
+            venue = venues.get(schedule.venue_id)
+
+            if checked_in:
+                if schedule.start_time <= now:
+                    counts["in_progress"] += 1
+                    if venue is not None and venue["current_candidate"] is None:
+                        venue["current_candidate"] = schedule.candidate_name
+                        venue["current_exam"] = SCHEDULE_TYPE_NAMES.get(schedule.schedule_type, schedule.schedule_type)
+                        venue["current_end_time"] = schedule.end_time.strftime("%H:%M")
+            else:
+                counts["waiting"] += 1
+                if schedule.start_time > now:
+                    counts["scheduled"] += 1
+                if venue is not None:
+                    venue["waiting_count"] += 1
+                    waiting[schedule.venue_id].append(schedule)
+            if venue is not None and schedule.start_time > now and venue["next_start_time"] is None:
+                venue["next_start_time"] = schedule.start_time.strftime("%H:%M")
+
+        self._valid_until = valid_until
+        return {"venues": venues, "waiting": waiting, "counts": counts, "computed_at": now}
+
+    def venue_states(self, now: Optional[datetime] = None) -> Dict[int, Dict[str, Any]]:
+        """各考场状态（返回的字典由投影共享，调用方不应修改）"""
+        return self._current_view(now)["venues"]
+
+    def venue_state(self, venue_id: int, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        return self._current_view(now)["venues"].get(venue_id)
+
+    def waiting_list(self, venue_id: int, limit: Optional[int] = None, now: Optional[datetime] = None) -> List[ScheduleState]:
+        """考场待签到名单（按开始时间）"""
+        return self._current_view(now)["waiting"].get(venue_id, [])[:limit]
+
+    def exam_counts(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """当日排期数、已完成、进行中、待签到、未开始"""
+        return self._current_view(now)["counts"]
+
+    def candidate_schedules(self, candidate_id: int) -> List[ScheduleState]:
+        """考生当日的排期（按开始时间）"""
+        return sorted(
+            (self._schedules[schedule_id] for schedule_id in self._by_candidate.get(candidate_id, ())),
+            key=lambda schedule: (schedule.start_time, schedule.id)
+        )
+
+    # ===== 后台刷新 =====
+
+    async def start(self):
+        """加载当日数据并启动定期重建（兜底事件丢失及日期切换）"""
+        if self._task:
+            return
+        await self.refresh()
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            await self.refresh()
+
+
+# 单例投影
+venue_projection = VenueProjection()
@@ -0,0 +1,177 @@
+"""
+等待时间估算
+根据历史签到时间与结束时间统计每位考生的服务时长（按考场、考试产品、排期类型），
+使用滚动中位数或指数加权平均，定期预计算后以O(1)查询；样本不足时逐级回退到更粗的分组
+"""
+import asyncio
+import logging
+import statistics
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.db.session import async_session_maker
+from src.models.schedule import Schedule
+
+logger = logging.getLogger(__name__)
+
+# (考场ID, 考试产品ID, 排期类型)，较粗的分组中对应位置为None
+ServiceKey = Tuple[Optional[int], Optional[int], str]
+
+# 服务时长的有效范围（分钟），超出视为异常数据
+MIN_SERVICE_MINUTES, MAX_SERVICE_MINUTES = 1, 240
+
+
+class ServiceSample(NamedTuple):
+    """一次历史服务记录"""
+    check_in_time: datetime
+    venue_id: Optional[int]
+    exam_product_id: Optional[int]
+    schedule_type: str
+    minutes: float
+
+
+def sample_keys(venue_id: Optional[int], exam_product_id: Optional[int], schedule_type: str) -> List[ServiceKey]:
+    """从细到粗的分组：考场+产品+类型、考场+类型、类型"""
+    return [
+        (venue_id, exam_product_id, schedule_type),
+        (venue_id, None, schedule_type),
+        (None, None, schedule_type),
+    ]
+
+
+def build_service_times(
+    samples: Iterable[ServiceSample],
+    method: str = "median",
+    window: int = 200,
+    alpha: float = 0.2,
+    min_samples: int = 5
+) -> Dict[ServiceKey, float]:
+    """
+    计算各分组的服务时长（分钟）
+
+    method 为 "median"（最近window个样本的中位数）或 "ewma"（按签到时间顺序的指数加权平均）；
+    样本数少于min_samples的分组不输出，查询时回退到更粗的分组
+    """
+    groups: Dict[ServiceKey, List[float]] = {}
+    for sample in sorted(samples, key=lambda sample: sample.check_in_time):
+        for key in sample_keys(sample.venue_id, sample.exam_product_id, sample.schedule_type):
+            groups.setdefault(key, []).append(sample.minutes)
+
+    service_times = {}
+    for key, values in groups.items():
+        if len(values) < min_samples:
+            continue
+        if method == "ewma":
+            value = values[0]
+            for minutes in values[1:]:
+                value += alpha * (minutes - value)
+        else:
+            value = statistics.median(values[-window:])
+        service_times[key] = value
+    return service_times
+
+
+class WaitTimeEstimator:
+    """等待时间估算器"""
+
+    def __init__(self, session_maker=async_session_maker):
+        self.session_maker = session_maker
+        self.method = settings.WAIT_TIME_METHOD
+        self.history_days = settings.WAIT_TIME_HISTORY_DAYS
+        self.refresh_seconds = settings.WAIT_TIME_REFRESH_SECONDS
+        self.default_minutes = settings.WAIT_TIME_DEFAULT_MINUTES
+        self._service_times: Dict[ServiceKey, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.refreshed_at: Optional[datetime] = None
+
+    def service_minutes(
+        self,
+        venue_id: Optional[int],
+        exam_product_id: Optional[int],
+        schedule_type: str
+    ) -> float:
+        """每位考生的预计服务时长（分钟）"""
+        for key in sample_keys(venue_id, exam_product_id, schedule_type):
+            value = self._service_times.get(key)
+            if value is not None:
+                return value
+        return self.default_minutes
+
+    def estimate_wait(
+        self,
+        position: Optional[int],
+        venue_id: Optional[int],
+        exam_product_id: Optional[int],
+        schedule_type: str
+    ) -> Optional[int]:
+        """按排队位置估算等待时间（分钟），不在队列中返回None"""
+        if not position:
+            return None
+        return round(position * self.service_minutes(venue_id, exam_product_id, schedule_type))
+
+    def load(self, samples: Iterable[ServiceSample]):
+        """用历史样本重新计算各分组的服务时长"""
+        self._service_times = build_service_times(samples, method=self.method)
+        self.refreshed_at = datetime.utcnow()
+
+    async def load_samples(self, db: AsyncSession, start: date, end: date) -> List[ServiceSample]:
+        """读取[start, end)期间已签到排期的服务时长"""
+        result = await db.execute(
+            select(
+                Schedule.check_in_time, Schedule.end_time, Schedule.venue_id,
+                Schedule.exam_product_id, Schedule.schedule_type
+            ).where(
+                and_(
+                    Schedule.scheduled_date >= start,
+                    Schedule.scheduled_date < end,
+                    Schedule.check_in_time.isnot(None)
+                )
+            )
+        )
+        return to_samples(result.all())
+
+    async def refresh(self):
+        """按最近的历史数据重新计算"""
+        try:
+            today = date.today()
+            async with self.session_maker() as db:
+                samples = await self.load_samples(db, today - timedelta(days=self.history_days), today)
+            self.load(samples)
+        except Exception as e:
+            logger.warning(f"刷新等待时间估算失败: {e}")
+
+    async def start(self):
+        """计算一次并启动定期刷新"""
+        if self._task:
+            return
+        await self.refresh()
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            await self.refresh()
+
+
+def to_samples(rows: Iterable[tuple]) -> List[ServiceSample]:
+    """(签到时间, 结束时间, 考场ID, 考试产品ID, 排期类型) 转为服务时长样本，剔除异常值"""
+    samples = []
+    for check_in_time, end_time, venue_id, exam_product_id, schedule_type in rows:
+        minutes = (end_time - check_in_time).total_seconds() / 60
+        if MIN_SERVICE_MINUTES <= minutes <= MAX_SERVICE_MINUTES:
+            samples.append(ServiceSample(check_in_time, venue_id, exam_product_id, schedule_type, minutes))
+    return samples
+
+
+# 单例估算器
+wait_time_estimator = WaitTimeEstimator()
@@ -1,10 +1,18 @@
+import threading
+import time
+from sqlalchemy import and_, func, or_, select
 from sqlalchemy.orm import Session
-from typing import Optional
-from datetime import datetime
+from typing import Optional, Tuple
+from datetime import datetime, timedelta
+from src.core.config import settings
 from src.models.candidate import Candidate
-from src.models.schedule import Schedule
+from src.models.schedule import Schedule, ScheduleStatus
 from src.models.venue import Venue
 from src.schemas.wx_miniprogram import WxLoginResponse, QrCodeResponse
+from src.services.venue_projection import CHECKED_IN
+
+# 不再占用考场的排期状态
+ENDED_STATUSES = (ScheduleStatus.CANCELLED.value, ScheduleStatus.COMPLETED.value)
 
 class WxMiniprogramService:
     @staticmethod
@@ -21,31 +29,40 @@ class WxMiniprogramService:
             Schedule.scheduled_date >= datetime.now().date()
         ).order_by(Schedule.scheduled_date, Schedule.start_time).first()
     
+    # 全部考场状态的缓存：(过期时间, 结果)，同一时刻只有一个线程查询数据库
+    _venues_status_cache: Optional[Tuple[float, list]] = None
+    _venues_status_lock = threading.Lock()
+    
     @staticmethod
-    def get_venue_status(db: Session, venue_id: int) -> dict:
-        """获取考场状态"""
-        venue = db.query(Venue).filter(Venue.id == venue_id).first()
-        if not venue:
-            return None
-        
-        # 获取当前时间段的考试信息
-        current_time = datetime.now()
-        current_schedules = db.query(Schedule).filter(
-            Schedule.venue_id == venue_id,
-            Schedule.scheduled_date == current_time.date(),
+    def _venue_occupancy_query(current_time: datetime):
+        """考场及正在考试的人数（已签到、未取消或完成、处于考试时段；一次分组查询，空闲考场人数为0）"""
+        day = datetime.combine(current_time.date(), datetime.min.time())
+        current_schedule = and_(
+            Schedule.venue_id == Venue.id,
+            Schedule.scheduled_date >= day,
+            Schedule.scheduled_date < day + timedelta(days=1),
             Schedule.start_time <= current_time,
-            Schedule.end_time >= current_time,
-            Schedule.status.in_(['CONFIRMED', 'IN_PROGRESS'])
-        ).all()
-        
-        total_capacity = 10  # 默认容量
-        current_occupancy = len(current_schedules)
+            Schedule.end_time > current_time,
+            Schedule.check_in_status.in_(CHECKED_IN),
+            or_(Schedule.status.is_(None), Schedule.status.notin_(ENDED_STATUSES))
+        )
+        return (
+            select(Venue.id, Venue.name, Venue.type, Venue.capacity, func.count(Schedule.id))
+            .outerjoin(Schedule, current_schedule)
+            .group_by(Venue.id, Venue.name, Venue.type, Venue.capacity)
+            .order_by(Venue.id)
+        )
+    
+    @staticmethod
+    def _format_venue_status(row) -> dict:
+        venue_id, venue_name, venue_type, total_capacity, current_occupancy = row
+        total_capacity = total_capacity or 0
         status = "空闲" if current_occupancy == 0 else "使用中"
         
         return {
-            "venue_id": venue.id,
-            "venue_name": venue.name,
-            "venue_type": venue.type,
+            "venue_id": venue_id,
+            "venue_name": venue_name,
+            "venue_type": venue_type,
             "status": status,
             "current_occupancy": current_occupancy,
             "total_capacity": total_capacity,
@@ -53,14 +70,29 @@ class WxMiniprogramService:
         }
     
     @staticmethod
-    def get_all_venues_status(db: Session) -> list:
-        """获取所有考场状态"""
-        venues = db.query(Venue).filter(Venue.status == 'active').all()
-        venues_status = []
+    def get_venue_status(db: Session, venue_id: int) -> dict:
+        """获取考场状态"""
+        query = WxMiniprogramService._venue_occupancy_query(datetime.now()).where(Venue.id == venue_id)
+        row = db.execute(query).first()
+        if not row:
+            return None
+        return WxMiniprogramService._format_venue_status(row)
+    
+    @classmethod
+    def get_all_venues_status(cls, db: Session) -> list:
+        """获取所有考场状态（缓存WX_VENUE_STATUS_CACHE_SECONDS秒）"""
+        cached = cls._venues_status_cache
+        if cached and time.monotonic() < cached[0]:
+            return cached[1]
         
-        for venue in venues:
-            status = WxMiniprogramService.get_venue_status(db, venue.id)
-            if status:
-                venues_status.append(status)
+        with cls._venues_status_lock:
+            # 等待锁期间其他线程可能已刷新
+            cached = cls._venues_status_cache
+            if cached and time.monotonic() < cached[0]:
+                return cached[1]
+            
+            query = cls._venue_occupancy_query(datetime.now()).where(Venue.status == 'active')
+            venues_status = [cls._format_venue_status(row) for row in db.execute(query).all()]
+            cls._venues_status_cache = (time.monotonic() + settings.WX_VENUE_STATUS_CACHE_SECONDS, venues_status)
         
-        return venues_status 
\ No newline at end of file
+        return venues_status
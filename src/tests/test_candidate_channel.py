@@ -0,0 +1,152 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.core.auth import create_access_token, create_candidate_token, verify_candidate_token
+from src.models.schedule import Schedule
+from src.routers.realtime import router as realtime_router
+from src.services.candidate_channel import CandidateChannel, CandidateConnection
+from src.services.public_board import PublicBoard
+from src.services.queue_index import QueueIndex
+from src.services.venue_projection import VenueProjection
+from src.services.wait_time import WaitTimeEstimator
+
+TODAY = datetime.combine(date.today(), datetime.min.time())
+
+
+def make_schedule(schedule_id, candidate_id, venue_id=1, minutes=0, schedule_type="practical"):
+    start_time = TODAY + timedelta(hours=9, minutes=minutes)
+    return Schedule(
+        id=schedule_id, candidate_id=candidate_id, exam_product_id=1, venue_id=venue_id,
+        scheduled_date=TODAY, start_time=start_time, end_time=start_time + timedelta(minutes=15),
+        schedule_type=schedule_type, check_in_status="not_checked_in"
+    )
+
+
+def venue_state(venue_id, waiting_count=0):
+    return {
+        "venue_id": venue_id, "venue_name": f"实操场地{venue_id}", "venue_type": "实操", "status": "active",
+        "current_candidate": None, "current_exam": None, "current_end_time": None,
+        "waiting_count": waiting_count, "next_start_time": None
+    }
+
+
+@pytest.fixture
+def channel():
+    """考场1实操队列3人、考场2实操队列1人"""
+    index = QueueIndex(session_maker=None)
+    index.load([make_schedule(1, 1), make_schedule(2, 2, minutes=15), make_schedule(3, 3, minutes=30),
+                make_schedule(4, 4, venue_id=2)])
+    index.day = date.today()
+    board = PublicBoard(VenueProjection(session_maker=None))
+    board.apply({venue_id: venue_state(venue_id) for venue_id in (1, 2)}, datetime.utcnow())
+    board.stale = False
+    estimator = WaitTimeEstimator(session_maker=None)
+    estimator.default_minutes = 15
+    return CandidateChannel(index, board, estimator)
+
+
+def connect(channel, candidate_id, schedule):
+    async def send(message):
+        pass
+
+    connection = CandidateConnection(candidate_id, send)
+    asyncio.run(channel.register(connection, [schedule]))
+    return connection
+
+
+class TestCandidateChannel:
+    """考生实时通道测试"""
+
+    def test_position_updates_and_next_alert(self, channel):
+        """测试连接时收到快照，前面的考生签到后推送新位置，排到第1位时提醒一次"""
+        connection = connect(channel, 3, make_schedule(3, 3, minutes=30))
+        snapshot = connection.pending[0]
+        assert snapshot["type"] == "snapshot"
+        assert [(item["position"], item["estimated_wait_minutes"]) for item in snapshot["schedules"]] == [(3, 45)]
+        assert snapshot["venues"][0]["venue_name"] == "实操场地1"
+
+        channel.index.remove(1)
+        channel.index.remove(2)
+        messages = connection.pending[1:]
+        assert [(message["type"], message["position"]) for message in messages] == [("position", 1), ("next", 1)]
+
+        channel.index.remove(3)
+        assert [message["type"] for message in connection.pending[1:]] == ["next", "position"]
+        assert connection.pending[-1]["position"] is None
+
+    def test_only_affected_queue(self, channel):
+        """测试其他队列变化时不推送"""
+        connection = connect(channel, 3, make_schedule(3, 3, minutes=30))
+        channel.index.remove(4)
+        channel.index.add(make_schedule(5, 5, venue_id=2))
+        assert len(connection.pending) == 1
+
+    def test_venue_status_push(self, channel):
+        """测试考场状态变化只推送给该考场的订阅者"""
+        venue1 = connect(channel, 3, make_schedule(3, 3, minutes=30))
+        venue2 = connect(channel, 4, make_schedule(4, 4, venue_id=2))
+        channel.board.apply({1: venue_state(1, waiting_count=2), 2: venue_state(2)}, datetime.utcnow())
+
+        assert venue1.pending[-1] == {"type": "venue", "venue": venue_state(1, waiting_count=2)}
+        assert [message["type"] for message in venue2.pending] == ["snapshot", "next"]
+
+        channel.unregister(venue1)
+        assert channel.connection_count == 1
+        channel.index.remove(1)
+        assert len(venue1.pending) == 2
+
+    def test_backpressure(self):
+        """测试未发送的同类消息只保留最新一条，超过上限丢弃最早的消息"""
+        async def send(message):
+            pass
+
+        connection = CandidateConnection(1, send, max_pending=3)
+        for position in range(10, 0, -1):
+            connection.push(("position", 1), {"position": position})
+        assert connection.pending == [{"position": 1}]
+
+        for venue_id in range(1, 4):
+            connection.push(("venue", venue_id), {"venue_id": venue_id})
+        assert connection.dropped == 1
+        assert connection.pending == [{"venue_id": 1}, {"venue_id": 2}, {"venue_id": 3}]
+
+
+class TestCandidateToken:
+    """考生令牌测试"""
+
+    def test_candidate_token(self):
+        """测试考生令牌可解析出考生ID，用户令牌及无效令牌被拒绝"""
+        assert verify_candidate_token(create_candidate_token(42)) == 42
+        assert verify_candidate_token(create_access_token({"sub": "42"})) is None
+        assert verify_candidate_token("invalid") is None
+
+
+class TestQueueStatusAccess:
+    """考生排队接口鉴权测试"""
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.include_router(realtime_router)
+        return TestClient(app)
+
+    def test_queue_status_requires_own_token(self, client):
+        """测试排队状态只返回令牌对应考生的数据"""
+        assert client.get("/realtime/queue-status/1").status_code == 401
+        headers = {"Authorization": f"Bearer {create_candidate_token(2)}"}
+        assert client.get("/realtime/queue-status/1", headers=headers).status_code == 403
+        response = client.get("/realtime/queue-status/2", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["candidate_id"] == 2
+
+    def test_notifications(self, client):
+        """测试考生通知需本人令牌，考场及系统通知无需登录"""
+        assert client.get("/realtime/notifications").status_code == 200
+        assert client.get("/realtime/notifications", params={"candidate_id": 1}).status_code == 401
+        headers = {"Authorization": f"Bearer {create_candidate_token(2)}"}
+        assert client.get("/realtime/notifications", params={"candidate_id": 1}, headers=headers).status_code == 403
+        assert client.get("/realtime/notifications", params={"candidate_id": 2}, headers=headers).status_code == 200
@@ -0,0 +1,142 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import src.db.models  # noqa: F401  注册全部模型
+from src.core.auth import create_access_token, create_candidate_token
+from src.db.base import Base
+from src.dependencies.auth import get_current_candidate_id
+from src.institutions.models import Institution
+from src.models.candidate import Candidate
+from src.models.exam_product import ExamProduct
+from src.models.schedule import Schedule
+from src.models.venue import Venue
+from src.services.candidate_home import CandidateHomeService, parse_versions
+from src.services.queue_index import QueueIndex
+from src.services.venue_projection import VenueProjection
+from src.services.wait_time import WaitTimeEstimator
+
+TODAY = datetime.combine(date.today(), datetime.min.time())
+TOMORROW = TODAY + timedelta(days=1)
+
+
+def make_schedule(schedule_id, day, start_minutes, status="pending", **kwargs):
+    start_time = day + timedelta(minutes=start_minutes)
+    values = dict(
+        id=schedule_id, candidate_id=1, exam_product_id=1, venue_id=1, created_by=1,
+        scheduled_date=day, start_time=start_time, end_time=start_time + timedelta(minutes=15),
+        schedule_type="practical", status=status, check_in_status="not_checked_in"
+    )
+    values.update(kwargs)
+    return Schedule(**values)
+
+
+@pytest.fixture
+def database(tmp_path):
+    """考生1：今日00:01待签到排期、明日09:00已确认排期、已取消排期；返回(会话工厂, 执行的SQL语句)"""
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'home.db'}")
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as db:
+            db.add(Institution(id=1, name="北京航空培训中心"))
+            db.add(ExamProduct(id=1, name="多旋翼视距内驾驶员"))
+            db.add(Venue(id=1, name="实操场地1", type="实操", capacity=10))
+            db.add(Candidate(
+                id=1, name="张三", id_number="110101199001011234", id_card="110101199001011234",
+                phone="13800138001", institution_id=1, exam_product_id=1, created_by=1
+            ))
+            db.add(make_schedule(1, TODAY, 1))
+            db.add(make_schedule(2, TOMORROW, 540, status="confirmed"))
+            db.add(make_schedule(3, TOMORROW, 600, status="cancelled"))
+            await db.commit()
+
+    asyncio.run(setup())
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    yield session_maker, statements
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def service():
+    """排队索引及考场状态投影已加载今日数据"""
+    index = QueueIndex(session_maker=None)
+    index.load([make_schedule(1, TODAY, 1)])
+    index.day = date.today()
+    projection = VenueProjection(session_maker=None)
+    projection.load(date.today(), [Venue(id=1, name="实操场地1", type="实操", status="active", is_active=True)], [])
+    return CandidateHomeService(index=index, projection=projection, estimator=WaitTimeEstimator(session_maker=None))
+
+
+def get_home(session_maker, service, candidate_id=1, versions=None):
+    async def run():
+        async with session_maker() as db:
+            return await service.get_home(db, candidate_id, parse_versions(versions))
+
+    return asyncio.run(run())
+
+
+class TestCandidateHome:
+    """小程序首页聚合测试"""
+
+    def test_sections(self, database, service):
+        """测试两次查询返回全部分区"""
+        session_maker, statements = database
+        home = get_home(session_maker, service)
+        sections = home["sections"]
+
+        assert len(statements) == 2
+        assert sections["candidate"]["data"]["id_number"] == "110101********1234"
+        assert sections["candidate"]["data"]["institution"] == "北京航空培训中心"
+        assert sections["candidate"]["data"]["exam_product"] == "多旋翼视距内驾驶员"
+        assert [item["id"] for item in sections["schedules"]["data"]] == [1, 2]
+        assert sections["qrcode"]["data"]["next_schedule"]["id"] == 2
+        assert sections["qrcode"]["data"]["next_schedule"]["venue_name"] == "实操场地1"
+        queue = sections["queue"]["data"]
+        assert [(item["schedule_id"], item["position"], item["total_waiting"]) for item in queue] == [(1, 1, 1)]
+        assert queue[0]["venue_status"] is not None
+        assert sections["candidate"]["max_age"] == 600
+
+    def test_known_versions(self, database, service):
+        """测试已缓存且未变化的分区只返回版本号"""
+        session_maker, _ = database
+        sections = get_home(session_maker, service)["sections"]
+        versions = f"candidate:{sections['candidate']['version']},queue:stale,unknown:1"
+
+        sections = get_home(session_maker, service, versions=versions)["sections"]
+        assert sections["candidate"]["not_modified"] is True
+        assert "data" not in sections["candidate"]
+        assert "data" in sections["queue"] and "data" in sections["schedules"]
+
+    def test_candidate_not_found(self, database, service):
+        """测试考生不存在返回404"""
+        session_maker, _ = database
+        with pytest.raises(HTTPException) as error:
+            get_home(session_maker, service, candidate_id=99)
+        assert error.value.status_code == 404
+
+
+class TestCandidateToken:
+    """考生令牌依赖测试"""
+
+    def test_candidate_token(self):
+        """测试只接受考生令牌"""
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_candidate_token(7))
+        assert get_current_candidate_id(credentials) == 7
+
+        for token in [create_access_token({"sub": "7"}), "invalid"]:
+            with pytest.raises(HTTPException) as error:
+                get_current_candidate_id(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+            assert error.value.status_code == 401
+        with pytest.raises(HTTPException):
+            get_current_candidate_id(None)
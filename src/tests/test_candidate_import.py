@@ -0,0 +1,313 @@
+import asyncio
+import io
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+from datetime import datetime
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import src.db.models  # noqa: F401  注册全部模型
+from src.core.security import hash_id_number
+from src.db.base import Base
+from src.models.candidate import Candidate
+from src.models.candidate_import import CandidateImportJob, CandidateImportStaging, ImportJobStatus
+from src.models.exam_product import ExamProduct
+from src.services.candidate_import import CandidateImportService
+from src.services.candidate_import_job import candidate_import_job_service
+
+
+def make_frame(rows):
+    """按模板列构造考生导入数据"""
+    return pd.DataFrame(rows, columns=CandidateImportService.TEMPLATE_COLUMNS)
+
+
+def make_id_number(serial):
+    """生成校验码正确的身份证号"""
+    body = f"11010119900101{serial:03d}"
+    weights = [7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2]
+    return body + "10X98765432"[sum(int(digit) * weight for digit, weight in zip(body, weights)) % 11]
+
+
+def make_import_frame(serials):
+    return make_frame([[f"考生{serial}", make_id_number(serial), "13800138000", None, None, "产品A", None]
+                       for serial in serials])
+
+
+@pytest.fixture
+def service():
+    return CandidateImportService()
+
+
+@pytest.fixture
+def database(tmp_path):
+    """已有一名考生（序号1）的测试库；返回(会话工厂, 事务提交计数)"""
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'staging.db'}")
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as db:
+            db.add(ExamProduct(id=1, name="产品A"))
+            db.add(Candidate(
+                name="考生1", id_number=make_id_number(1), id_card=make_id_number(1), phone="13800138000",
+                institution_id=1, exam_product_id=1, created_by=1
+            ))
+            await db.commit()
+
+    asyncio.run(setup())
+    commits = []
+    event.listen(engine.sync_engine, "commit", lambda conn: commits.append(1))
+    yield session_maker, commits
+    asyncio.run(engine.dispose())
+
+
+def run(session_maker, function):
+    async def wrapper():
+        async with session_maker() as db:
+            return await function(db)
+
+    return asyncio.run(wrapper())
+
+
+def count_rows(session_maker, model):
+    async def query(db):
+        return (await db.execute(select(func.count()).select_from(model))).scalar()
+
+    return run(session_maker, query)
+
+
+class TestIdNumberValidation:
+    """身份证号校验测试"""
+
+    def test_valid_checksum(self, service):
+        """测试校验码正确的身份证号"""
+        assert service._validate_id_number("110101199001011237")
+        assert service._validate_id_number("11010519491231002X")
+        assert service._validate_id_number("11010519491231002x")
+
+    def test_invalid_checksum(self, service):
+        """测试校验码错误的身份证号"""
+        assert not service._validate_id_number("110101199001011234")
+
+    def test_invalid_birth_date(self, service):
+        """测试出生日期无效的身份证号"""
+        # 1990-02-30 不存在，校验码正确
+        assert not service._validate_id_number("110101199002301236")
+
+    def test_invalid_format(self, service):
+        """测试格式错误的身份证号"""
+        assert not service._validate_id_number("12345")
+        assert not service._validate_id_number("1101011990010112371")
+        assert not service._validate_id_number("11010119900101123A")
+
+
+class TestCandidateFrameValidation:
+    """列式验证测试"""
+
+    def test_valid_rows(self, service):
+        """测试有效数据的规范化结果"""
+        df = make_frame([
+            [" 张三 ", "110101199001011237", "13800138001", None, "男", "产品A", None],
+        ])
+        result = service.validate_candidate_frame(df, {"产品A": 5})
+
+        assert result["valid"].tolist() == [True]
+        assert result["errors"] == []
+        record = result["data"].to_dict("records")[0]
+        assert record["name"] == "张三"
+        assert record["email"] is None
+        assert record["exam_product_id"] == 5
+        assert record["birth_date"] == datetime(1990, 1, 1)
+
+    def test_error_messages_in_row_order(self, service):
+        """测试错误信息按行号、字段顺序排列"""
+        df = make_frame([
+            ["", "12345", "999", "bad", "男", "产品A", None],
+            ["李四", "110101199001011234", "13800138002", None, "未知", "产品A", None],
+            ["王五", "110101199002301236", "13800138003", None, None, "产品B", None],
+            ["赵六", "110101199001011237", "13800138004", None, None, "产品B", None],
+        ])
+        result = service.validate_candidate_frame(df, {"产品A": 1})
+
+        assert result["errors"] == [
+            "第2行：考生姓名不能为空",
+            "第2行：身份证号格式不正确",
+            "第2行：联系电话格式不正确",
+            "第2行：邮箱格式不正确",
+            "第3行：身份证号校验码不正确",
+            "第4行：身份证号出生日期无效",
+            "第5行：考试产品'产品B'不存在",
+        ]
+        assert result["warnings"] == ["第3行：性别应为'男'或'女'，已设置为空"]
+        assert result["valid"].tolist() == [False, False, False, False]
+
+    def test_single_row_matches_frame(self, service):
+        """测试逐行验证与列式验证结果一致"""
+        df = make_frame([
+            ["张三", "110101199001011237", "13800138001", "zs@example.com", "男", "产品A", "备注"],
+            ["", "110101199001011234", "12345", None, "x", "产品A", None],
+        ])
+        frame_result = service.validate_candidate_frame(df)
+
+        row_errors = []
+        for index, row in df.iterrows():
+            row_result = service.validate_candidate_data(row, index)
+            assert row_result["valid"] == frame_result["valid"][index]
+            row_errors.extend(row_result["errors"])
+
+        assert row_errors == frame_result["errors"]
+
+
+class TestImportJobProgress:
+    """导入任务进度测试"""
+
+    def test_progress_percentage(self):
+        """测试进度按已导入行数/有效行数计算"""
+        job = CandidateImportJob(
+            id="job1", institution_id=1, created_by=1, file_name="a.xlsx",
+            status=ImportJobStatus.IMPORTING, total_rows=10, valid_count=8,
+            imported_count=3, error_count=0
+        )
+        result = candidate_import_job_service.job_to_dict(job)
+
+        assert result["progress"] == 37.5
+        assert result["errors"] == []
+        assert result["finished_at"] is None
+
+    def test_progress_without_valid_rows(self):
+        """测试尚未验证的任务进度为0"""
+        job = CandidateImportJob(
+            id="job2", institution_id=1, created_by=1, file_name="a.xlsx",
+            status=ImportJobStatus.PENDING, total_rows=0, valid_count=0,
+            imported_count=0, error_count=0
+        )
+
+        assert candidate_import_job_service.job_to_dict(job)["progress"] == 0
+
+
+class TestImportTemplate:
+    """导入模板测试"""
+
+    def test_product_dropdown(self, service):
+        """测试考试产品列带下拉选项"""
+        content = service.generate_template(["产品A", "产品B"])
+        workbook = load_workbook(io.BytesIO(content))
+
+        sheet = workbook["考生信息"]
+        assert [cell.value for cell in sheet[1]] == CandidateImportService.TEMPLATE_COLUMNS
+        validations = sheet.data_validations.dataValidation
+        assert len(validations) == 1
+        assert validations[0].formula1 == "'考试产品'!$A$1:$A$2"
+        assert str(validations[0].sqref) == "F2:F10001"
+        assert workbook["考试产品"].sheet_state == "hidden"
+
+    def test_template_parses_as_import(self, service):
+        """测试模板本身可以按导入格式解析并通过验证"""
+        content = service.generate_template(["产品A"])
+        df = service.parse_excel_content(content)
+        result = service.validate_candidate_frame(df, {"产品A": 1})
+
+        assert result["errors"] == []
+        assert result["valid"].all()
+
+
+class TestStagedImport:
+    """暂存表查重及分批写入测试"""
+
+    def test_duplicates_with_existing_candidates(self, database, service):
+        """测试与考生表重复的身份证号被拒绝，暂存数据被清除"""
+        session_maker, _ = database
+        result = run(session_maker, lambda db: service.prepare_import(make_import_frame([2, 1, 3]), db, "b1"))
+
+        assert result["success"] is False
+        assert result["message"] == f"以下身份证号已存在于系统中：{make_id_number(1)}"
+        assert count_rows(session_maker, CandidateImportStaging) == 0
+
+    def test_duplicates_within_file(self, database, service):
+        """测试Excel内重复的身份证号被拒绝且不写入暂存表"""
+        session_maker, _ = database
+        result = run(session_maker, lambda db: service.prepare_import(make_import_frame([2, 3, 2]), db, "b1"))
+
+        assert result["success"] is False
+        assert make_id_number(2) in result["message"]
+        assert count_rows(session_maker, CandidateImportStaging) == 0
+
+    def test_find_existing_id_numbers(self, database, service):
+        """测试暂存批次与考生表的关联查重只返回本批次的重复项"""
+        session_maker, _ = database
+        frame = service.validate_candidate_frame(make_import_frame([1, 2]), {"产品A": 1})["data"]
+
+        async def stage(db):
+            await service.stage_candidates(db, "b1", frame)
+            await service.stage_candidates(db, "b2", frame)
+            return await service.find_existing_id_numbers(db, "b1")
+
+        assert run(session_maker, stage) == [make_id_number(1)]
+
+    def test_chunked_commit(self, database, service):
+        """测试按批大小分多次提交，写入的考生包含兼容字段及身份证号哈希"""
+        session_maker, commits = database
+        assert run(session_maker, lambda db: service.prepare_import(make_import_frame(range(2, 7)), db, "b1"))["success"]
+        chunks = []
+
+        async def record(count):
+            chunks.append(count)
+
+        commits.clear()
+        total = run(session_maker, lambda db: service.commit_staged_candidates(db, "b1", 1, 1, chunk_size=2, on_chunk=record))
+
+        assert total == 5
+        assert chunks == [2, 2, 1]
+        assert len(commits) == 3
+        assert count_rows(session_maker, CandidateImportStaging) == 0
+
+        async def inserted(db):
+            return (await db.execute(select(Candidate).where(Candidate.name != "考生1"))).scalars().all()
+
+        candidates = run(session_maker, inserted)
+        assert sorted(candidate.id_number for candidate in candidates) == [make_id_number(serial) for serial in range(2, 7)]
+        assert all(candidate.id_card == candidate.id_number for candidate in candidates)
+        assert all(candidate.id_number_hash == hash_id_number(candidate.id_number) for candidate in candidates)
+        assert all(candidate.status == "待排期" and candidate.institution_id == 1 for candidate in candidates)
+
+    def test_rerun_after_partial_commit(self, database, service):
+        """测试中途失败后再次执行只写入剩余的行，不重复写入"""
+        session_maker, _ = database
+        assert run(session_maker, lambda db: service.prepare_import(make_import_frame(range(2, 7)), db, "b1"))["success"]
+
+        async def fail_on_second_chunk(count):
+            if committed_chunks:
+                raise RuntimeError("写入中断")
+            committed_chunks.append(count)
+
+        committed_chunks = []
+        with pytest.raises(RuntimeError):
+            run(session_maker, lambda db: service.commit_staged_candidates(
+                db, "b1", 1, 1, chunk_size=2, on_chunk=fail_on_second_chunk
+            ))
+        assert count_rows(session_maker, Candidate) == 3
+        assert count_rows(session_maker, CandidateImportStaging) == 3
+
+        # 模拟另一途径已写入剩余行中的一名考生
+        async def add_candidate(db):
+            db.add(Candidate(
+                name="考生5", id_number=make_id_number(5), id_card=make_id_number(5), phone="13800138000",
+                institution_id=1, exam_product_id=1, created_by=1
+            ))
+            await db.commit()
+
+        run(session_maker, add_candidate)
+        total = run(session_maker, lambda db: service.commit_staged_candidates(db, "b1", 1, 1, chunk_size=2))
+
+        assert total == 2
+        assert count_rows(session_maker, Candidate) == 6
+        assert count_rows(session_maker, CandidateImportStaging) == 0
+
+        async def distinct_ids(db):
+            return (await db.execute(select(func.count(func.distinct(Candidate.id_number))))).scalar()
+
+        assert run(session_maker, distinct_ids) == 6
@@ -0,0 +1,191 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import src.db.models  # noqa: F401  注册全部模型
+from src.db.base import Base
+from src.models.candidate import Candidate
+from src.models.candidate_import import CandidateImportJob, CandidateImportStaging, ImportJobStatus
+from src.models.exam_product import ExamProduct
+from src.services.candidate_import import CandidateImportService, candidate_import_service
+from src.services.candidate_import_job import CandidateImportJobService
+
+
+def make_rows(count, start=1):
+    """构造暂存用的考生数据（行号从2开始，与Excel一致）"""
+    return pd.DataFrame(
+        [[f"考生{index}", f"1101011990010{index:05d}", "13800138000", None, None, None, 1, None]
+         for index in range(start, start + count)],
+        columns=CandidateImportService.STAGING_FIELDS
+    )
+
+
+@pytest.fixture
+def database(tmp_path):
+    """空的考生表及一个考试产品；返回(会话工厂, 数据库文件路径)"""
+    pytest.importorskip("aiosqlite")
+    db_path = tmp_path / "import.db"
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as db:
+            db.add(ExamProduct(id=1, name="产品A"))
+            await db.commit()
+
+    asyncio.run(setup())
+    yield session_maker, db_path
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def service(database):
+    return CandidateImportJobService(session_maker=database[0])
+
+
+def run(session_maker, function):
+    async def wrapper():
+        async with session_maker() as db:
+            return await function(db)
+
+    return asyncio.run(wrapper())
+
+
+def add_job(session_maker, status, heartbeat_at=None, staged=0, **values):
+    async def add(db):
+        db.add(CandidateImportJob(
+            id="job1", institution_id=1, created_by=1, file_name="a.xlsx", status=status,
+            total_rows=staged, valid_count=staged, imported_count=0, error_count=0,
+            heartbeat_at=heartbeat_at, **values
+        ))
+        await db.commit()
+        if staged:
+            await candidate_import_service.stage_candidates(db, "job1", make_rows(staged))
+
+    run(session_maker, add)
+
+
+def load_job(session_maker):
+    return run(session_maker, lambda db: db.get(CandidateImportJob, "job1"))
+
+
+def count(session_maker, model):
+    async def query(db):
+        return (await db.execute(select(func.count()).select_from(model))).scalar()
+
+    return run(session_maker, query)
+
+
+class TestImportJobClaim:
+    """导入任务认领与恢复测试"""
+
+    def test_live_job_not_claimed_twice(self, database, service):
+        """测试心跳未过期的任务不能被第二个进程认领"""
+        session_maker, _ = database
+        add_job(session_maker, ImportJobStatus.PENDING)
+
+        assert run(session_maker, lambda db: service._claim(db, "job1")) is True
+        other = CandidateImportJobService(session_maker=session_maker)
+        assert run(session_maker, lambda db: other._claim(db, "job1")) is False
+        assert asyncio.run(other.recover_jobs()) == 0
+
+    def test_stale_job_recovered(self, database, service):
+        """测试心跳过期的任务被重新加入队列并可认领"""
+        session_maker, _ = database
+        stale = datetime.now() - timedelta(seconds=service.stale_seconds + 10)
+        add_job(session_maker, ImportJobStatus.IMPORTING, heartbeat_at=stale)
+
+        assert asyncio.run(service.recover_jobs()) == 1
+        assert run(session_maker, lambda db: service._claim(db, "job1")) is True
+
+    def test_finished_job_not_claimed(self, database, service):
+        """测试已结束的任务不能认领"""
+        session_maker, _ = database
+        add_job(session_maker, ImportJobStatus.COMPLETED)
+        assert run(session_maker, lambda db: service._claim(db, "job1")) is False
+
+
+class TestImportJobRun:
+    """导入任务执行测试"""
+
+    def test_resume_continues_remaining_rows(self, database, service):
+        """测试续传的任务只写入暂存表中剩余的行"""
+        session_maker, _ = database
+        add_job(session_maker, ImportJobStatus.FAILED, staged=5)
+
+        # 模拟中断前已提交第一批（2行）
+        async def commit_first_chunk(db):
+            staged = (await db.execute(
+                select(CandidateImportStaging).order_by(CandidateImportStaging.row_number).limit(2)
+            )).scalars().all()
+            for row in staged:
+                db.add(Candidate(
+                    name=row.name, id_number=row.id_number, id_card=row.id_number, phone=row.phone,
+                    institution_id=1, exam_product_id=1, created_by=1
+                ))
+                await db.delete(row)
+            job = await db.get(CandidateImportJob, "job1")
+            job.imported_count = 2
+            await db.commit()
+
+        run(session_maker, commit_first_chunk)
+
+        async def resume(db):
+            return await service.resume(db, await db.get(CandidateImportJob, "job1"))
+
+        job = run(session_maker, resume)
+        assert job.status == ImportJobStatus.IMPORTING
+        run(session_maker, lambda db: service.run_job(db, "job1"))
+
+        job = load_job(session_maker)
+        assert job.status == ImportJobStatus.COMPLETED
+        assert job.imported_count == 5
+        assert count(session_maker, Candidate) == 5
+        assert count(session_maker, CandidateImportStaging) == 0
+
+    def test_failure_keeps_staged_rows(self, database, service, monkeypatch):
+        """测试写入失败时任务标记为失败，暂存数据保留等待续传"""
+        session_maker, _ = database
+        add_job(session_maker, ImportJobStatus.IMPORTING, staged=3)
+
+        async def fail(*args, **kwargs):
+            raise RuntimeError("数据库连接断开")
+
+        monkeypatch.setattr(candidate_import_service, "commit_staged_candidates", fail)
+        run(session_maker, lambda db: service.run_job(db, "job1"))
+
+        job = load_job(session_maker)
+        assert job.status == ImportJobStatus.FAILED
+        assert "数据库连接断开" in job.message
+        assert count(session_maker, CandidateImportStaging) == 3
+
+    def test_upload_removed_after_importing_committed(self, database, service, tmp_path, monkeypatch):
+        """测试上传文件在导入状态提交之后才删除"""
+        session_maker, db_path = database
+        upload = tmp_path / "job1.xlsx"
+        upload.write_bytes(candidate_import_service.generate_template(["产品A"]))
+        add_job(session_maker, ImportJobStatus.PENDING, file_path=str(upload))
+
+        states = []
+        remove_file = service._remove_file
+
+        def record_state(file_path):
+            with sqlite3.connect(db_path) as conn:
+                states.append(conn.execute("SELECT status, file_path FROM candidate_import_jobs").fetchone())
+            remove_file(file_path)
+
+        monkeypatch.setattr(service, "_remove_file", record_state)
+        run(session_maker, lambda db: service.run_job(db, "job1"))
+
+        assert states == [(ImportJobStatus.IMPORTING, None)]
+        assert not upload.exists()
+        job = load_job(session_maker)
+        assert job.status == ImportJobStatus.COMPLETED
+        assert job.imported_count == job.valid_count > 0
@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import src.db.models  # noqa: F401  注册全部模型
+from src.core.auth import verify_candidate_token
+from src.core import rate_limit
+from src.core.rate_limit import TokenBucketLimiter, client_ip, parse_networks
+from src.core.security import hash_id_number
+from src.db.base import Base
+from src.models.candidate import Candidate
+from src.routers.qrcode_checkin import CandidateLoginRequest, candidate_login_by_id_number
+from src.services.candidate_login import CandidateLoginService, candidate_login_service
+
+ID_NUMBER = "11010119900101123X"
+
+
+@pytest.fixture
+def database(tmp_path):
+    """一名考生；返回(会话工厂, 执行的SQL语句)"""
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'login.db'}")
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as db:
+            db.add(Candidate(
+                id=1, name="张三", id_number=ID_NUMBER, id_card=ID_NUMBER, phone="13800138001",
+                institution_id=1, exam_product_id=1, created_by=1
+            ))
+            await db.commit()
+
+    asyncio.run(setup())
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, parameters, *args: statements.append((statement, parameters)))
+    yield session_maker, statements
+    asyncio.run(engine.dispose())
+
+
+def make_request(peer, forwarded_for=None):
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": headers, "client": (peer, 50000)})
+
+
+def login(session_maker, service, id_number, client_ip="10.0.0.1"):
+    async def run():
+        async with session_maker() as db:
+            return await service.login(db, id_number, client_ip)
+
+    return asyncio.run(run())
+
+
+class TestTokenBucketLimiter:
+    """令牌桶限流测试"""
+
+    def test_refill(self):
+        """测试用完容量后按速率恢复"""
+        limiter = TokenBucketLimiter(2, per_seconds=60)
+        assert limiter.acquire("a", now=0) == 0
+        assert limiter.acquire("a", now=0) == 0
+        assert limiter.acquire("a", now=0) == pytest.approx(30)
+        assert limiter.acquire("b", now=0) == 0
+        assert limiter.acquire("a", now=31) == 0
+
+    def test_maxsize(self):
+        """测试超过容量淘汰最久未使用的键"""
+        limiter = TokenBucketLimiter(1, maxsize=2)
+        for key in "abc":
+            limiter.acquire(key, now=0)
+        assert len(limiter) == 2
+        assert limiter.acquire("a", now=0) == 0
+
+
+class TestClientIp:
+    """客户端IP识别测试"""
+
+    def test_trusted_proxy(self):
+        """测试只信任可信代理转发的X-Forwarded-For，并跳过链路中的可信代理"""
+        networks = parse_networks("172.16.0.0/12, 10.0.0.1")
+        assert client_ip(make_request("172.18.0.5", "1.2.3.4"), networks) == "1.2.3.4"
+        assert client_ip(make_request("172.18.0.5", "9.9.9.9, 1.2.3.4, 10.0.0.1"), networks) == "1.2.3.4"
+        assert client_ip(make_request("5.6.7.8", "1.2.3.4"), networks) == "5.6.7.8"
+        assert client_ip(make_request("172.18.0.5"), networks) == "172.18.0.5"
+
+
+class TestCandidateLogin:
+    """考生身份证号登录测试"""
+
+    def test_hash_maintained(self):
+        """测试设置身份证号时同步更新哈希，末位x不区分大小写"""
+        candidate = Candidate(id_number=ID_NUMBER.lower())
+        assert candidate.id_number_hash == hash_id_number(ID_NUMBER)
+        assert len(candidate.id_number_hash) == 64
+
+    def test_login(self, database):
+        """测试按哈希单次查询并签发考生令牌，SQL参数中不含原始身份证号"""
+        session_maker, statements = database
+        result = login(session_maker, CandidateLoginService(), ID_NUMBER)
+
+        assert verify_candidate_token(result["access_token"]) == 1
+        assert CandidateLoginService.candidate_info(result["candidate"])["id_number"] == "110101********123X"
+        assert len(statements) == 1
+        statement, parameters = statements[0]
+        assert "id_number_hash" in statement
+        assert ID_NUMBER not in str(parameters)
+
+    def test_not_found_and_format(self, database):
+        """测试身份证号不存在返回404，格式错误返回400"""
+        session_maker, _ = database
+        service = CandidateLoginService()
+        for id_number, status_code in [("110101199001019999", 404), ("1234", 400)]:
+            with pytest.raises(HTTPException) as error:
+                login(session_maker, service, id_number)
+            assert error.value.status_code == status_code
+
+    def test_rate_limit(self, database):
+        """测试同一身份证号及同一IP超过限额返回429"""
+        session_maker, statements = database
+        service = CandidateLoginService()
+        service.id_limiter = TokenBucketLimiter(2)
+        service.ip_limiter = TokenBucketLimiter(2)
+
+        login(session_maker, service, ID_NUMBER, "10.0.0.1")
+        login(session_maker, service, ID_NUMBER, "10.0.0.2")
+        with pytest.raises(HTTPException) as error:
+            login(session_maker, service, ID_NUMBER, "10.0.0.3")
+        assert error.value.status_code == 429
+        assert int(error.value.headers["Retry-After"]) > 0
+
+        with pytest.raises(HTTPException):
+            login(session_maker, service, "110101199001019999", "10.0.0.1")
+        statements.clear()
+        with pytest.raises(HTTPException) as error:
+            login(session_maker, service, "110101199001018888", "10.0.0.1")
+        assert error.value.status_code == 429
+        assert statements == []
+
+    def test_clients_behind_proxy(self, database, monkeypatch):
+        """测试经同一nginx代理的多个考生按各自IP限流，互不影响"""
+        session_maker, _ = database
+        monkeypatch.setattr(rate_limit, "TRUSTED_PROXY_NETWORKS", parse_networks("172.16.0.0/12"))
+        monkeypatch.setattr(candidate_login_service, "ip_limiter", TokenBucketLimiter(1))
+        monkeypatch.setattr(candidate_login_service, "id_limiter", TokenBucketLimiter(100))
+
+        async def login_via_proxy(forwarded_for):
+            async with session_maker() as db:
+                return await candidate_login_by_id_number(
+                    CandidateLoginRequest(id_number=ID_NUMBER), make_request("172.18.0.5", forwarded_for), db
+                )
+
+        for address in ["1.1.1.1", "2.2.2.2", "3.3.3.3"]:
+            assert asyncio.run(login_via_proxy(address))["message"] == "登录成功"
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(login_via_proxy("1.1.1.1"))
+        assert error.value.status_code == 429
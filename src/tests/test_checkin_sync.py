@@ -0,0 +1,201 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import src.db.models  # noqa: F401  注册全部模型
+from src.core.qr_token import encode_qr_token
+from src.db.base import Base
+from src.db.models import User
+from src.models.candidate import Candidate
+from src.models.schedule import Schedule
+from src.models.venue import Venue
+from src.services.checkin_sync import CheckinSyncService
+
+NOW = datetime.utcnow().replace(microsecond=0)
+
+
+@pytest.fixture
+def session_maker(tmp_path):
+    """两条可签到排期的SQLite测试库"""
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'sync.db'}")
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as db:
+            db.add_all([
+                User(id=1, email="a@exam.com", username="staff_a", hashed_password="x", role_id=1),
+                Venue(id=1, name="实操场地1", type="实操", capacity=10),
+            ])
+            for schedule_id, name in ((1, "张三"), (2, "李四")):
+                db.add(Candidate(
+                    id=schedule_id, name=name, id_number=f"11010119900101123{schedule_id}",
+                    id_card=f"11010119900101123{schedule_id}", phone="13800138000",
+                    institution_id=1, exam_product_id=1, created_by=1
+                ))
+                db.add(Schedule(
+                    id=schedule_id, candidate_id=schedule_id, exam_product_id=1, venue_id=1, created_by=1,
+                    scheduled_date=NOW.replace(hour=0, minute=0, second=0),
+                    start_time=NOW - timedelta(hours=1), end_time=NOW + timedelta(hours=1),
+                    schedule_type="practical", status="pending", check_in_status="not_checked_in"
+                ))
+            await db.commit()
+
+    asyncio.run(setup())
+    yield session_maker
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def service():
+    return CheckinSyncService()
+
+
+def make_token(service, schedule_id, candidate_id=None):
+    expires_at = datetime.now() + timedelta(hours=1)
+    return encode_qr_token(service.secret_key, "schedule_checkin", candidate_id or schedule_id, expires_at, schedule_id)
+
+
+def sync(session_maker, service, scans):
+    async def run():
+        async with session_maker() as db:
+            return await service.apply_scans(db, scans, await db.get(User, 1))
+    return asyncio.run(run())
+
+
+def load_schedule(session_maker, schedule_id):
+    async def run():
+        async with session_maker() as db:
+            return await db.get(Schedule, schedule_id)
+    return asyncio.run(run())
+
+
+class TestScanSync:
+    """离线扫码同步测试"""
+
+    def test_earliest_scan_wins(self, session_maker, service):
+        """测试同一排期的多次扫码以最早的为准，且与上传顺序无关"""
+        first, second = make_token(service, 1), make_token(service, 1)
+        result = sync(session_maker, service, [
+            (second, NOW - timedelta(minutes=5)),
+            (first, NOW - timedelta(minutes=20)),
+            (make_token(service, 2), NOW - timedelta(minutes=10)),
+        ])
+
+        assert [item["status"] for item in result["results"]] == ["superseded", "applied", "applied"]
+        schedule = load_schedule(session_maker, 1)
+        assert schedule.check_in_status == "checked_in"
+        assert schedule.check_in_time == NOW - timedelta(minutes=20)
+
+    def test_reupload_is_idempotent(self, session_maker, service):
+        """测试重复上传同一批记录不再写入"""
+        scans = [(make_token(service, 1), (NOW - timedelta(minutes=3)).replace(tzinfo=timezone.utc))]
+        assert sync(session_maker, service, scans)["summary"]["applied"] == 1
+
+        result = sync(session_maker, service, scans + scans)
+        assert result["summary"] == {"applied": 0, "duplicate": 2, "superseded": 0, "rejected": 0}
+
+    def test_earlier_scan_from_other_device(self, session_maker, service):
+        """测试后同步的设备扫码时间更早时覆盖已有签到"""
+        sync(session_maker, service, [(make_token(service, 1), NOW - timedelta(minutes=5))])
+        result = sync(session_maker, service, [
+            (make_token(service, 1), NOW - timedelta(minutes=30)),
+            (make_token(service, 2), NOW - timedelta(minutes=1)),
+        ])
+
+        assert result["summary"]["applied"] == 2
+        assert load_schedule(session_maker, 1).check_in_time == NOW - timedelta(minutes=30)
+
+        result = sync(session_maker, service, [(make_token(service, 1), NOW - timedelta(minutes=10))])
+        assert result["results"][0]["status"] == "superseded"
+
+    def test_concurrent_earlier_checkin(self, session_maker, service, monkeypatch):
+        """测试条件更新前另一同步已写入更早的扫码时，结果为superseded且不修改考生状态"""
+        db_path = session_maker.kw["bind"].url.database
+        earlier = (NOW - timedelta(minutes=30)).strftime("%Y-%m-%d %H:%M:%S.%f")
+        checkin_statement = service._checkin_statement
+
+        def concurrent_sync():
+            with sqlite3.connect(db_path) as conn:
+                conn.execute(
+                    "UPDATE schedules SET check_in_status='checked_in', check_in_time=?, check_in_nonce='other' WHERE id=1",
+                    (earlier,)
+                )
+            return checkin_statement()
+
+        monkeypatch.setattr(service, "_checkin_statement", concurrent_sync)
+        result = sync(session_maker, service, [
+            (make_token(service, 1), NOW - timedelta(minutes=5)),
+            (make_token(service, 2), NOW - timedelta(minutes=5)),
+        ])
+
+        assert [item["status"] for item in result["results"]] == ["superseded", "applied"]
+        assert load_schedule(session_maker, 1).check_in_nonce == "other"
+
+        async def candidate_statuses():
+            async with session_maker() as db:
+                return [(await db.get(Candidate, candidate_id)).status for candidate_id in (1, 2)]
+
+        assert asyncio.run(candidate_statuses()) == ["待审核", "考试中"]
+
+    def test_rejected_scans(self, session_maker, service):
+        """测试无效二维码、考生不符、扫码时间异常的记录被拒绝且不影响其他记录"""
+        result = sync(session_maker, service, [
+            ("INVALID", NOW),
+            (make_token(service, 1, candidate_id=2), NOW),
+            (make_token(service, 2), NOW + timedelta(hours=1)),
+            (make_token(service, 2), NOW - timedelta(hours=2)),
+            (make_token(service, 2), NOW),
+        ])
+
+        assert [item["status"] for item in result["results"]] == ["rejected"] * 4 + ["applied"]
+        assert load_schedule(session_maker, 1).check_in_status == "not_checked_in"
+
+
+    def test_cancelled_schedule_rejected(self, session_maker, service, monkeypatch):
+        """测试已取消排期的离线扫码被拒绝，且不会恢复排期；同步期间被取消时同样拒绝"""
+        db_path = session_maker.kw["bind"].url.database
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("UPDATE schedules SET status='cancelled' WHERE id=1")
+
+        result = sync(session_maker, service, [(make_token(service, 1), NOW - timedelta(minutes=5))])
+        assert result["results"][0]["status"] == "rejected"
+        schedule = load_schedule(session_maker, 1)
+        assert (schedule.status, schedule.check_in_status) == ("cancelled", "not_checked_in")
+
+        checkin_statement = service._checkin_statement
+
+        def concurrent_cancel():
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("UPDATE schedules SET status='cancelled' WHERE id=2")
+            return checkin_statement()
+
+        monkeypatch.setattr(service, "_checkin_statement", concurrent_cancel)
+        result = sync(session_maker, service, [(make_token(service, 2), NOW - timedelta(minutes=5))])
+        assert result["summary"] == {"applied": 0, "duplicate": 0, "superseded": 0, "rejected": 1}
+        schedule = load_schedule(session_maker, 2)
+        assert (schedule.status, schedule.check_in_status) == ("cancelled", "not_checked_in")
+
+
+class TestRoster:
+    """考场名单测试"""
+
+    def test_roster(self, session_maker, service):
+        """测试名单内容精简、姓名脱敏，签到后版本变化"""
+        async def build():
+            async with session_maker() as db:
+                return await service.build_roster(db, 1, NOW.date())
+
+        roster = asyncio.run(build())
+        assert [row[:3] for row in roster["rows"]] == [[1, 1, "张*"], [2, 2, "李*"]]
+        assert [row[-1] for row in roster["rows"]] == [0, 0]
+
+        sync(session_maker, service, [(make_token(service, 1), NOW)])
+        updated = asyncio.run(build())
+        assert updated["rows"][0][-1] == 1
+        assert updated["version"] != roster["version"]
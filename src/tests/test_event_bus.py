@@ -0,0 +1,101 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+from src.core.event_bus import EventBus, EventType, LocalBroker, RedisEventBus
+from src.models.schedule import Schedule
+from src.services.public_board import PublicBoard
+from src.services.queue_index import QueueIndex
+from src.services.realtime_events import RealtimeEventHandlers, schedule_event
+from src.services.venue_projection import VenueProjection
+
+TODAY = datetime.combine(date.today(), datetime.min.time())
+
+
+def make_schedule(schedule_id, minutes=0, venue_id=1):
+    start_time = TODAY + timedelta(hours=9, minutes=minutes)
+    return Schedule(
+        id=schedule_id, candidate_id=schedule_id, exam_product_id=1, venue_id=venue_id,
+        scheduled_date=TODAY, start_time=start_time, end_time=start_time + timedelta(minutes=15),
+        schedule_type="practical", status="pending", check_in_status="not_checked_in"
+    )
+
+
+def make_worker(broker):
+    """一个模拟worker：独立的事件总线、排队索引和公共看板"""
+    bus = broker.attach(EventBus())
+    index = QueueIndex(session_maker=None)
+    index.load([make_schedule(1), make_schedule(2, minutes=15)])
+    index.day = date.today()
+    projection = VenueProjection(session_maker=None)
+    RealtimeEventHandlers(index, projection, PublicBoard(projection)).register(bus)
+    return bus, index
+
+
+class TestEventBus:
+    """事件总线测试"""
+
+    def test_dispatch(self):
+        """测试同步、异步处理函数均被调用，单个处理函数出错不影响其他处理函数"""
+        bus = EventBus()
+        received = []
+
+        async def on_async(payload):
+            received.append(("async", payload["value"]))
+
+        def on_error(payload):
+            raise RuntimeError("boom")
+
+        bus.subscribe("test", on_error)
+        bus.subscribe("test", lambda payload: received.append(("sync", payload["value"])))
+        bus.subscribe("test", on_async)
+        asyncio.run(bus.publish("test", value=1))
+
+        assert received == [("sync", 1), ("async", 1)]
+        assert bus.metrics()["published"] == 1
+
+    def test_events_reach_other_workers(self):
+        """测试一个worker的签到、排期变更被其他worker应用到各自的排队索引"""
+        broker = LocalBroker()
+        (bus1, index1), (bus2, index2) = make_worker(broker), make_worker(broker)
+
+        async def run():
+            await bus1.publish(EventType.CHECKIN, schedule_ids=[1])
+            moved = make_schedule(3, minutes=5)
+            await bus2.publish(EventType.SCHEDULE_CHANGED, schedules=[schedule_event(moved)], deleted=[])
+
+        asyncio.run(run())
+
+        for index in (index1, index2):
+            assert index.waiting_ids(1, "practical", date.today()) == [3, 2]
+        assert (bus1.received, bus2.received) == (1, 1)
+
+    def test_cancel_and_delete_leave_queue(self):
+        """测试取消或删除的排期移出其他worker的排队索引"""
+        broker = LocalBroker()
+        (bus1, _), (_, index2) = make_worker(broker), make_worker(broker)
+        cancelled = make_schedule(1)
+        cancelled.status = "cancelled"
+
+        asyncio.run(bus1.publish(EventType.SCHEDULE_CHANGED, schedules=[schedule_event(cancelled)], deleted=[2]))
+
+        assert len(index2) == 0
+
+    def test_redis_unavailable(self):
+        """测试Redis不可用时仍在本进程内分发"""
+        import redis.asyncio as aioredis
+
+        bus = RedisEventBus(client_factory=lambda: aioredis.Redis(host="127.0.0.1", port=1, socket_connect_timeout=0.1))
+        received = []
+        bus.subscribe(EventType.VENUE_CHANGED, lambda payload: received.append(payload["venue_ids"]))
+
+        async def run():
+            await bus.start()
+            await asyncio.sleep(0.2)
+            await bus.publish(EventType.VENUE_CHANGED, venue_ids=[1])
+            metrics = bus.metrics()
+            await bus.stop()
+            return metrics
+
+        metrics = asyncio.run(run())
+        assert received == [[1]]
+        assert metrics["connected"] is False
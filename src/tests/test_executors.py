@@ -0,0 +1,155 @@
+import asyncio
+import gc
+import io
+import time
+
+import pytest
+from openpyxl import Workbook
+
+from src.core.executors import ExecutorPool
+from src.core.security import get_password_hash, verify_password, verify_password_async
+from src.services.candidate_import import CandidateImportService
+
+
+def make_excel(rows):
+    """构造考生导入Excel"""
+    workbook = Workbook()
+    worksheet = workbook.active
+    worksheet.append(CandidateImportService.TEMPLATE_COLUMNS)
+    for index in range(rows):
+        worksheet.append([f"考生{index}", "11010119900307123X", "13800138000", "", "", "理论考试"])
+    output = io.BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+async def measure_lag(workload, interval=0.005):
+    """
+    执行负载期间每隔interval检查一次事件循环，返回最大延迟（秒）
+
+    测量前冻结已有对象，避免整个测试会话累积的对象触发的全量GC停顿计入延迟
+    """
+    gc.collect()
+    gc.freeze()
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - started - interval)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)  # 让计时任务先开始等待
+    try:
+        await workload()
+    finally:
+        done.set()
+        await task
+        gc.unfreeze()
+    return max(lags)
+
+
+class TestExecutorPool:
+    """共享执行池测试"""
+
+    def test_run_and_metrics(self):
+        """测试执行结果及排队指标"""
+        pool = ExecutorPool("test", "thread", 2)
+
+        async def workload():
+            return await asyncio.gather(*[pool.run(time.sleep, 0.05) for _ in range(6)])
+
+        try:
+            asyncio.run(workload())
+            metrics = pool.metrics()
+        finally:
+            pool.shutdown()
+
+        assert metrics["submitted"] == metrics["completed"] == 6
+        assert metrics["in_flight"] == metrics["queue_depth"] == 0
+        assert metrics["peak_queue_depth"] == 4
+        # 后提交的任务需等待前面的任务完成
+        assert metrics["max_wait_ms"] >= 90
+
+    def test_failure_counted(self):
+        """测试异常原样抛出并计入失败数"""
+        pool = ExecutorPool("test", "thread", 1)
+        try:
+            with pytest.raises(ZeroDivisionError):
+                asyncio.run(pool.run(divmod, 1, 0))
+        finally:
+            pool.shutdown()
+
+        assert pool.failed == 1
+        assert pool.in_flight == 0
+
+    def test_process_pool(self):
+        """测试进程池执行模块级函数"""
+        pool = ExecutorPool("test", "process", 1)
+        try:
+            assert asyncio.run(pool.run(divmod, 7, 2)) == (3, 1)
+        finally:
+            pool.shutdown()
+
+
+def bcrypt_available():
+    """passlib与当前bcrypt版本是否兼容"""
+    try:
+        get_password_hash("probe")
+        return True
+    except Exception:
+        return False
+
+
+class TestEventLoopLag:
+    """并发登录与导入期间的事件循环延迟"""
+
+    def test_import_parsing_keeps_loop_responsive(self):
+        """测试Excel解析放入线程池后事件循环仍能及时响应"""
+        contents = make_excel(3000)
+        service = CandidateImportService()
+        pool = ExecutorPool("test", "thread", 4)
+
+        async def inline():
+            service.parse_excel_content(contents)
+
+        async def offloaded():
+            await asyncio.gather(*[pool.run(service.parse_excel_content, contents) for _ in range(2)])
+
+        try:
+            inline_lag = asyncio.run(measure_lag(inline))
+            offloaded_lag = asyncio.run(measure_lag(offloaded))
+        finally:
+            pool.shutdown()
+
+        # 阻塞执行时延迟为整个解析耗时；放入线程池后只受GIL切换影响
+        assert offloaded_lag < inline_lag / 4
+
+    @pytest.mark.skipif(not bcrypt_available(), reason="passlib与已安装的bcrypt版本不兼容")
+    def test_concurrent_logins_and_imports(self):
+        """测试并发登录（bcrypt）与导入期间事件循环仍能及时响应"""
+        hashed = get_password_hash("secret123")
+        contents = make_excel(3000)
+        service = CandidateImportService()
+        pool = ExecutorPool("test", "thread", 4)
+
+        async def inline():
+            for _ in range(8):
+                verify_password("secret123", hashed)
+
+        async def offloaded():
+            logins = [verify_password_async("secret123", hashed) for _ in range(8)]
+            imports = [pool.run(service.parse_excel_content, contents) for _ in range(2)]
+            results = await asyncio.gather(*logins, *imports)
+            assert all(results[:8])
+
+        try:
+            inline_lag = asyncio.run(measure_lag(inline))
+            offloaded_lag = asyncio.run(measure_lag(offloaded))
+        finally:
+            pool.shutdown()
+
+        # bcrypt计算时释放GIL，放入线程池后登录几乎不影响事件循环
+        assert offloaded_lag < inline_lag / 4
@@ -0,0 +1,212 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from src.core import http_cache
+from src.core.http_cache import (
+    make_etag, is_not_modified, content_disposition, ConditionalGetMiddleware, TableVersions, RedisTableVersions
+)
+
+
+def make_request(headers):
+    """构造带请求头的请求"""
+    return Request({
+        "type": "http",
+        "headers": [(key.lower().encode(), value.encode()) for key, value in headers.items()],
+    })
+
+
+class TestConditionalRequest:
+    """条件请求测试"""
+
+    def test_matching_etag(self):
+        """测试ETag匹配时返回未修改"""
+        etag = make_etag("abc")
+        assert is_not_modified(make_request({"If-None-Match": '"abc"'}), etag)
+        assert is_not_modified(make_request({"If-None-Match": 'W/"abc", "def"'}), etag)
+        assert is_not_modified(make_request({"If-None-Match": "*"}), etag)
+
+    def test_mismatched_etag(self):
+        """测试ETag不匹配或未携带时需要返回内容"""
+        etag = make_etag("abc")
+        assert not is_not_modified(make_request({"If-None-Match": '"def"'}), etag)
+        assert not is_not_modified(make_request({}), etag)
+
+    def test_content_disposition(self):
+        """测试中文文件名编码"""
+        assert content_disposition("模板.xlsx") == "attachment; filename*=UTF-8''%E6%A8%A1%E6%9D%BF.xlsx"
+
+
+def make_app(versions):
+    """一个依赖venues表的接口，记录执行次数"""
+    app = FastAPI()
+    app.state.calls = 0
+
+    @app.get("/venues/")
+    async def list_venues():
+        app.state.calls += 1
+        return {"calls": app.state.calls}
+
+    app.add_middleware(ConditionalGetMiddleware, rules=[(r"^/venues(/|$)", ["venues"])],
+                       versions=versions)
+    return app
+
+
+class TestConditionalGetMiddleware:
+    """条件请求中间件测试"""
+
+    def test_not_modified_until_write(self):
+        """测试ETag匹配时返回304且不执行接口，数据表写入后重新返回内容"""
+        versions = TableVersions()
+        app = make_app(versions)
+        client = TestClient(app)
+
+        response = client.get("/venues/")
+        etag = response.headers["etag"]
+        assert response.status_code == 200
+
+        response = client.get("/venues/", headers={"If-None-Match": etag})
+        assert (response.status_code, response.headers["etag"], app.state.calls) == (304, etag, 1)
+
+        versions.bump_sync(["candidates"])
+        assert client.get("/venues/", headers={"If-None-Match": etag}).status_code == 304
+        versions.bump_sync(["venues"])
+        response = client.get("/venues/", headers={"If-None-Match": etag})
+        assert (response.status_code, response.json()) == (200, {"calls": 2})
+        assert response.headers["etag"] != etag
+
+    def test_etag_varies_by_user_and_query(self):
+        """测试不同认证信息、不同参数的ETag不同"""
+        client = TestClient(make_app(TableVersions()))
+        etags = {
+            client.get("/venues/", headers={"Authorization": "Bearer a"}).headers["etag"],
+            client.get("/venues/", headers={"Authorization": "Bearer b"}).headers["etag"],
+            client.get("/venues/?page=2", headers={"Authorization": "Bearer a"}).headers["etag"]
+        }
+        assert len(etags) == 3
+
+    def test_queue_routes_not_cached(self):
+        """测试排队位置等随时间变化的接口不使用条件请求"""
+        from src.main import CONDITIONAL_GET_RULES
+
+        middleware = ConditionalGetMiddleware(None, rules=CONDITIONAL_GET_RULES)
+        assert middleware.match("/qrcode/candidate/1/schedule") is None
+        assert middleware.match("/venues/") == ("venues",)
+
+    def test_versions_unavailable(self):
+        """测试Redis不可用时不生成ETag、不返回304"""
+        import redis.asyncio as aioredis
+
+        versions = RedisTableVersions(
+            client_factory=lambda: aioredis.Redis(host="127.0.0.1", port=1, socket_connect_timeout=0.1, retry=None)
+        )
+        client = TestClient(make_app(versions))
+        response = client.get("/venues/", headers={"If-None-Match": "*"})
+        assert response.status_code == 200
+        assert "etag" not in response.headers
+
+
+class FakeRedis:
+    """多个worker共享的Redis（仅实现版本号用到的命令）"""
+
+    def __init__(self):
+        self.data = {}
+        self.incr_calls = 0
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value)
+        return True
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.keys = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def incr(self, key):
+        self.keys.append(key)
+
+    async def execute(self):
+        for key in self.keys:
+            self.redis.incr_calls += 1
+            self.redis.data[key] = str(int(self.redis.data.get(key, 0)) + 1)
+
+
+class TestTableVersions:
+    """数据表版本号测试"""
+
+    def test_bump_on_commit(self, tmp_path, monkeypatch):
+        """测试每次提交对象写入及批量更新后版本号递增一次，回滚不递增"""
+        pytest.importorskip("aiosqlite")
+        from sqlalchemy import update
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        import src.db.models  # noqa: F401  注册全部模型
+        from src.db.base import Base
+        from src.models.venue import Venue
+
+        table_versions = TableVersions()
+        monkeypatch.setattr(http_cache, "table_versions", table_versions)
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'versions.db'}")
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def run():
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            versions = [table_versions.get("venues")]
+            async with session_maker() as db:
+                db.add(Venue(id=1, name="实操场地1", type="实操", capacity=10))
+                await db.commit()
+                await asyncio.sleep(0)
+                versions.append(table_versions.get("venues"))
+                await db.execute(update(Venue).values(capacity=20))
+                await db.commit()
+                await asyncio.sleep(0)
+                versions.append(table_versions.get("venues"))
+                await db.execute(update(Venue).values(capacity=30))
+                await db.rollback()
+                await db.commit()
+                await asyncio.sleep(0)
+                versions.append(table_versions.get("venues"))
+            await engine.dispose()
+            return versions
+
+        assert asyncio.run(run()) == [0, 1, 2, 2]
+
+    def test_shared_between_workers(self):
+        """测试各worker读取同一份版本号，生成相同ETag；写入只递增一次，所有worker的ETag随之变化"""
+        redis = FakeRedis()
+        workers = [RedisTableVersions(client_factory=lambda: redis) for _ in range(2)]
+        clients = [TestClient(make_app(versions)) for versions in workers]
+
+        etags = [client.get("/venues/").headers["etag"] for client in clients]
+        assert etags[0] == etags[1]
+        assert clients[1].get("/venues/", headers={"If-None-Match": etags[0]}).status_code == 304
+
+        asyncio.run(workers[0].bump({"venues"}))
+        assert redis.incr_calls == 1
+        for client in clients:
+            response = client.get("/venues/", headers={"If-None-Match": etags[0]})
+            assert response.status_code == 200
+            assert response.headers["etag"] != etags[0]
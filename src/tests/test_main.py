@@ -7,3 +7,35 @@ def test_read_root():
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"message": "Welcome to Exam Site Backend API"}
+
+def test_background_service_failure_isolated(monkeypatch):
+    """单个后台服务启动、停止失败不影响其他服务，停止顺序与启动相反"""
+    import asyncio
+    from src import main
+
+    calls = []
+
+    class Service:
+        def __init__(self, name, fail=False):
+            self.name = name
+            self.fail = fail
+
+        async def start(self):
+            calls.append(("start", self.name))
+            if self.fail:
+                raise RuntimeError("boom")
+
+        async def stop(self):
+            calls.append(("stop", self.name))
+            if self.fail:
+                raise RuntimeError("boom")
+
+    monkeypatch.setattr(main, "BACKGROUND_SERVICES", [("a", Service("a")), ("b", Service("b", fail=True)), ("c", Service("c"))])
+    monkeypatch.setattr(main, "shutdown_executors", lambda: calls.append(("shutdown", "executors")))
+    asyncio.run(main.start_background_services())
+    asyncio.run(main.stop_background_services())
+
+    assert calls == [
+        ("start", "a"), ("start", "b"), ("start", "c"),
+        ("stop", "c"), ("stop", "b"), ("stop", "a"), ("shutdown", "executors")
+    ]
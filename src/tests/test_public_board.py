@@ -0,0 +1,128 @@
+import asyncio
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import src.db.models  # noqa: F401  注册全部模型
+from src.db.base import Base
+from src.models.candidate import Candidate
+from src.models.schedule import Schedule
+from src.models.venue import Venue
+from src.services.public_board import PublicBoard, format_event
+from src.services.venue_projection import VenueProjection
+
+
+@pytest.fixture
+def session_maker(tmp_path):
+    """两个考场：考场1有一场进行中的考试和两名待签到考生，考场2空闲"""
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'board.db'}")
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    now = datetime.utcnow().replace(microsecond=0)
+    today = datetime.combine(date.today(), datetime.min.time())
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as db:
+            db.add_all([Venue(id=1, name="实操场地1", type="实操", capacity=10),
+                        Venue(id=2, name="实操场地2", type="实操", capacity=10)])
+            slots = [(1, "张三", now - timedelta(minutes=10), "checked_in"),
+                     (2, "李四", now + timedelta(minutes=20), "not_checked_in"),
+                     (3, "王五", now + timedelta(minutes=50), "not_checked_in")]
+            for schedule_id, name, start_time, check_in_status in slots:
+                db.add(Candidate(
+                    id=schedule_id, name=name, id_number=f"11010119900101123{schedule_id}",
+                    id_card=f"11010119900101123{schedule_id}", phone="13800138000",
+                    institution_id=1, exam_product_id=1, created_by=1
+                ))
+                db.add(Schedule(
+                    id=schedule_id, candidate_id=schedule_id, exam_product_id=1, venue_id=1, created_by=1,
+                    scheduled_date=today, start_time=start_time, end_time=start_time + timedelta(minutes=30),
+                    schedule_type="practical", status="pending", check_in_status=check_in_status
+                ))
+            await db.commit()
+
+    asyncio.run(setup())
+    yield session_maker
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def projection(session_maker):
+    projection = VenueProjection(session_maker)
+    asyncio.run(projection.refresh())
+    return projection
+
+
+class TestPublicBoard:
+    """公共看板推送测试"""
+
+    def test_snapshot_then_patch(self, projection):
+        """测试连接时收到快照，签到后只推送有变化的考场"""
+        board = PublicBoard(projection)
+
+        async def run():
+            subscriber, initial = await board.subscribe()
+            projection.apply_checkin([2])
+            await board.refresh()
+            board.heartbeat_seconds = 0.01
+            return initial, await board.next_event(subscriber), await board.next_event(subscriber)
+
+        initial, patch, heartbeat = asyncio.run(run())
+
+        assert [event["event"] for event in initial] == ["snapshot"]
+        venues = {venue["venue_id"]: venue for venue in initial[0]["data"]["venues"]}
+        assert venues[1]["current_candidate"] == "张*"
+        assert venues[1]["waiting_count"] == 2
+        assert venues[2]["current_candidate"] is None
+
+        assert patch["event"] == "patch"
+        assert [(venue["venue_id"], venue["waiting_count"]) for venue in patch["data"]["venues"]] == [(1, 1)]
+        assert patch["data"]["summary"]["total_waiting_candidates"] == 1
+        assert heartbeat is None
+
+        message = format_event(patch)
+        assert message.startswith(f"id: {patch['id']}\nevent: patch\ndata: ")
+        assert json.loads(message.split("data: ", 1)[1])["removed"] == []
+
+    def test_resume_from_last_event_id(self, projection):
+        """测试按Last-Event-ID补发错过的增量，无法补发时发送快照"""
+        board = PublicBoard(projection)
+
+        async def run():
+            _, initial = await board.subscribe()
+            projection.apply_checkin([2])
+            await board.refresh()
+            projection.apply_checkin([3])
+            await board.refresh()
+            return initial[0]["id"]
+
+        first_id = asyncio.run(run())
+
+        assert [event["data"]["summary"]["total_waiting_candidates"] for event in board.replay(first_id)] == [1, 0]
+        assert board.replay(board.last_event_id) == []
+        assert [event["event"] for event in board.replay("other-1")] == ["snapshot"]
+        assert [event["event"] for event in board.replay(None)] == ["snapshot"]
+
+    def test_slow_subscriber_resyncs(self, projection):
+        """测试连接积压超过上限时丢弃积压，改为发送快照"""
+        board = PublicBoard(projection)
+        board.max_pending = 2
+        now = datetime.utcnow()
+
+        async def run():
+            subscriber, _ = await board.subscribe()
+            for waiting_count in range(5):
+                updated = {venue_id: dict(venue) for venue_id, venue in board.board.items()}
+                updated[1]["waiting_count"] = waiting_count
+                board.apply(updated, now)
+            return await board.next_event(subscriber), subscriber.queue.qsize()
+
+        event, pending = asyncio.run(run())
+
+        assert event["event"] == "snapshot"
+        assert event["id"] == board.last_event_id
+        assert pending == 0
@@ -0,0 +1,103 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+import qrcode
+
+from src.core.qr_token import (
+    b45encode, b45decode, encode_qr_token, decode_qr_token, QRTokenError, QRTokenExpired
+)
+
+SECRET = "test-secret"
+
+
+def qr_version(data: str) -> int:
+    """计算数据所需的最小二维码版本"""
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.version
+
+
+class TestBase45:
+    """Base45编解码测试（RFC 9285 示例）"""
+
+    @pytest.mark.parametrize("raw,encoded", [
+        (b"AB", "BB8"),
+        (b"Hello!!", "%69 VD92EX0"),
+        (b"base-45", "UJCLQE7W581"),
+        (b"ietf!", "QED8WEX0"),
+    ])
+    def test_rfc_vectors(self, raw, encoded):
+        """测试RFC示例编解码"""
+        assert b45encode(raw) == encoded
+        assert b45decode(encoded) == raw
+
+    def test_invalid_input(self):
+        """测试非法字符和长度"""
+        with pytest.raises(QRTokenError):
+            b45decode("abc")
+        with pytest.raises(QRTokenError):
+            b45decode("GGW")  # 超出两字节范围
+        with pytest.raises(QRTokenError):
+            b45decode("BB8A")
+
+
+class TestQRToken:
+    """签到二维码令牌测试"""
+
+    def test_round_trip(self):
+        """测试生成后可校验解析"""
+        expires_at = datetime.now().replace(microsecond=0) + timedelta(minutes=60)
+        token = encode_qr_token(SECRET, "schedule_checkin", 123, expires_at, 4567)
+        data = decode_qr_token(SECRET, token)
+
+        assert data["type"] == "schedule_checkin"
+        assert data["candidate_id"] == 123
+        assert data["schedule_id"] == 4567
+        assert data["expires_at"] == expires_at
+
+    def test_nonce_makes_tokens_unique(self):
+        """测试相同内容每次生成的令牌不同"""
+        expires_at = datetime.now() + timedelta(minutes=60)
+        assert encode_qr_token(SECRET, "candidate_info", 1, expires_at) != \
+            encode_qr_token(SECRET, "candidate_info", 1, expires_at)
+
+    def test_wrong_secret_and_tampering(self):
+        """测试密钥错误或内容被篡改时校验失败"""
+        token = encode_qr_token(SECRET, "candidate_info", 1, datetime.now() + timedelta(minutes=60))
+
+        with pytest.raises(QRTokenError):
+            decode_qr_token("other-secret", token)
+
+        tampered = ("1" if token[5] != "1" else "2").join([token[:5], token[6:]])
+        with pytest.raises(QRTokenError):
+            decode_qr_token(SECRET, tampered)
+
+    def test_expired(self):
+        """测试过期令牌"""
+        token = encode_qr_token(SECRET, "candidate_info", 1, datetime.now() - timedelta(seconds=1))
+        with pytest.raises(QRTokenExpired):
+            decode_qr_token(SECRET, token)
+
+    def test_smaller_qr_version(self):
+        """测试令牌所需二维码版本明显小于原JSON内容"""
+        expires_at = datetime.now() + timedelta(minutes=60)
+        token = encode_qr_token(SECRET, "schedule_checkin", 100000, expires_at, 2000000)
+        legacy = json.dumps({
+            "type": "schedule_checkin",
+            "schedule_id": 2000000,
+            "candidate_id": 100000,
+            "candidate_name": "张三",
+            "id_number": "110101199001011237",
+            "schedule_type": "practical",
+            "venue_name": "实操考场A",
+            "start_time": expires_at.isoformat(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "expires_at": expires_at.isoformat(),
+            "token": "0123456789abcdef"
+        }, ensure_ascii=False)
+
+        assert set(token) <= set("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:")
+        assert qr_version(token) <= 3
+        assert qr_version(legacy) >= 10
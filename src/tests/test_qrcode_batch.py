@@ -0,0 +1,69 @@
+import asyncio
+import io
+import re
+import zipfile
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.core.executors import ExecutorPool
+from src.core.qr_token import encode_qr_token
+from src.services.qrcode_batch import QRCodeBatchService, SLIPS_PER_PAGE
+
+
+def make_slips(count):
+    """构造准考证数据"""
+    expires_at = datetime.now() + timedelta(days=1)
+    return [
+        {
+            "schedule_id": index + 1,
+            "token": encode_qr_token("secret", "schedule_checkin", index + 1, expires_at, index + 1),
+            "candidate_name": f"考生{index + 1}",
+            "id_number": "110101********1237",
+            "schedule_type": "理论考试",
+            "start_time": "2025-08-03 09:00",
+            "venue_name": "理论考场A"
+        }
+        for index in range(count)
+    ]
+
+
+async def collect(iterator):
+    return b"".join([chunk async for chunk in iterator])
+
+
+@pytest.fixture(scope="module")
+def service():
+    pool = ExecutorPool("test", "process", 2)
+    service = QRCodeBatchService(pool)
+    service.qr_chunk_size = 3
+    yield service
+    pool.shutdown()
+
+
+class TestBatchQRCode:
+    """批量二维码生成测试"""
+
+    def test_zip_output(self, service):
+        """测试ZIP包含全部二维码且顺序一致"""
+        content = asyncio.run(collect(service.iter_zip(make_slips(7))))
+
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            names = archive.namelist()
+            assert names == [f"{index}_考生{index}.png" for index in range(1, 8)]
+            assert archive.read(names[0]).startswith(b"\x89PNG")
+
+    def test_pdf_structure(self, service):
+        """测试PDF页数及交叉引用表偏移正确"""
+        content = asyncio.run(collect(service.iter_pdf(make_slips(SLIPS_PER_PAGE + 1))))
+
+        assert content.startswith(b"%PDF-1.4")
+        assert b"/Count 2" in content
+        start = int(re.search(rb"startxref\n(\d+)", content).group(1))
+        entries = re.findall(rb"(\d{10}) 00000 n", content[start:])
+        for object_id, offset in enumerate(entries, start=1):
+            assert content[int(offset):].startswith(f"{object_id} 0 obj".encode())
+
+    def test_mask_id_number(self, service):
+        """测试身份证号脱敏"""
+        assert service._mask_id_number("110101199001011237") == "110101********1237"
@@ -0,0 +1,107 @@
+import asyncio
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import src.db.models  # noqa: F401  注册全部模型
+from src.db.base import Base
+from src.models.candidate import Candidate
+from src.models.schedule import Schedule
+from src.models.venue import Venue
+from src.routers.qrcode_checkin import get_current_queue_status, get_public_dashboard
+
+
+def build_db(path, venue_count):
+    """每个考场一场进行中的考试和两名待签到考生"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    now = datetime.utcnow().replace(microsecond=0)
+    today = datetime.combine(date.today(), datetime.min.time())
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as db:
+            schedule_id = 0
+            for venue_id in range(1, venue_count + 1):
+                db.add(Venue(id=venue_id, name=f"考场{venue_id}", type="实操", capacity=10))
+                slots = [(now - timedelta(minutes=10), "checked_in"),
+                         (now + timedelta(minutes=20), "not_checked_in"),
+                         (now + timedelta(minutes=50), "not_checked_in")]
+                for start_time, check_in_status in slots:
+                    schedule_id += 1
+                    db.add(Candidate(
+                        id=schedule_id, name=f"考生{schedule_id}", id_number=f"1101011990010{schedule_id:05d}",
+                        id_card=f"1101011990010{schedule_id:05d}", phone="13800138000",
+                        institution_id=1, exam_product_id=1, created_by=1
+                    ))
+                    db.add(Schedule(
+                        id=schedule_id, candidate_id=schedule_id, exam_product_id=1, venue_id=venue_id, created_by=1,
+                        scheduled_date=today, start_time=start_time, end_time=start_time + timedelta(minutes=30),
+                        schedule_type="practical", status="pending", check_in_status=check_in_status
+                    ))
+            await db.commit()
+
+    asyncio.run(setup())
+    return engine, session_maker
+
+
+def call_counted(engine, session_maker, endpoint, **kwargs):
+    """调用接口函数，返回(结果, 执行的SQL语句数)"""
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    async def run():
+        async with session_maker() as db:
+            event.listen(engine.sync_engine, "before_cursor_execute", count)
+            try:
+                return await endpoint(db=db, **kwargs)
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+    result = asyncio.run(run())
+    asyncio.run(engine.dispose())
+    return result, len(statements)
+
+
+class TestConstantQueryCount:
+    """排队与看板接口查询次数测试"""
+
+    @pytest.mark.parametrize("venue_count", [1, 5])
+    def test_current_queue(self, tmp_path, venue_count):
+        """测试当前排队查询次数与考场数量无关"""
+        pytest.importorskip("aiosqlite")
+        engine, session_maker = build_db(tmp_path / "queue.db", venue_count)
+        result, statements = call_counted(
+            engine, session_maker, get_current_queue_status, venue_id=None, current_user=None
+        )
+
+        assert statements == 1
+        assert len(result["venue_queues"]) == venue_count
+        queue = result["venue_queues"][0]["queue"]
+        assert [item["queue_position"] for item in queue] == [1, 2]
+        assert queue[0]["candidate_name"] == "考生2"
+
+    @pytest.mark.parametrize("venue_count", [1, 5])
+    def test_public_dashboard(self, tmp_path, venue_count):
+        """测试公共看板查询次数与考场数量无关，统计结果正确"""
+        pytest.importorskip("aiosqlite")
+        engine, session_maker = build_db(tmp_path / "dashboard.db", venue_count)
+        response, statements = call_counted(engine, session_maker, get_public_dashboard)
+        result = json.loads(response.body)
+
+        assert statements == 3
+        assert result["overall_stats"] == {
+            "total_schedules_today": venue_count * 3,
+            "completed_today": 0,
+            "ongoing_exams": venue_count,
+            "active_venues": venue_count
+        }
+        venue = result["venues"][0]
+        assert venue["waiting_count"] == 2
+        assert venue["current_exam"]["candidate_name"] == "考*"
@@ -0,0 +1,225 @@
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import src.db.models  # noqa: F401  注册全部模型
+from src.core.cache import MemoryTTLCache
+from src.core.qr_token import decode_qr_token, encode_qr_token
+from src.db.base import Base
+from src.db.models import User
+from src.models.candidate import Candidate
+from src.models.schedule import Schedule
+from src.models.venue import Venue
+from src.services.qrcode_service import QRCodeService
+from src.services.queue_index import queue_index
+
+
+class TestMemoryTTLCache:
+    """进程内TTL缓存测试"""
+
+    def test_expiry(self):
+        """测试过期后返回None"""
+        cache = MemoryTTLCache(ttl=0.05)
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        time.sleep(0.06)
+        assert cache.get("a") is None
+
+    def test_evicts_least_recently_used(self):
+        """测试超出容量淘汰最久未使用的条目"""
+        cache = MemoryTTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert len(cache) == 2
+
+
+class TestQRCodeRendering:
+    """二维码渲染测试"""
+
+    def test_token_reused_within_window(self):
+        """测试有效期过半前重复使用同一令牌"""
+        service = QRCodeService()
+        token, expires_at = service._issue_token("schedule_checkin", 1, 2)
+
+        assert service._issue_token("schedule_checkin", 1, 2) == (token, expires_at)
+        assert service._issue_token("schedule_checkin", 1, 3)[0] != token
+        assert 0 < service.token_refresh_seconds(expires_at) <= service.token_reuse_seconds
+
+    def test_render_cache(self):
+        """测试相同内容只渲染一次"""
+        service = QRCodeService()
+        digest, png = asyncio.run(service.render_qr_image("ABC123"))
+
+        assert png.startswith(b"\x89PNG")
+        assert asyncio.run(service.render_qr_image("ABC123"))[1] is png
+
+        svg_digest, svg = asyncio.run(service.render_qr_image("ABC123", "svg"))
+        assert svg_digest != digest
+        assert b"<svg" in svg
+
+    def test_refresh_seconds_never_negative(self):
+        """测试即将过期的令牌缓存时间为0"""
+        service = QRCodeService()
+        assert service.token_refresh_seconds(datetime.now() + timedelta(seconds=5)) == 0
+
+
+@pytest.fixture
+def checkin_db(tmp_path):
+    """带一条可签到排期的SQLite测试库"""
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'checkin.db'}")
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    now = datetime.utcnow()
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as db:
+            db.add_all([
+                User(id=1, email="a@exam.com", username="staff_a", hashed_password="x", role_id=1),
+                User(id=2, email="b@exam.com", username="staff_b", hashed_password="x", role_id=1),
+                Venue(id=1, name="理论考场A", type="理论", capacity=30),
+                Candidate(
+                    id=1, name="张三", id_number="110101199001011237", id_card="110101199001011237",
+                    phone="13800138000", institution_id=1, exam_product_id=1, created_by=1
+                ),
+                Schedule(
+                    id=1, candidate_id=1, exam_product_id=1, venue_id=1, created_by=1,
+                    scheduled_date=now.replace(hour=0, minute=0, second=0, microsecond=0),
+                    start_time=now - timedelta(minutes=10), end_time=now + timedelta(hours=1),
+                    schedule_type="theory", status="pending", check_in_status="not_checked_in"
+                ),
+            ])
+            await db.commit()
+
+    asyncio.run(setup())
+    yield session_maker
+    asyncio.run(engine.dispose())
+
+
+class TestConcurrentCheckin:
+    """并发扫码签到测试"""
+
+    def scan(self, session_maker, service, token, staff_id):
+        async def run():
+            async with session_maker() as db:
+                staff = await db.get(User, staff_id)
+                return await service.scan_qrcode_checkin(db, token, staff)
+        return run()
+
+    def test_simultaneous_scans(self, checkin_db):
+        """测试100个同时扫码只写入一次，其余返回首次签到结果"""
+        service = QRCodeService()
+        token = encode_qr_token(service.secret_key, "schedule_checkin", 1, datetime.now() + timedelta(hours=1), 1)
+
+        async def run():
+            return await asyncio.gather(*[
+                self.scan(checkin_db, service, token, 1 + index % 2) for index in range(100)
+            ])
+
+        results = asyncio.run(run())
+
+        originals = [result for result in results if not result["duplicate"]]
+        assert len(originals) == 1
+        assert all(result["success"] for result in results)
+        assert {result["checkin_time"] for result in results} == {originals[0]["checkin_time"]}
+        assert {result["staff_user"] for result in results} == {originals[0]["staff_user"]}
+
+        async def load():
+            async with checkin_db() as db:
+                return await db.get(Schedule, 1), await db.get(Candidate, 1)
+
+        schedule, candidate = asyncio.run(load())
+        assert schedule.check_in_status == "checked_in"
+        assert schedule.check_in_nonce == decode_qr_token(service.secret_key, token)["nonce"]
+        assert candidate.status == "考试中"
+
+    def test_other_qrcode_after_checkin(self, checkin_db):
+        """测试已签到后使用其他二维码扫码提示已签到"""
+        service = QRCodeService()
+        expires_at = datetime.now() + timedelta(hours=1)
+        first = encode_qr_token(service.secret_key, "schedule_checkin", 1, expires_at, 1)
+        second = encode_qr_token(service.secret_key, "schedule_checkin", 1, expires_at, 1)
+
+        assert asyncio.run(self.scan(checkin_db, service, first, 1))["duplicate"] is False
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(self.scan(checkin_db, service, second, 2))
+        assert exc_info.value.detail == "该考生已完成签到"
+
+
+@pytest.fixture
+def queue_db(tmp_path):
+    """今日两个考场的待签到排期，考生1在两个考场各有一个排期；理论考场另有一个已取消的排期（不参与排队）"""
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'queue.db'}")
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    today = datetime.combine(date.today(), datetime.min.time())
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as db:
+            db.add_all([Venue(id=1, name="理论考场A", type="理论", capacity=30), Venue(id=2, name="实操场地1", type="实操", capacity=10)])
+            rows = [(1, 2, 1, "theory", 0), (2, 1, 1, "theory", 10), (3, 3, 1, "theory", 20),
+                    (4, 3, 2, "practical", 0), (5, 2, 2, "practical", 5), (6, 1, 2, "practical", 30),
+                    (7, 4, 1, "theory", 5, "cancelled")]
+            for schedule_id, candidate_id, venue_id, schedule_type, minutes, *status in rows:
+                start_time = today + timedelta(hours=9, minutes=minutes)
+                db.add(Schedule(
+                    id=schedule_id, candidate_id=candidate_id, exam_product_id=1, venue_id=venue_id, created_by=1,
+                    scheduled_date=today, start_time=start_time, end_time=start_time + timedelta(minutes=30),
+                    schedule_type=schedule_type, status=status[0] if status else "pending",
+                    check_in_status="not_checked_in"
+                ))
+            await db.commit()
+
+    asyncio.run(setup())
+    yield engine, session_maker
+    asyncio.run(engine.dispose())
+    queue_index.load([])
+    queue_index.day = None
+
+
+class TestCandidateQueueStatus:
+    """考生排队状态测试"""
+
+    def query_status(self, queue_db, use_index):
+        engine, session_maker = queue_db
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        async def run():
+            async with session_maker() as db:
+                if use_index:
+                    await queue_index.rebuild(db)
+                else:
+                    queue_index.day = None
+                event.listen(engine.sync_engine, "before_cursor_execute", count)
+                try:
+                    return await QRCodeService().get_candidate_queue_status(db, 1)
+                finally:
+                    event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+        return asyncio.run(run()), statements
+
+    @pytest.mark.parametrize("use_index", [True, False])
+    def test_single_query(self, queue_db, use_index):
+        """测试使用排队索引或窗口函数时均只查询一次，且排队位置一致"""
+        result, statements = self.query_status(queue_db, use_index)
+
+        assert len(statements) == 1
+        assert [
+            (item["schedule_id"], item["venue_name"], item["queue_position"], item["total_waiting"])
+            for item in result["queue_status"]
+        ] == [(2, "理论考场A", 2, 3), (6, "实操场地1", 3, 3)]
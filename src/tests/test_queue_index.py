@@ -0,0 +1,136 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import src.db.models  # noqa: F401  注册全部模型
+from src.db.base import Base
+from src.models.schedule import Schedule
+from src.services.queue_index import QueueIndex
+
+DAY = date(2025, 8, 3)
+
+
+def make_schedule(schedule_id, minutes, venue_id=1, schedule_type="theory", status="not_checked_in"):
+    """构造排期，minutes为距9点的分钟数"""
+    start_time = datetime(2025, 8, 3, 9) + timedelta(minutes=minutes)
+    return Schedule(
+        id=schedule_id, candidate_id=schedule_id, exam_product_id=1, venue_id=venue_id, created_by=1,
+        scheduled_date=datetime(2025, 8, 3), start_time=start_time, end_time=start_time + timedelta(minutes=30),
+        schedule_type=schedule_type, status="pending", check_in_status=status
+    )
+
+
+@pytest.fixture
+def index():
+    index = QueueIndex()
+    index.load([make_schedule(1, 30), make_schedule(2, 0), make_schedule(3, 15), make_schedule(4, 0, venue_id=2)])
+    index.day = DAY
+    return index
+
+
+class TestQueueIndex:
+    """排队索引测试"""
+
+    def test_positions_by_start_time(self, index):
+        """测试按开始时间排队，不同考场分别排队"""
+        assert [index.position(schedule_id) for schedule_id in (2, 3, 1)] == [1, 2, 3]
+        assert index.position(4) == 1
+        assert index.waiting_ids(1, "theory", DAY) == [2, 3, 1]
+        assert index.length(2, "theory", DAY) == 1
+
+    def test_checkin_moves_queue_forward(self, index):
+        """测试签到后后面的考生位置前移"""
+        assert index.remove(2)
+        assert not index.remove(2)
+        assert index.position(2) is None
+        assert index.position(3) == 1
+        assert index.position(1) == 2
+
+    def test_ensure_adds_new_schedule(self, index):
+        """测试重建后新建的排期在读取时加入队列"""
+        assert index.ensure(make_schedule(5, 5)) == 2
+        assert index.position(3) == 3
+        assert index.ensure(make_schedule(6, 5, status="checked_in")) is None
+        assert 6 not in index
+
+    def test_ensure_ignores_cancelled(self, index):
+        """测试已取消的排期不加入队列"""
+        schedule = make_schedule(8, 5)
+        schedule.status = "cancelled"
+        assert index.ensure(schedule) is None
+        assert 8 not in index
+        assert index.position(3) == 2
+
+    def test_ensure_ignores_other_days(self, index):
+        """测试非索引日期的排期不加入队列"""
+        schedule = make_schedule(7, 0)
+        schedule.scheduled_date = datetime(2025, 8, 4)
+        assert index.ensure(schedule) is None
+        assert 7 not in index
+
+
+@pytest.fixture
+def session_maker(tmp_path):
+    """SQLite测试库"""
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'queue.db'}")
+    asyncio.run(_create_all(engine))
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+async def _create_all(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+class TestQueueIndexRebuild:
+    """排队索引重建及快照测试"""
+
+    def test_rebuild_and_flush(self, session_maker):
+        """测试从数据库重建，且快照只写回位置变化的排期"""
+        index = QueueIndex(session_maker)
+
+        async def run():
+            async with session_maker() as db:
+                db.add_all([make_schedule(1, 0), make_schedule(2, 15), make_schedule(3, 30, status="checked_in")])
+                await db.commit()
+
+                await index.rebuild(db, DAY)
+                first = await index.flush(db)
+                index.remove(1)
+                second = await index.flush(db)
+                third = await index.flush(db)
+
+                result = await db.execute(select(Schedule.id, Schedule.queue_position).order_by(Schedule.id))
+                return first, second, third, result.all()
+
+        first, second, third, rows = asyncio.run(run())
+
+        assert len(index) == 1
+        assert (first, second, third) == (2, 1, 0)
+        assert rows == [(1, 1), (2, 1), (3, None)]
+
+    def test_rebuild_skips_cancelled(self, session_maker):
+        """测试重建时已取消的排期不回到队列，位置和等待人数不变"""
+        index = QueueIndex(session_maker)
+        cancelled = make_schedule(2, 0)
+        cancelled.status = "cancelled"
+
+        async def run():
+            async with session_maker() as db:
+                db.add_all([make_schedule(1, 15), cancelled, make_schedule(3, 30)])
+                await db.commit()
+                await index.rebuild(db, DAY)
+                positions = [index.position(schedule_id) for schedule_id in (1, 2, 3)]
+                # 取消事件移出后，定期重建仍不加入
+                index.remove(2)
+                await index.rebuild(db, DAY)
+                return positions, [index.position(schedule_id) for schedule_id in (1, 2, 3)]
+
+        before, after = asyncio.run(run())
+        assert before == after == [1, None, 2]
+        assert index.length(1, "theory", DAY) == 2
@@ -0,0 +1,76 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.core.responses import CompressionMiddleware, ORJSONResponse, choose_encoding
+
+
+def make_app():
+    app = FastAPI(default_response_class=ORJSONResponse)
+
+    @app.get("/large")
+    async def large():
+        return {"items": [{"id": index, "name": f"考生{index}"} for index in range(200)]}
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def events():
+            for index in range(3):
+                yield f"data: {'x' * 1000}{index}\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+    return app
+
+
+class TestORJSONResponse:
+    """orjson响应测试"""
+
+    def test_same_as_jsonable_encoder(self):
+        """测试直接序列化的结果与jsonable_encoder + 标准库json一致"""
+        content = {
+            "time": datetime(2025, 8, 3, 9, 30, 15, 120000),
+            "date": date(2025, 8, 3),
+            "amount": Decimal("12.50"),
+            "count": Decimal("3"),
+            "stats": {1: {"total": 2}},
+            "name": "张三"
+        }
+        assert json.loads(ORJSONResponse(content).body) == json.loads(json.dumps(jsonable_encoder(content)))
+
+
+class TestCompressionMiddleware:
+    """响应压缩测试"""
+
+    def test_compress_large_response(self):
+        """测试超过阈值的响应按gzip压缩，未超过阈值或不接受压缩时原样返回"""
+        client = TestClient(make_app())
+        response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.json()["items"][199]["name"] == "考生199"
+
+        assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+        response = client.get("/large", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+
+    def test_streaming_not_compressed(self):
+        """测试流式响应逐块发送，不压缩"""
+        response = TestClient(make_app()).get("/stream", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+        assert response.text.count("data: ") == 3
+
+    def test_choose_encoding(self):
+        """测试按Accept-Encoding选择压缩方式"""
+        assert choose_encoding("gzip, deflate") == "gzip"
+        assert choose_encoding("gzip;q=0, deflate") == ""
+        assert choose_encoding("") == ""
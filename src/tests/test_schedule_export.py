@@ -0,0 +1,26 @@
+from datetime import date, datetime
+
+from src.services.schedule_export import ScheduleExportService
+
+
+class TestScheduleExportQuery:
+    """排期导出查询测试"""
+
+    def test_single_joined_query(self):
+        """测试导出使用一条关联查询"""
+        service = ScheduleExportService()
+        sql = str(service.build_query(date(2025, 8, 1), date(2025, 8, 3), venue_id=2, institution_id=1))
+
+        assert "JOIN candidates" in sql
+        assert "LEFT OUTER JOIN venues" in sql
+        assert "LEFT OUTER JOIN exam_products" in sql
+        assert "candidates.institution_id" in sql
+        assert "schedules.venue_id" in sql
+
+    def test_format_csv_row(self):
+        """测试CSV行格式化"""
+        service = ScheduleExportService()
+        row = (1, datetime(2025, 8, 3, 9, 30), None, "张三")
+
+        assert service._format_row(row) == [1, "2025-08-03 09:30:00", "", "张三"]
+        assert len(service.headers) == len(service.EXPORT_COLUMNS)
@@ -0,0 +1,127 @@
+import asyncio
+import json
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import src.db.models  # noqa: F401  注册全部模型
+from src.core.fields import parse_fields
+from src.db.base import Base
+from src.models.candidate import Candidate
+from src.models.schedule import Schedule
+from src.models.venue import Venue
+from src.routers.candidates import get_candidates
+from src.services.schedule_management import ScheduleManagementService
+
+TODAY = date.today()
+
+
+@pytest.fixture
+def database(tmp_path):
+    """考场1上两名考生的排期，其中一条排期的考场已删除；返回(引擎, 会话工厂, 执行的SQL语句)"""
+    pytest.importorskip("aiosqlite")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'fields.db'}")
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    day = datetime.combine(TODAY, datetime.min.time())
+    start = day + timedelta(hours=9)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_maker() as db:
+            db.add(Venue(id=1, name="实操场地1", type="实操", capacity=10))
+            for candidate_id, venue_id in [(1, 1), (2, 9)]:
+                db.add(Candidate(
+                    id=candidate_id, name=f"考生{candidate_id}", id_number=f"11010119900101123{candidate_id}",
+                    id_card=f"11010119900101123{candidate_id}", phone="13800138000",
+                    institution_id=1, exam_product_id=1, created_by=1
+                ))
+                db.add(Schedule(
+                    id=candidate_id, candidate_id=candidate_id, exam_product_id=1, venue_id=venue_id, created_by=1,
+                    scheduled_date=day, start_time=start + timedelta(minutes=15 * candidate_id),
+                    end_time=start + timedelta(minutes=15 * candidate_id + 15),
+                    schedule_type="practical", status="pending", check_in_status="not_checked_in"
+                ))
+            await db.commit()
+
+    asyncio.run(setup())
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    yield engine, session_maker, statements
+    asyncio.run(engine.dispose())
+
+
+def call(session_maker, function, *args, **kwargs):
+    async def run():
+        async with session_maker() as db:
+            return await function(db, *args, **kwargs)
+
+    return asyncio.run(run())
+
+
+class TestParseFields:
+    """fields参数解析测试"""
+
+    def test_parse(self):
+        """测试去除空白及重复字段，未指定时返回全部字段"""
+        assert parse_fields(" id, name ,id,", ("id", "name", "phone")) == ["id", "name"]
+        assert parse_fields(None, ("id",)) is None
+        assert parse_fields(",", ("id",)) is None
+
+    def test_unknown_field(self):
+        """测试不支持的字段返回400"""
+        with pytest.raises(HTTPException) as error:
+            parse_fields("id,password", ("id", "name"))
+        assert error.value.status_code == 400
+        assert "password" in error.value.detail
+
+
+class TestSparseFields:
+    """稀疏字段查询测试"""
+
+    def test_timeline_fields(self, database):
+        """测试时间线只查询并返回指定字段，未用到的关联表不连接"""
+        _, session_maker, statements = database
+        day = datetime.combine(TODAY, datetime.min.time())
+        timeline = call(session_maker, ScheduleManagementService().get_schedule_timeline,
+                        TODAY, fields=["id", "venue"])
+
+        assert timeline["timeline"][day.isoformat()] == [
+            {"id": 1, "venue": {"id": 1, "name": "实操场地1", "type": "实操"}},
+            {"id": 2, "venue": {"id": None, "name": "未知", "type": "未知"}}
+        ]
+        assert timeline["institution_stats"] == {1: {"total_schedules": 2, "theory_count": 0, "practical_count": 2}}
+        assert len(statements) == 1
+        assert "exam_products" not in statements[0]
+        assert "check_in_status" not in statements[0]
+
+    def test_timeline_all_fields(self, database):
+        """测试未指定字段时返回全部字段"""
+        _, session_maker, _ = database
+        day = datetime.combine(TODAY, datetime.min.time())
+        timeline = call(session_maker, ScheduleManagementService().get_schedule_timeline, TODAY)
+        item = timeline["timeline"][day.isoformat()][0]
+
+        assert list(item) == ["id", "start_time", "end_time", "schedule_type", "status", "check_in_status",
+                              "candidate", "venue", "exam_product"]
+        assert item["candidate"] == {"id": 1, "name": "考生1", "id_number": "110101199001011231"}
+        assert item["exam_product"] == {"id": None, "name": "未知"}
+
+    def test_candidate_list_fields(self, database):
+        """测试考生列表只查询并返回指定的列"""
+        _, session_maker, statements = database
+
+        async def list_candidates(db):
+            return await get_candidates(
+                page=1, size=10, status=None, exam_type=None, gender=None, institution_id=None,
+                fields="id,name", db=db, current_user=SimpleNamespace(institution_id=None)
+            )
+
+        response = call(session_maker, list_candidates)
+        assert json.loads(response.body)["data"] == [{"id": 1, "name": "考生1"}, {"id": 2, "name": "考生2"}]
+        assert "phone" not in statements[-1]
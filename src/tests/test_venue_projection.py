@@ -0,0 +1,120 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import src.db.models  # noqa: F401  注册全部模型
+from src.models.schedule import Schedule
+from src.models.venue import Venue
+from src.services.venue_projection import ScheduleState, VenueProjection
+
+TODAY = datetime.combine(date.today(), datetime.min.time())
+NINE = TODAY + timedelta(hours=9)
+
+
+def make_state(schedule_id, minutes=0, check_in_status="not_checked_in", venue_id=1, candidate_id=None):
+    start_time = NINE + timedelta(minutes=minutes)
+    return ScheduleState(
+        schedule_id, candidate_id or schedule_id, f"考*{schedule_id}", venue_id, 1, "practical",
+        start_time, start_time + timedelta(minutes=30), "pending", check_in_status
+    )
+
+
+@pytest.fixture
+def projection():
+    """考场1：9:00已签到、9:30及10:00待签到；考场2暂停使用"""
+    projection = VenueProjection(session_maker=None)
+    projection.load(date.today(), [
+        Venue(id=1, name="实操场地1", type="实操", status="active", is_active=True),
+        Venue(id=2, name="实操场地2", type="实操", status="maintenance", is_active=True)
+    ], [make_state(1, check_in_status="checked_in"), make_state(2, minutes=30), make_state(3, minutes=60)])
+    return projection
+
+
+class TestVenueProjection:
+    """考场状态投影测试"""
+
+    def test_state_follows_clock(self, projection):
+        """测试当前考生、待签到人数及下一场开始时间随时间变化"""
+        venue = projection.venue_states(NINE + timedelta(minutes=10))[1]
+        assert (venue["current_candidate"], venue["waiting_count"], venue["next_start_time"]) == ("考*1", 2, "09:30")
+        assert projection.venue_state(2, NINE)["status"] == "maintenance"
+
+        venue = projection.venue_states(NINE + timedelta(minutes=40))[1]
+        assert (venue["current_candidate"], venue["waiting_count"], venue["next_start_time"]) == (None, 2, "10:00")
+        assert projection.exam_counts(NINE + timedelta(minutes=40))["completed"] == 1
+
+    def test_cached_until_boundary(self, projection):
+        """测试下一个开始/结束时间前复用计算结果，事件到达后重新计算"""
+        now = NINE + timedelta(minutes=10)
+        view = projection.venue_states(now)
+        assert projection.venue_states(now + timedelta(minutes=10)) is view
+        assert projection.venue_states(now + timedelta(minutes=20)) is not view
+
+        view = projection.venue_states(now)
+        projection.apply_checkin([2])
+        assert projection.venue_states(now) is not view
+        assert projection.venue_states(now)[1]["waiting_count"] == 1
+
+    def test_schedule_events(self, projection):
+        """测试改期、取消、删除及新排期的应用"""
+        now = NINE + timedelta(minutes=10)
+        moved = Schedule(
+            id=3, candidate_id=3, venue_id=2, exam_product_id=1, schedule_type="practical", scheduled_date=TODAY,
+            start_time=NINE + timedelta(minutes=60), end_time=NINE + timedelta(minutes=90),
+            status="pending", check_in_status="not_checked_in"
+        )
+        assert projection.apply_schedule(moved) is False
+        assert [projection.venue_states(now)[venue_id]["waiting_count"] for venue_id in (1, 2)] == [1, 1]
+        assert projection.candidate_schedules(3)[0].candidate_name == "考*3"
+
+        moved.status = "cancelled"
+        projection.apply_schedule(moved)
+        projection.remove_schedule(2)
+        assert projection.waiting_list(1, now=now) == []
+        assert projection.candidate_schedules(3) == []
+
+        added = Schedule(
+            id=4, candidate_id=4, venue_id=1, exam_product_id=1, schedule_type="practical", scheduled_date=TODAY,
+            start_time=NINE + timedelta(minutes=30), end_time=NINE + timedelta(minutes=60),
+            status="pending", check_in_status="not_checked_in"
+        )
+        assert projection.apply_schedule(added) is True
+        assert [schedule.id for schedule in projection.waiting_list(1, now=now)] == [4]
+
+    def test_rebuild_from_database(self, tmp_path):
+        """测试从数据库加载当日排期，不含已取消及其他日期的排期"""
+        pytest.importorskip("aiosqlite")
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        from src.db.base import Base
+        from src.models.candidate import Candidate
+
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'projection.db'}")
+        session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+        async def run():
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            async with session_maker() as db:
+                db.add(Venue(id=1, name="实操场地1", type="实操", capacity=10))
+                db.add(Candidate(
+                    id=1, name="张三", id_number="110101199001011231", id_card="110101199001011231",
+                    phone="13800138000", institution_id=1, exam_product_id=1, created_by=1
+                ))
+                for schedule_id, day, status in [(1, TODAY, "pending"), (2, TODAY, "cancelled"),
+                                                 (3, TODAY + timedelta(days=1), "pending")]:
+                    db.add(Schedule(
+                        id=schedule_id, candidate_id=1, exam_product_id=1, venue_id=1, created_by=1,
+                        scheduled_date=day, start_time=day + timedelta(hours=9), end_time=day + timedelta(hours=10),
+                        schedule_type="practical", status=status, check_in_status="not_checked_in"
+                    ))
+                await db.commit()
+            projection = VenueProjection(session_maker)
+            await projection.refresh()
+            await engine.dispose()
+            return projection
+
+        projection = asyncio.run(run())
+        assert [(schedule.id, schedule.candidate_name) for schedule in projection.candidate_schedules(1)] == [(1, "张*")]
+        assert projection.venue_states(NINE - timedelta(hours=1))[1]["waiting_count"] == 1
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.services.wait_time import ServiceSample, WaitTimeEstimator, build_service_times, to_samples
+
+
+def make_samples(minutes_list, venue_id=1, exam_product_id=1, schedule_type="practical"):
+    """按签到顺序构造服务时长样本"""
+    start = datetime(2025, 8, 1, 9)
+    return [
+        ServiceSample(start + timedelta(minutes=index), venue_id, exam_product_id, schedule_type, minutes)
+        for index, minutes in enumerate(minutes_list)
+    ]
+
+
+@pytest.fixture
+def estimator():
+    estimator = WaitTimeEstimator(session_maker=None)
+    estimator.default_minutes = 15
+    return estimator
+
+
+class TestServiceTimes:
+    """服务时长统计测试"""
+
+    def test_rolling_median(self):
+        """测试中位数只使用最近window个样本，且不受异常值影响"""
+        samples = make_samples([30] * 5 + [8, 9, 10, 60, 11])
+        service_times = build_service_times(samples, window=5)
+
+        assert service_times[(1, 1, "practical")] == 10
+
+    def test_ewma_follows_recent_samples(self):
+        """测试指数加权平均偏向最近的样本"""
+        samples = make_samples([20] * 5 + [10] * 10)
+        value = build_service_times(samples, method="ewma", alpha=0.5)[(1, 1, "practical")]
+
+        assert 10 < value < 10.1
+
+    def test_min_samples(self):
+        """测试样本不足的分组不输出"""
+        service_times = build_service_times(make_samples([10] * 4), min_samples=5)
+        assert service_times == {}
+
+    def test_to_samples_drops_outliers(self):
+        """测试剔除未结束即签到或时长异常的记录"""
+        check_in = datetime(2025, 8, 1, 9)
+        rows = [
+            (check_in, check_in + timedelta(minutes=12), 1, 1, "theory"),
+            (check_in, check_in - timedelta(minutes=5), 1, 1, "theory"),
+            (check_in, check_in + timedelta(hours=8), 1, 1, "theory"),
+        ]
+        assert [sample.minutes for sample in to_samples(rows)] == [12]
+
+
+class TestWaitTimeEstimator:
+    """等待时间估算测试"""
+
+    def test_fallback_to_coarser_group(self, estimator):
+        """测试细分组样本不足时回退到考场、类型分组，均无数据时使用默认值"""
+        estimator.load(make_samples([8] * 5, exam_product_id=1) + make_samples([12] * 3, exam_product_id=2))
+
+        assert estimator.service_minutes(1, 1, "practical") == 8
+        # 产品2样本不足，使用考场1全部实操样本的中位数
+        assert estimator.service_minutes(1, 2, "practical") == 8
+        # 其他考场使用全部实操样本
+        assert estimator.service_minutes(9, 1, "practical") == 8
+        assert estimator.service_minutes(1, 1, "theory") == 15
+
+    def test_estimate_wait(self, estimator):
+        """测试等待时间为排队位置乘以每人服务时长"""
+        estimator.load(make_samples([7.5] * 5))
+
+        assert estimator.estimate_wait(4, 1, 1, "practical") == 30
+        assert estimator.estimate_wait(None, 1, 1, "practical") is None
+        assert estimator.estimate_wait(2, 1, 1, "theory") == 30
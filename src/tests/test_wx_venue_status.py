@@ -0,0 +1,90 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import src.db.models  # noqa: F401  注册全部模型
+from src.db.base import Base
+from src.models.schedule import Schedule
+from src.models.venue import Venue
+from src.services.wx_miniprogram import WxMiniprogramService
+
+
+@pytest.fixture
+def database(tmp_path):
+    """考场1（容量4）两名考生正在考试（另有已取消、已完成、未签到、已结束的排期），考场2（容量0）空闲，考场3停用；返回(会话工厂, 执行的SQL语句)"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'venues.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    session_maker = sessionmaker(engine)
+    now = datetime.now()
+    day = datetime.combine(now.date(), datetime.min.time())
+    with session_maker() as db:
+        db.add_all([
+            Venue(id=1, name="实操场地1", type="实操", capacity=4),
+            Venue(id=2, name="理论考场A", type="理论", capacity=0),
+            Venue(id=3, name="实操场地2", type="实操", capacity=8, status="inactive")
+        ])
+        for schedule_id, status, check_in_status in [
+            (1, "confirmed", "checked_in"), (2, "pending", "late"),  # 正在考试
+            (3, "cancelled", "checked_in"), (4, "completed", "checked_in"), (5, "confirmed", "not_checked_in")
+        ]:
+            db.add(Schedule(
+                id=schedule_id, candidate_id=schedule_id, exam_product_id=1, venue_id=1, created_by=1,
+                scheduled_date=day, start_time=now - timedelta(minutes=5), end_time=now + timedelta(minutes=10),
+                schedule_type="practical", status=status, check_in_status=check_in_status
+            ))
+        # 已结束的考试
+        db.add(Schedule(
+            id=6, candidate_id=6, exam_product_id=1, venue_id=1, created_by=1,
+            scheduled_date=day, start_time=now - timedelta(minutes=30), end_time=now - timedelta(minutes=15),
+            schedule_type="practical", status="confirmed", check_in_status="checked_in"
+        ))
+        db.commit()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    WxMiniprogramService._venues_status_cache = None
+    yield session_maker, statements
+    WxMiniprogramService._venues_status_cache = None
+    engine.dispose()
+
+
+class TestVenuesStatus:
+    """小程序考场状态测试"""
+
+    def test_grouped_query(self, database):
+        """测试一次分组查询返回全部启用考场，使用考场实际容量"""
+        session_maker, statements = database
+        with session_maker() as db:
+            venues = WxMiniprogramService.get_all_venues_status(db)
+
+        assert len(statements) == 1
+        assert [(venue["venue_id"], venue["current_occupancy"], venue["total_capacity"]) for venue in venues] == [
+            (1, 2, 4), (2, 0, 0)
+        ]
+        assert venues[0]["occupancy_rate"] == 50.0 and venues[0]["status"] == "使用中"
+        assert venues[1]["occupancy_rate"] == 0 and venues[1]["status"] == "空闲"
+
+        with session_maker() as db:
+            assert WxMiniprogramService.get_venue_status(db, 1)["current_occupancy"] == 2
+            assert WxMiniprogramService.get_venue_status(db, 99) is None
+
+    def test_cached_single_flight(self, database):
+        """测试缓存有效期内并发请求只查询一次数据库"""
+        session_maker, statements = database
+        results = []
+
+        def load():
+            with session_maker() as db:
+                results.append(WxMiniprogramService.get_all_venues_status(db))
+
+        threads = [threading.Thread(target=load) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(statements) == 1
+        assert all(result is results[0] for result in results)